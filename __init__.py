@@ -17,7 +17,28 @@
 import bpy
 import mathutils
 import math
-import random
+import time
+import fnmatch
+import numpy
+import zlib
+import os
+import json
+import logging
+import contextlib
+from .jspline_effects import (JSPLINE_emptyTypeNames,JSPLINE_constraintTypes,JSPLINE_emptyOffsetAxes,JSPLINE_delayEmptyTypes,
+    JSPLINE_SetWorkerThreads,JSPLINE_StopWorkerThreads,JSPLINE_MapInParallel,JSPLINE_GenerateNoise,
+    JSPLINE_MatricesToQuaternions,JSPLINE_QuaternionsToMatrices,JSPLINE_EulersToMatrices,JSPLINE_MakeQuaternionsContinuous,JSPLINE_QuaternionsToAxisAngles,JSPLINE_AxisAnglesToQuaternions,
+    JSPLINE_KeyframeSlopes,JSPLINE_LocationErrors,JSPLINE_QuaternionErrors,JSPLINE_EulerErrorFunction,JSPLINE_ReduceKeyframes,
+    JSPLINE_FindEmptyTransforms,JSPLINE_DelayEmptyTransforms,JSPLINE_SmoothEmptyTransforms,JSPLINE_IsCyclicBake,JSPLINE_CloseLoop,JSPLINE_BlendAndCloseLoop,
+    JSPLINE_ComputeEmptyEffect,JSPLINE_FindEmptyKeyframes,JSPLINE_FindDepthLevels,JSPLINE_ApplyEffectToTargets)
+
+#messages about baking go through a logger, its level is set by the log level setting when baking starts
+JSPLINE_logger = logging.getLogger(__name__)
+if(len(JSPLINE_logger.handlers) == 0):
+    JSPLINE_logHandler = logging.StreamHandler()
+    JSPLINE_logHandler.setFormatter(logging.Formatter("Jeane Spline %(levelname)s: %(message)s"))
+    JSPLINE_logger.addHandler(JSPLINE_logHandler)
+    JSPLINE_logger.propagate = False
 
 #addon info read by Blender
 bl_info = {
@@ -40,27 +61,96 @@ class JSPLINE_PT_SetupPanel(bpy.types.Panel):
     #inner working variables
     bpy.types.Scene.JSPLINEStopSignal = bpy.props.BoolProperty(name="Stop Jeane Spline Baking",description="Stop Jeane Spline Baking",default=True)
     bpy.types.Scene.JSPLINEProgressFrame = bpy.props.IntProperty(name="Jeane Spline Progress Frame",description="Which frame Jeane Spline is up to for baking",default=0)
-    bpy.types.Scene.JSPLINEBakeEmpties = bpy.props.StringProperty(name="Jeane Spline Empties for Baking",description="List of empties used for baking",default="")
     bpy.types.Scene.JSPLINEMaxFrameDelay = bpy.props.IntProperty(name="Maximum Delay Frames",description="How many frames Jeane Spline needs to keep in memory for delay effects",default=1)
+    bpy.types.Scene.JSPLINEBakeFramesPerSecond = bpy.props.FloatProperty(name="Jeane Spline Baking Speed",description="How many frames per second Jeane Spline is baking",default=0)
     #user control variables
     bpy.types.Scene.JSPLINERotationNoise = bpy.props.FloatProperty(name="Rotation Noise Amount",description="How much noise to bake into empty rotation",default=0,min=0,max=1)
     bpy.types.Scene.JSPLINELocationNoise = bpy.props.FloatProperty(name="Location Noise Amount",description="How much noise to bake into empty location",default=0,min=0,max=1)
+    bpy.types.Scene.JSPLINENoiseType = bpy.props.EnumProperty(name="Noise Type",description="How baked noise moves over time",
+        items=[('WALK',"Random Walk","Wandering noise that drifts in one direction for a while before turning"),
+                ('SMOOTH',"Smooth","Smooth gradient noise easing between random values"),
+                ('FILTERED',"Filtered","Random values blurred over time")],
+        default='WALK')
+    bpy.types.Scene.JSPLINENoiseSeed = bpy.props.IntProperty(name="Noise Seed",description="Seed for baked noise, the same seed always bakes the same noise for the same bones and objects",default=0,min=0)
+    bpy.types.Scene.JSPLINENoisePeriod = bpy.props.IntProperty(name="Noise Period (frames)",description="How many frames smooth and filtered noise take to change direction",default=12,min=2,max=1000)
+    bpy.types.Scene.JSPLINESmoothFilter = bpy.props.EnumProperty(name="Smoothing Filter",description="How smoothing effects smooth movement over time",
+        items=[('GAUSSIAN',"Gaussian","Blur movement evenly over frames before and after"),
+                ('SAVGOL',"Savitzky-Golay","Fit curves through nearby frames, keeping peaks of movement sharper than blurring"),
+                ('ONE_EURO',"One-Euro","Follow movement from frame to frame, smoothing slow movement heavily and fast movement lightly"),
+                ('SPRING',"Spring","Follow movement from frame to frame like a critically damped spring")],
+        default='GAUSSIAN')
+    bpy.types.Scene.JSPLINESmoothFrames = bpy.props.IntProperty(name="Smoothing Frames",description="How many frames smoothing effects reach over, higher values smooth more",default=2,min=0,max=100)
+    bpy.types.Scene.JSPLINESmoothSpeedResponse = bpy.props.FloatProperty(name="Smoothing Speed Response",description="How much less One-Euro smoothing holds back fast movement",default=1,min=0,max=100)
+    bpy.types.Scene.JSPLINELocationTolerance = bpy.props.FloatProperty(name="Keyframe Location Tolerance",description="How far baked curves can stray from the exact effect position, lower values keep more keyframes",default=0.001,min=0,max=1,precision=4,step=0.01)
+    bpy.types.Scene.JSPLINERotationTolerance = bpy.props.FloatProperty(name="Keyframe Rotation Tolerance",description="How far baked curves can stray from the exact effect rotation, lower values keep more keyframes",default=math.radians(0.5),min=0,max=math.radians(10),subtype='ANGLE')
     bpy.types.Scene.JSPLINESmoothPosInfluence = bpy.props.FloatProperty(name="Smooth Position Influence",description="Intensity of position smoothing effect",default=0,min=0,max=1)
     bpy.types.Scene.JSPLINESmoothRotInfluence = bpy.props.FloatProperty(name="Smooth Rotation Influence",description="Intensity of rotation smoothing effect",default=0,min=0,max=1)
     bpy.types.Scene.JSPLINEDelayPosInfluence = bpy.props.FloatProperty(name="Delay Position Influence",description="Intensity of position delay effect",default=0.05,min=0,max=1)
     bpy.types.Scene.JSPLINEDelayRotInfluence = bpy.props.FloatProperty(name="Delay Rotation Influence",description="Intensity of rotation delay effect",default=1,min=0,max=1)
+    bpy.types.Scene.JSPLINEDelayStep = bpy.props.FloatProperty(name="Delay Frames per Parent",description="How many frames of delay each selected parent in a chain adds",default=1,min=0,max=10)
+    bpy.types.Scene.JSPLINEDelayFalloff = bpy.props.FloatProperty(name="Delay Falloff",description="How the delay added by each parent changes further down a chain, below 1 adds less delay for deeper bones and objects",default=1,min=0,max=2)
     bpy.types.Scene.JSPLINELoopedAnimation = bpy.props.BoolProperty(name="Wrap Frames for Looped Animation",description="Match start and end of animation in timeline range for looping animations",default=False)
+    bpy.types.Scene.JSPLINELoopBlendFrames = bpy.props.IntProperty(name="Loop Blend Frames",description="How many frames either side of the loop the jump from the last frame back to the first is blended over",default=4,min=0,max=50)
     bpy.types.Scene.JSPLINESplitBones = bpy.props.BoolProperty(name="Split Bones for Position Effects",description="Split bones in animated armature so that position smoothing and delay effects work",default=True)
+    bpy.types.Scene.JSPLINEBakeEngine = bpy.props.EnumProperty(name="Bake Engine",description="How Jeane Spline steps through the timeline when baking",
+        items=[('TWOPASS',"Two-Pass","Sample all frames first, then compute effects for the whole frame range at once"),
+                ('PERFRAME',"Per-Frame","Compute effects and insert keyframes one frame at a time while stepping through the timeline")],
+        default='TWOPASS')
+    bpy.types.Scene.JSPLINEEvaluationMode = bpy.props.EnumProperty(name="Evaluation",description="How Jeane Spline reads bone and object transforms for each baked frame",
+        items=[('AUTO',"Pose Only","Calculate transforms straight from actions and parents, updating the whole scene only when constraints, drivers or NLA need it"),
+                ('SCENE',"Full Scene","Update the whole scene for every baked frame")],
+        default='AUTO')
+    bpy.types.Scene.JSPLINEWorkerThreads = bpy.props.IntProperty(name="Worker Threads",description="How many threads compute effects and keyframes for different bones and objects at the same time once frames are sampled. 0 uses every core",default=0,min=0,max=256)
+    bpy.types.Scene.JSPLINEFrameBudget = bpy.props.IntProperty(name="Baking Time Budget (ms)",description="How many milliseconds Jeane Spline can spend baking frames before letting the interface update",default=30,min=1,max=1000)
+    bpy.types.Scene.JSPLINEIncrementalBake = bpy.props.BoolProperty(name="Only Re-bake Changes",description="Keep bones and objects whose animation and settings haven't changed since they were baked, and only sample the changed frames of the rest. Only used by the Two-Pass engine when baking empties",default=True)
+    bpy.types.Scene.JSPLINESampleCacheFolder = bpy.props.StringProperty(name="Sample Cache Folder",description="Save sampled animation of baked bones and objects here, so later sessions and other computers baking the same saved .blend file don't sample it again. Leave empty to only keep samples until Blender is closed",default="",subtype='DIR_PATH')
+    bpy.types.Scene.JSPLINEShareInstanceBakes = bpy.props.BoolProperty(name="Share Bakes Between Instances",description="When baking into bones, bake armatures that play the same action with the same selected bones from a still root only once, and share the baked action between them",default=True)
+    bpy.types.Scene.JSPLINEInstanceNoise = bpy.props.BoolProperty(name="Different Noise per Instance",description="Bake each instance on its own when noise is used, so every instance gets different noise",default=False)
+    bpy.types.Scene.JSPLINELogLevel = bpy.props.EnumProperty(name="Log Level",description="How much Jeane Spline writes to the console while baking",
+        items=[('WARNING',"Warnings","Only write problems"),
+                ('INFO',"Summary","Write a summary of where baking time went"),
+                ('DEBUG',"Everything","Write details about every baked frame, slowing baking down")],
+        default='WARNING')
+    bpy.types.Scene.JSPLINEProfileFile = bpy.props.StringProperty(name="Bake Profile File",description="Save where baking time went as a JSON Chrome trace file after each bake, for chrome://tracing or comparing versions. Leave empty to not save it",default="",subtype='FILE_PATH')
+    bpy.types.Scene.JSPLINEBakeTarget = bpy.props.EnumProperty(name="Bake Into",description="Where Jeane Spline puts the baked effect",
+        items=[('EMPTIES',"Empties","Bake effects into empties that bones and objects follow with constraints"),
+                ('DIRECT',"Bones and Objects","Bake the final effect straight into the animation of bones and objects, without empties or constraints. Always uses the Two-Pass engine")],
+        default='EMPTIES')
     
     def draw(self, context):
+        self.layout.prop(context.scene,"JSPLINEBakeTarget")
+        if(context.scene.JSPLINEBakeTarget == 'DIRECT'):
+            self.layout.prop(context.scene,"JSPLINEShareInstanceBakes")
+            self.layout.prop(context.scene,"JSPLINEInstanceNoise")
+        self.layout.prop(context.scene,"JSPLINEBakeEngine")
+        self.layout.prop(context.scene,"JSPLINEEvaluationMode")
+        self.layout.prop(context.scene,"JSPLINEIncrementalBake")
+        self.layout.prop(context.scene,"JSPLINESampleCacheFolder")
+        self.layout.prop(context.scene,"JSPLINEFrameBudget")
+        self.layout.prop(context.scene,"JSPLINEWorkerThreads")
+        self.layout.prop(context.scene,"JSPLINELogLevel")
+        self.layout.prop(context.scene,"JSPLINEProfileFile")
+        self.layout.prop(context.scene,"JSPLINELocationTolerance")
+        self.layout.prop(context.scene,"JSPLINERotationTolerance")
         self.layout.prop(context.scene,"JSPLINESplitBones")
         self.layout.prop(context.scene,"JSPLINELoopedAnimation")
+        if(context.scene.JSPLINELoopedAnimation == True):
+            self.layout.prop(context.scene,"JSPLINELoopBlendFrames")
         self.layout.prop(context.scene,"JSPLINERotationNoise",slider=True)
         self.layout.prop(context.scene,"JSPLINELocationNoise",slider=True)
+        self.layout.prop(context.scene,"JSPLINENoiseType")
+        self.layout.prop(context.scene,"JSPLINENoiseSeed")
+        self.layout.prop(context.scene,"JSPLINENoisePeriod")
+        self.layout.prop(context.scene,"JSPLINESmoothFilter")
+        self.layout.prop(context.scene,"JSPLINESmoothFrames")
+        if(context.scene.JSPLINESmoothFilter == 'ONE_EURO'):
+            self.layout.prop(context.scene,"JSPLINESmoothSpeedResponse")
         self.layout.prop(context.scene,"JSPLINESmoothPosInfluence",slider=True)
         self.layout.prop(context.scene,"JSPLINESmoothRotInfluence",slider=True)
         self.layout.prop(context.scene,"JSPLINEDelayPosInfluence",slider=True)
         self.layout.prop(context.scene,"JSPLINEDelayRotInfluence",slider=True)
+        self.layout.prop(context.scene,"JSPLINEDelayStep")
+        self.layout.prop(context.scene,"JSPLINEDelayFalloff")
         self.layout.operator("jspline.applypreset", text ="Preset: Follow Through").presetType = "followthrough"
         self.layout.operator("jspline.applypreset", text ="Preset: Noisy Follow Through").presetType = "noisyfollowthrough"
         self.layout.operator("jspline.applypreset", text ="Preset: Squash and Stretch").presetType = "squashstretch"
@@ -78,104 +168,188 @@ class JSPLINE_PT_BakingPanel(bpy.types.Panel):
         self.layout.operator('jspline.startbake', text ='Start Baking for Selected')
         self.layout.operator('jspline.stopbake', text ='Stop Baking for Selected')
         self.layout.operator('jspline.removefromselected', text ='Delete Effect from Selected')
+        if(JSPLINE_livePreview == None):
+            self.layout.operator('jspline.startpreview', text ='Start Live Preview for Selected')
+        else:
+            self.layout.operator('jspline.stoppreview', text ='Stop Live Preview')
+        #show progress while baking
+        if(context.scene.JSPLINEStopSignal == False):
+            self.layout.label(text="Baking frame " + str(context.scene.JSPLINEProgressFrame) + " of " + str(context.scene.frame_end))
+            self.layout.label(text="{:.1f} frames/sec".format(context.scene.JSPLINEBakeFramesPerSecond))
+        #show where the time of the last bake went
+        elif((JSPLINE_bakeProfile != None) and (JSPLINE_bakeProfile.isOpen == False)):
+            profileBox = self.layout.box()
+            for summaryLine in JSPLINE_bakeProfile.summaryLines():
+                profileBox.label(text=summaryLine)
      
-def JSPLINE_PositionEmptyForCurrentFrame(emptyObject):
-    initialMatrix = None
-    finalPosition = None
-    #position for object or for bone in armature object
-    animatedObject = emptyObject['JSPLINE_object']
-    if('JSPLINE_bonename' in emptyObject):
-        boneName = emptyObject['JSPLINE_bonename']
-        #use position of bone with transform of armature object
-        #by multiplying object world matrix by bone matrix
-        initialMatrix = animatedObject.matrix_world @ animatedObject.pose.bones[boneName].matrix
-    else:
-        #use position of object
-        initialMatrix = animatedObject.matrix_world
+#position an empty of a type from JSPLINE_emptyTypeNames for a bone or object at the current frame
+def JSPLINE_PositionEmptyForCurrentFrame(emptyObject,bakeTarget,emptyType,initialMatrix=None):
+    #position for object or for bone in armature object, unless an already sampled world matrix is given
+    if(initialMatrix == None):
+        if(bakeTarget.poseBone != None):
+            #use position of bone with transform of armature object
+            #by multiplying object world matrix by bone matrix
+            initialMatrix = bakeTarget.animatedObject.matrix_world @ bakeTarget.poseBone.matrix
+        else:
+            #use position of object
+            initialMatrix = bakeTarget.animatedObject.matrix_world
     #set initial matrix
     emptyObject.matrix_world = initialMatrix
-    #set offsets for offset type empties
-    if(('_rot' in emptyObject['JSPLINE_emptyType']) == True):
-        #get forward position for rotation
-        #by multiplying animated object position by a forward vector
-        finalPosition = initialMatrix @ mathutils.Vector([0,emptyObject['JSPLINE_offsetLength'],0])
-    elif(('_roll' in emptyObject['JSPLINE_emptyType']) == True):
-        #get side position to control roll
-        #by multiplying animated object position by a sideways vector
-        finalPosition = initialMatrix @ mathutils.Vector([0,0,emptyObject['JSPLINE_offsetLength']])
-    else:
-        finalPosition = initialMatrix @ mathutils.Vector([0,0,0])
-    emptyObject.location = finalPosition
-    #only store transform history for delay empties
-    if(('delay' in emptyObject['JSPLINE_emptyType']) == True):
-        #store transform history
-        emptyObject['JSPLINE_locHistory'][str(bpy.context.scene.JSPLINEProgressFrame)] = emptyObject.location
-        emptyObject['JSPLINE_rotHistory'][str(bpy.context.scene.JSPLINEProgressFrame)] = emptyObject.rotation_quaternion
-        #keep only needed history for delay, remove old frame transform history which will be unused
-        maxHistoryLength = bpy.context.scene.JSPLINEMaxFrameDelay+1
-        if(len(emptyObject['JSPLINE_locHistory']) > maxHistoryLength):
-            emptyObject['JSPLINE_locHistory'].pop(str(bpy.context.scene.JSPLINEProgressFrame-maxHistoryLength))
-            emptyObject['JSPLINE_rotHistory'].pop(str(bpy.context.scene.JSPLINEProgressFrame-maxHistoryLength))
-    #record last frames if animation is to be looped for any empty
-    if((bpy.context.scene.JSPLINELoopedAnimation == True) and (bpy.context.scene.JSPLINEProgressFrame > bpy.context.scene.frame_end - 2)):
-        recordFrameNumber = bpy.context.scene.frame_end-bpy.context.scene.JSPLINEProgressFrame
-        emptyObject['JSPLINE_endLocations'][str(recordFrameNumber)] = emptyObject.location
-        emptyObject['JSPLINE_endRotations'][str(recordFrameNumber)] = emptyObject.rotation_quaternion
-
-
-#limit number between min and max value
-def JSPLINE_LimitToRange(numberToLimit,rangeMin,rangeMax):
-    if(numberToLimit > rangeMax):
-        numberToLimit = rangeMax
-    if(numberToLimit < rangeMin):
-        numberToLimit = rangeMin
-    return numberToLimit
-
-#add noise to empty object if possible
-def JSPLINE_AddNoiseToEmpty(emptyObject):
-    canApplyNoise = False
-    noiseAmount = 0
-    emptyOffsetLength = emptyObject['JSPLINE_offsetLength']
-    #apply noise if available
-    if((('_rot' in emptyObject['JSPLINE_emptyType']) or ('_roll' in emptyObject['JSPLINE_emptyType'])) and bpy.context.scene.JSPLINERotationNoise > 0):
-        canApplyNoise = True
-        noiseAmount = bpy.context.scene.JSPLINERotationNoise
-    elif((emptyObject['JSPLINE_emptyType'] == 'delay' or emptyObject['JSPLINE_emptyType'] == 'smooth') and bpy.context.scene.JSPLINELocationNoise > 0):
-        canApplyNoise = True
-        noiseAmount = bpy.context.scene.JSPLINELocationNoise
-    if(canApplyNoise == True):
-        if(('JSPLINE_posNoiseAdd' in emptyObject) == False):
-            emptyObject['JSPLINE_posNoiseAdd'] = mathutils.Vector([0,0,0])
-            emptyObject['JSPLINE_posNoiseDirection'] = mathutils.Vector([0,0,0])
-        for noiseDimension in range(0,3):
-            emptyObject['JSPLINE_posNoiseDirection'][noiseDimension] += random.randrange(-10,10)*0.001
-            emptyObject['JSPLINE_posNoiseDirection'][noiseDimension] = JSPLINE_LimitToRange(emptyObject['JSPLINE_posNoiseDirection'][noiseDimension],-0.01*emptyOffsetLength,0.01*emptyOffsetLength)
-            emptyObject['JSPLINE_posNoiseAdd'][noiseDimension] += (emptyObject['JSPLINE_posNoiseDirection'][noiseDimension]*(0.4*emptyOffsetLength))*noiseAmount
-            emptyObject['JSPLINE_posNoiseAdd'][noiseDimension] = JSPLINE_LimitToRange(emptyObject['JSPLINE_posNoiseAdd'][noiseDimension],-emptyOffsetLength*noiseAmount,emptyOffsetLength*noiseAmount)
-        emptyObject.location += mathutils.Vector([emptyObject['JSPLINE_posNoiseAdd'][0],emptyObject['JSPLINE_posNoiseAdd'][1],emptyObject['JSPLINE_posNoiseAdd'][2]])
+    #set offsets for offset type empties, forward for rotation and sideways to control roll
+    emptyOffset = mathutils.Vector([0,0,0])
+    if(JSPLINE_emptyOffsetAxes[emptyType] >= 0):
+        emptyOffset[JSPLINE_emptyOffsetAxes[emptyType]] = bakeTarget.offsetLength
+    emptyObject.location = initialMatrix @ emptyOffset
+
+
+#fixed size history of recent empty transforms, kept in memory instead of in the .blend file
+#frames are stored in slots by frame number, overwriting the oldest frame that is no longer needed
+class JSPLINE_TransformHistory():
+    def __init__(self,historyLength,emptyCount):
+        self.historyLength = historyLength
+        self.locations = numpy.zeros((historyLength,emptyCount,3),dtype=numpy.float32)
+        self.rotations = numpy.zeros((historyLength,emptyCount,4),dtype=numpy.float32)
+
+    #store the current transform of an empty for a frame
+    def record(self,frameNumber,historyIndex,emptyObject):
+        historySlot = frameNumber % self.historyLength
+        self.locations[historySlot,historyIndex] = emptyObject.location
+        self.rotations[historySlot,historyIndex] = emptyObject.rotation_quaternion
+
+    #set an empty to its stored transform for a frame still in the history
+    def restore(self,frameNumber,historyIndex,emptyObject):
+        historySlot = frameNumber % self.historyLength
+        emptyObject.location = self.locations[historySlot,historyIndex]
+        emptyObject.rotation_quaternion = self.rotations[historySlot,historyIndex]
 
 #delay empties by appropriate frame number
-def JSPLINE_DelayEmpty(emptyObject):
+def JSPLINE_DelayEmpty(emptyObject,frameDelay,transformHistory,historyIndex):
     canApplyDelay = False
     #only apply delay if the required delay is smaller than the currently elapsed frames
-    if(emptyObject['JSPLINE_framedelay'] < (bpy.context.scene.JSPLINEProgressFrame - bpy.context.scene.frame_start)):
-        print("apply delay for " + emptyObject.name)
+    if(frameDelay < (bpy.context.scene.JSPLINEProgressFrame - bpy.context.scene.frame_start)):
+        if(JSPLINE_logger.isEnabledFor(logging.DEBUG) == True):
+            JSPLINE_logger.debug("apply delay for %s",emptyObject.name)
         canApplyDelay = True
-        historyFrameNumber = bpy.context.scene.JSPLINEProgressFrame-emptyObject['JSPLINE_framedelay']
-        #print("applying frame " + str(historyFrameNumber) + " at frame " + str(bpy.context.scene.JSPLINEProgressFrame) + " for delay " + str(emptyObject['JSPLINE_framedelay']))
-        emptyObject.location = emptyObject['JSPLINE_locHistory'][str(historyFrameNumber)]
-        emptyObject.rotation_quaternion = emptyObject['JSPLINE_rotHistory'][str(historyFrameNumber)]
+        historyFrameNumber = bpy.context.scene.JSPLINEProgressFrame-frameDelay
+        transformHistory.restore(historyFrameNumber,historyIndex,emptyObject)
     return canApplyDelay
         
+#how far out to put offset empties for a bone or object
+def JSPLINE_GetOffsetLength(selectedObject,selectedBoneName):
+    if(selectedBoneName != None):
+        return selectedObject.data.bones[selectedBoneName].length
+    #determine how far out to put empties on objects by dimension average
+    #zero dimension defaults to distance of 2
+    dimensionTotal = selectedObject.dimensions[0] + selectedObject.dimensions[1] + selectedObject.dimensions[2]
+    dimensionAverage = 2
+    if(dimensionTotal > 0):
+        dimensionAverage = dimensionTotal / 3
+    return dimensionAverage
+
+#delay frames for bones or objects from how far down a chain of selected parents each one is
+#each selected parent adds JSPLINEDelayStep frames, scaled by JSPLINEDelayFalloff for every parent above it and by a 'JSPLINE_delayMultiplier' custom property
+#chains are walked once, every bone or object reuses the result of its parent, getSelectedParent returns the selected parent or None
+#recordMaxDelay raises JSPLINEMaxFrameDelay to the longest delay found, for the history the per-frame engine keeps
+def JSPLINE_FindChainDelays(chainMembers,getSelectedParent,recordMaxDelay=True):
+    delayStep = bpy.context.scene.JSPLINEDelayStep
+    delayFalloff = bpy.context.scene.JSPLINEDelayFalloff
+    #depth in the selected chain and accumulated delay of each member
+    chainLinks = {}
+    for chainMember in chainMembers:
+        #walk up until reaching a member that is already known or the top of the selected chain
+        unknownMembers = []
+        chainParent = chainMember
+        while((chainParent != None) and ((chainParent.name in chainLinks) == False)):
+            unknownMembers.append(chainParent)
+            chainParent = getSelectedParent(chainParent)
+        for unknownMember in reversed(unknownMembers):
+            selectedParent = getSelectedParent(unknownMember)
+            if(selectedParent == None):
+                chainLinks[unknownMember.name] = (0,0)
+            else:
+                parentDepth, parentDelay = chainLinks[selectedParent.name]
+                chainLinks[unknownMember.name] = (parentDepth + 1,parentDelay + delayStep * (delayFalloff ** parentDepth) * unknownMember.get('JSPLINE_delayMultiplier',1))
+    chainDelays = {}
+    for chainMember in chainMembers:
+        chainDelays[chainMember.name] = max(int(round(chainLinks[chainMember.name][1])),1)
+        #set max frame delay that Jeane Spline will need to keep history for to do this delay
+        if((recordMaxDelay == True) and (chainDelays[chainMember.name] > bpy.context.scene.JSPLINEMaxFrameDelay)):
+            bpy.context.scene.JSPLINEMaxFrameDelay = chainDelays[chainMember.name]
+    return chainDelays
+
+#selected parent of a pose bone, or None
+def JSPLINE_SelectedParentBone(poseBone):
+    if((poseBone.parent != None) and (poseBone.parent.bone.select == True)):
+        return poseBone.parent
+    return None
+
+#selected parent of an object, or None
+def JSPLINE_SelectedParentObject(chainObject):
+    if((chainObject.parent != None) and (chainObject.parent.select_get() == True)):
+        return chainObject.parent
+    return None
+
+#influence of each constraint, in the same order as the empty types
+def JSPLINE_GetConstraintInfluences():
+    scene = bpy.context.scene
+    return [scene.JSPLINEDelayPosInfluence,scene.JSPLINEDelayRotInfluence,scene.JSPLINEDelayRotInfluence,scene.JSPLINESmoothPosInfluence,scene.JSPLINESmoothRotInfluence,scene.JSPLINESmoothRotInfluence]
+
+#one bone or object to bake, with the references and settings baking needs resolved once at setup
+class JSPLINE_BakeTarget():
+    def __init__(self,animatedObject,boneName,frameDelay):
+        self.animatedObject = animatedObject
+        self.boneName = boneName
+        self.poseBone = None
+        self.targetType = 'OBJECT'
+        if(boneName != None):
+            self.poseBone = animatedObject.pose.bones[boneName]
+            self.targetType = 'BONE'
+        #pose bone or object that has the transform channels and constraints
+        self.transformOwner = animatedObject
+        if(self.poseBone != None):
+            self.transformOwner = self.poseBone
+        self.offsetLength = JSPLINE_GetOffsetLength(animatedObject,boneName)
+        self.frameDelay = frameDelay
+        #empties of each type in JSPLINE_emptyTypeNames order, None when baking straight into the bone or object
+        self.effectEmpties = None
+        #what the bone or object is baked with and from, for re-baking only what changed
+        self.effectSettings = JSPLINE_EffectSettings(self)
+        self.sourceFingerprint = None
+
+    #hash of the keyframes of the empties and the settings of the constraints of an earlier bake, or None if some of them aren't there
+    #an effect changed since it was baked, by undo or by editing its empties or constraints, gives a different hash
+    def effectFingerprint(self):
+        emptyNameBase = "JSPLINE_EMPTY_" + self.animatedObject.name
+        if(self.boneName != None):
+            emptyNameBase += "_" + self.boneName
+        if(all((emptyNameBase + "_" + typeName) in bpy.context.scene.objects for typeName in JSPLINE_emptyTypeNames) == False):
+            return None
+        effectConstraints = [possibleConstraint for possibleConstraint in self.transformOwner.constraints if "JSPLINE_" in possibleConstraint.name]
+        if(len(effectConstraints) != len(JSPLINE_emptyTypeNames)):
+            return None
+        #constraints are turned on and off around baking, so whether they are on isn't part of the effect
+        effectParts = [[effectConstraint.type,getattr(effectConstraint.target,'name',None),JSPLINE_RNASettings(effectConstraint,('enabled',))] for effectConstraint in effectConstraints]
+        fingerprint = 0
+        for typeName in JSPLINE_emptyTypeNames:
+            effectEmpty = bpy.context.scene.objects[emptyNameBase + "_" + typeName]
+            effectParts.append([effectEmpty.name,effectEmpty.rotation_mode])
+            if((effectEmpty.animation_data != None) and (effectEmpty.animation_data.action != None)):
+                for fcurve in effectEmpty.animation_data.action.fcurves:
+                    effectParts.append([fcurve.data_path,fcurve.array_index,fcurve.extrapolation,fcurve.mute,[JSPLINE_RNASettings(fcurveModifier) for fcurveModifier in fcurve.modifiers]])
+                    fingerprint = zlib.crc32(JSPLINE_ReadFCurveKeyframes(fcurve).tobytes(),fingerprint)
+        return zlib.crc32(repr(effectParts).encode('utf-8'),fingerprint)
+
 #create empties to space switch
-def JSPLINE_CreateEmptySet(selectedObject,selectedBoneName):
+def JSPLINE_CreateEmptySet(bakeTarget):
+    selectedObject = bakeTarget.animatedObject
+    selectedBoneName = bakeTarget.boneName
     emptyArray = []
     emptyNameBase = "JSPLINE_EMPTY_" + selectedObject.name
     #if added to a bone, add bone name to empty name
     if(selectedBoneName != None):
         emptyNameBase += "_" + selectedBoneName
     #make empties of each required type
-    emptyTypeNames = ['delay','delay_rot','delay_roll','smooth','smooth_rot','smooth_roll']
+    emptyTypeNames = JSPLINE_emptyTypeNames
     for emptyNumber in range(0,len(emptyTypeNames)):
         emptyNameFinal = emptyNameBase + "_" + emptyTypeNames[emptyNumber]
         #make a new empty if it doesn't exist, otherwise get the existing named empty
@@ -183,90 +357,118 @@ def JSPLINE_CreateEmptySet(selectedObject,selectedBoneName):
             emptyArray.append(bpy.data.objects.new(emptyNameFinal,None))
             emptyArray[emptyNumber]['JSPLINE_emptyType'] = emptyTypeNames[emptyNumber]
             #record in the empty if it is controlling a bone or an object
+            emptyArray[emptyNumber]['JSPLINE_object'] = selectedObject
             if(selectedBoneName != None):
-                emptyArray[emptyNumber]['JSPLINE_object'] = selectedObject
                 emptyArray[emptyNumber]['JSPLINE_bonename'] = selectedBoneName
-                emptyArray[emptyNumber]['JSPLINE_offsetLength'] = selectedObject.data.bones[selectedBoneName].length
-            else:
-                emptyArray[emptyNumber]['JSPLINE_object'] = selectedObject
-                #determine how far out to put empties on objects by dimension average
-                #zero dimension defaults to distance of 2
-                dimensionTotal = selectedObject.dimensions[0] + selectedObject.dimensions[1] + selectedObject.dimensions[2]
-                dimensionAverage = 2
-                if(dimensionTotal > 0):
-                    dimensionAverage = dimensionTotal / 3
-                emptyArray[emptyNumber]['JSPLINE_offsetLength'] = dimensionAverage
+            emptyArray[emptyNumber]['JSPLINE_offsetLength'] = bakeTarget.offsetLength
             bpy.data.collections['JSPLINEComponents'].objects.link(emptyArray[emptyNumber])
         else: #append the named empty if it already exists
             emptyArray.append(bpy.context.scene.objects[emptyNameFinal])
         #only set up delay frame counts for delay empties
-        if(('delay' in emptyArray[emptyNumber]['JSPLINE_emptyType']) == True):
-            #set up a clear history for location and rotation
-            emptyArray[emptyNumber]['JSPLINE_locHistory'] = {}
-            emptyArray[emptyNumber]['JSPLINE_rotHistory'] = {}
-            #determine frame delay for bone or object based on selected parents
-            remainingSelectedChain = False
-            parentName = None
-            parentObject = None
-            delayFrameNumber = 1
-            #get delay frames for bones
-            if(selectedBoneName != None):
-                #add delay count for any parent bone that is selected
-                if(selectedObject.pose.bones[selectedBoneName].parent != None):
-                    if(selectedObject.pose.bones[selectedBoneName].parent.bone.select == True):
-                        remainingSelectedChain = True
-                        parentName = selectedObject.pose.bones[selectedBoneName].parent.name
-                while remainingSelectedChain == True:
-                    remainingSelectedChain = False
-                    if(selectedObject.pose.bones[parentName].parent != None):
-                        if(selectedObject.pose.bones[selectedBoneName].parent.bone.select == True):
-                            delayFrameNumber += 1
-                            remainingSelectedChain = True
-                            parentName = selectedObject.pose.bones[parentName].parent.name
-            else:
-                #get delay frames for objects
-                if(selectedObject.parent != None):
-                    if(selectedObject.parent.select_get() == True):
-                        remainingSelectedChain = True
-                        parentObject = selectedObject.parent
-                while remainingSelectedChain == True:
-                    remainingSelectedChain = False
-                    if(parentObject.parent != None):
-                        if(parentObject.parent.select_get() == True):
-                            delayFrameNumber += 1
-                            remainingSelectedChain = True
-                            parentObject = parentObject.parent
-            #set max frame delay that Jeane Spline will need to keep history for to do this delay
-            if(delayFrameNumber > bpy.context.scene.JSPLINEMaxFrameDelay):
-                bpy.context.scene.JSPLINEMaxFrameDelay = delayFrameNumber
+        if(JSPLINE_delayEmptyTypes[emptyNumber] == True):
             #store frame delay in empty
-            emptyArray[emptyNumber]['JSPLINE_framedelay'] = delayFrameNumber
-        #set up clear end frame transform record if animation is to be looped
-        emptyArray[emptyNumber]['JSPLINE_endLocations'] = {}
-        emptyArray[emptyNumber]['JSPLINE_endRotations'] = {}
+            emptyArray[emptyNumber]['JSPLINE_framedelay'] = bakeTarget.frameDelay
         #clear any existing empty animation before new bake
         emptyArray[emptyNumber].animation_data_clear()
-        #store empty to be baked
-        bpy.context.scene.JSPLINEBakeEmpties = bpy.context.scene.JSPLINEBakeEmpties + emptyArray[emptyNumber].name + ","
         #set to use quaternion rotation
         emptyArray[emptyNumber].rotation_mode = 'QUATERNION'
         #position empty for frame
-        JSPLINE_PositionEmptyForCurrentFrame(emptyArray[emptyNumber])
+        JSPLINE_PositionEmptyForCurrentFrame(emptyArray[emptyNumber],bakeTarget,emptyNumber)
     #return empty array for further use
+    bakeTarget.effectEmpties = emptyArray
     return emptyArray
 
+#all bones, objects and empties of a bake, laid out in arrays once at setup so baking needs no name lookups or ID property reads
+#empties are numbered target by target, each target has one empty of every type in JSPLINE_emptyTypeNames order
+#keptTargets are bones and objects selected for baking that are kept as they were baked before
+#sharedInstances are armatures that aren't baked but share the baked action of another armature when baking directly
+#skippedProblems are reasons selected bones and objects were left out of baking directly, from JSPLINE_DirectBakeProblem
+class JSPLINE_BakeJob():
+    def __init__(self,bakeTargets,bakeDirect,keptTargets=None,sharedInstances=None,skippedProblems=None):
+        scene = bpy.context.scene
+        JSPLINE_SetWorkerThreads(scene.JSPLINEWorkerThreads)
+        #each bake job gets its own lists, so adding to them doesn't change other bake jobs
+        if(keptTargets == None):
+            keptTargets = []
+        if(sharedInstances == None):
+            sharedInstances = []
+        if(skippedProblems == None):
+            skippedProblems = []
+        self.bakeTargets = bakeTargets
+        self.keptTargets = keptTargets
+        #armatures given the baked action of another armature once baking finishes, from JSPLINE_FindSharedInstances
+        self.sharedInstances = sharedInstances
+        self.skippedProblems = skippedProblems
+        self.bakeDirect = bakeDirect
+        self.targetObjects = [bakeTarget.animatedObject for bakeTarget in bakeTargets]
+        self.targetBoneNames = [bakeTarget.boneName for bakeTarget in bakeTargets]
+        typeCount = len(JSPLINE_emptyTypeNames)
+        emptyCount = len(bakeTargets) * typeCount
+        self.emptyTargetIndices = numpy.repeat(numpy.arange(len(bakeTargets)),typeCount)
+        self.emptyTypes = numpy.tile(numpy.arange(typeCount),len(bakeTargets))
+        self.targetEmptyIndices = numpy.arange(emptyCount).reshape(len(bakeTargets),typeCount)
+        #empty objects to keyframe, None for each empty when baking straight into bones and objects
+        self.emptyObjects = [None] * emptyCount
+        if(bakeDirect == False):
+            self.emptyObjects = [effectEmpty for bakeTarget in bakeTargets for effectEmpty in bakeTarget.effectEmpties]
+        self.emptyOffsetLengths = numpy.array([bakeTarget.offsetLength for bakeTarget in bakeTargets],dtype=numpy.float32)[self.emptyTargetIndices]
+        offsetAxes = numpy.array(JSPLINE_emptyOffsetAxes)[self.emptyTypes]
+        offsetEmpties = numpy.flatnonzero(offsetAxes >= 0)
+        self.emptyOffsets = numpy.zeros((emptyCount,3),dtype=numpy.float32)
+        self.emptyOffsets[offsetEmpties,offsetAxes[offsetEmpties]] = self.emptyOffsetLengths[offsetEmpties]
+        self.isDelayEmpty = numpy.array(JSPLINE_delayEmptyTypes)[self.emptyTypes]
+        targetDelays = numpy.array([bakeTarget.frameDelay for bakeTarget in bakeTargets],dtype=numpy.int64)
+        self.emptyDelays = numpy.where(self.isDelayEmpty,targetDelays[self.emptyTargetIndices],0)
+        #rotation and roll empties get rotation noise, position empties get location noise
+        self.noiseAmounts = numpy.where(offsetAxes >= 0,scene.JSPLINERotationNoise,scene.JSPLINELocationNoise).astype(numpy.float32)
+        #noise of each empty is seeded from the noise seed and the names of its object, bone and type, so it doesn't depend on what else is baked
+        self.noiseSeeds = []
+        for emptyNumber in range(0,emptyCount):
+            bakeTarget = bakeTargets[self.emptyTargetIndices[emptyNumber]]
+            emptyName = bakeTarget.animatedObject.name + "/" + str(bakeTarget.boneName) + "/" + JSPLINE_emptyTypeNames[self.emptyTypes[emptyNumber]]
+            self.noiseSeeds.append([scene.JSPLINENoiseSeed,zlib.crc32(emptyName.encode('utf-8'))])
+
+    #noise offsets of every empty for frameCount frames from the start of the frame range
+    def generateNoise(self,frameCount):
+        scene = bpy.context.scene
+        return JSPLINE_GenerateNoise(scene.JSPLINENoiseType,self.noiseSeeds,self.noiseAmounts,self.emptyOffsetLengths,frameCount,scene.JSPLINENoisePeriod)
+
+    #undelayed locations and rotations of every empty from world matrices of every target, shaped (frames, targets, 4, 4)
+    def findEmptyTransforms(self,targetMatrices):
+        return JSPLINE_FindEmptyTransforms(targetMatrices,self.emptyTargetIndices,self.emptyOffsets)
+
+    #filter transforms of smoothing empties over frames all at once with the smoothing settings of the scene
+    def smoothEmptyTransforms(self,locations,rotations):
+        return JSPLINE_SmoothEmptyTransforms(locations,rotations,self.isDelayEmpty,bpy.context.scene)
+
+    #fewest location and rotation keyframes for every empty within the keyframe tolerances of the scene, see JSPLINE_FindEmptyKeyframes
+    def findEmptyKeyframes(self,locations,rotations,keyableFrames,requiredKeys,reduceKeys=True,cyclic=False):
+        with JSPLINE_MeasurePhase('keyframe reduction'):
+            return JSPLINE_FindEmptyKeyframes(locations,rotations,keyableFrames,requiredKeys,bpy.context.scene,reduceKeys,cyclic)
+
+    #write location and rotation keyframes into every empty, with handles following the same curves the keyframes were chosen for
+    #cyclic keyframes close a loop, and their F-curves repeat
+    def writeEmptyKeyframes(self,frameNumbers,locations,rotations,locationKeys,rotationKeys,cyclic=False):
+        keyframeWriter = JSPLINE_KeyframeWriter(cyclic=cyclic)
+        locationSlopes = JSPLINE_KeyframeSlopes(locationKeys,locations,cyclic)
+        rotationSlopes = JSPLINE_KeyframeSlopes(rotationKeys,rotations,cyclic)
+        for emptyNumber in range(0,len(self.emptyObjects)):
+            bakeEmpty = self.emptyObjects[emptyNumber]
+            emptyLocationKeys = locationKeys[:,emptyNumber]
+            emptyRotationKeys = rotationKeys[:,emptyNumber]
+            keyframeWriter.addKeys(bakeEmpty,"location",frameNumbers[emptyLocationKeys],locations[emptyLocationKeys,emptyNumber],keySlopes=locationSlopes[emptyLocationKeys,emptyNumber])
+            keyframeWriter.addKeys(bakeEmpty,"rotation_quaternion",frameNumbers[emptyRotationKeys],rotations[emptyRotationKeys,emptyNumber],keySlopes=rotationSlopes[emptyRotationKeys,emptyNumber])
+        with JSPLINE_MeasurePhase('keyframe writes'):
+            keyframeWriter.write()
+
 #create constraints for a bone or object
 def JSPLINE_createAnimatedObjectConstraints(animatedObject,emptyArray):
     #names for constraints when constraining animated objects or bones to empties
     constraintNames = ['JSPLINE_delaypos','JSPLINE_delayrot','JSPLINE_delayroll','JSPLINE_smoothpos','JSPLINE_smoothrot','JSPLINE_smoothroll']
-    smoothPosInfluence = bpy.context.scene.JSPLINESmoothPosInfluence
-    smoothRotInfluence = bpy.context.scene.JSPLINESmoothRotInfluence
-    DelayPosInfluence = bpy.context.scene.JSPLINEDelayPosInfluence
-    DelayRotInfluence = bpy.context.scene.JSPLINEDelayRotInfluence
-    constraintInfluences = [DelayPosInfluence,DelayRotInfluence,DelayRotInfluence,smoothPosInfluence,smoothRotInfluence,smoothRotInfluence]
+    constraintInfluences = JSPLINE_GetConstraintInfluences()
     constructedConstraints = []
     if((constraintNames[0] in animatedObject.constraints) == False):
-        constraintTypes = ['COPY_LOCATION','DAMPED_TRACK','LOCKED_TRACK','COPY_LOCATION','DAMPED_TRACK','LOCKED_TRACK']
+        constraintTypes = JSPLINE_constraintTypes
         for constraintNumber in range(0,len(constraintNames)):
             emptyConstraint = animatedObject.constraints.new(constraintTypes[constraintNumber])
             emptyConstraint.name = constraintNames[constraintNumber]
@@ -283,52 +485,1666 @@ def JSPLINE_createAnimatedObjectConstraints(animatedObject,emptyArray):
         #set constraint influences based on type
         animatedObject.constraints[constraintNames[constraintNumber]].influence = constraintInfluences[constraintNumber]
         
-#enable all constraints for an animated object
-def JSPLINE_enableAnimatedObjectConstraints(emptyObject):
-    animatedObject = None
-    if('JSPLINE_bonename' in emptyObject):
-        animatedObject = emptyObject['JSPLINE_object'].pose.bones[emptyObject['JSPLINE_bonename']]
-    else:
-        animatedObject = emptyObject['JSPLINE_object']
+#enable all constraints for an animated object or pose bone
+def JSPLINE_enableAnimatedObjectConstraints(animatedObject):
     for possibleConstraint in animatedObject.constraints:
         if('JSPLINE_' in possibleConstraint.name):
             possibleConstraint.enabled = True
 
-#remove all effect constraints and empties from selected
+#disable all constraints for an animated object or pose bone, so sampling sees it without the effect
+def JSPLINE_disableAnimatedObjectConstraints(animatedObject):
+    for possibleConstraint in animatedObject.constraints:
+        if('JSPLINE_' in possibleConstraint.name):
+            possibleConstraint.enabled = False
+
+#whether each effect constraint of a bone or object is on, by constraint name
+def JSPLINE_EffectConstraintStates(animatedObject):
+    return {possibleConstraint.name:possibleConstraint.enabled for possibleConstraint in animatedObject.constraints if 'JSPLINE_' in possibleConstraint.name}
+
+#turn effect constraints of a bone or object on or off as they were in constraintStates from JSPLINE_EffectConstraintStates
+def JSPLINE_RestoreEffectConstraintStates(animatedObject,constraintStates):
+    for possibleConstraint in animatedObject.constraints:
+        if(possibleConstraint.name in constraintStates):
+            possibleConstraint.enabled = constraintStates[possibleConstraint.name]
+
+#transform F-curves of an object or pose bone in an action
+def JSPLINE_FindTransformFCurves(action,dataPathPrefix):
+    transformDataPaths = [dataPathPrefix + transformName for transformName in ('location','rotation_quaternion','rotation_axis_angle','rotation_euler','scale')]
+    return [fcurve for fcurve in action.fcurves if fcurve.data_path in transformDataPaths]
+
+#copy an F-curve and all of its keyframes into another action
+def JSPLINE_CopyFCurve(sourceFCurve,action):
+    if(sourceFCurve.group != None):
+        copiedFCurve = action.fcurves.new(sourceFCurve.data_path,index=sourceFCurve.array_index,action_group=sourceFCurve.group.name)
+    else:
+        copiedFCurve = action.fcurves.new(sourceFCurve.data_path,index=sourceFCurve.array_index)
+    copiedFCurve.extrapolation = sourceFCurve.extrapolation
+    copiedFCurve.mute = sourceFCurve.mute
+    keyCount = len(sourceFCurve.keyframe_points)
+    copiedFCurve.keyframe_points.add(keyCount)
+    for propertyName,propertySize,propertyType in (('interpolation',1,numpy.int32),('easing',1,numpy.int32),('type',1,numpy.int32),('handle_left_type',1,numpy.int32),('handle_right_type',1,numpy.int32),
+            ('co',2,numpy.float32),('handle_left',2,numpy.float32),('handle_right',2,numpy.float32),('back',1,numpy.float32),('amplitude',1,numpy.float32),('period',1,numpy.float32)):
+        propertyValues = numpy.empty(keyCount*propertySize,dtype=propertyType)
+        sourceFCurve.keyframe_points.foreach_get(propertyName,propertyValues)
+        copiedFCurve.keyframe_points.foreach_set(propertyName,propertyValues)
+    return copiedFCurve
+
+#bones and objects baked directly are keyframed in a copy of their action, so their own animation can be brought back
+def JSPLINE_PrepareDirectBake(animatedObject,selectedBoneName):
+    targetName = ''
+    if(selectedBoneName != None):
+        targetName = selectedBoneName
+    if(('JSPLINE_directTargets' in animatedObject) == False):
+        animatedObject['JSPLINE_directTargets'] = []
+        if((animatedObject.animation_data != None) and (animatedObject.animation_data.action != None)):
+            sourceAction = animatedObject.animation_data.action
+            animatedObject['JSPLINE_sourceAction'] = sourceAction
+            bakedAction = sourceAction.copy()
+            bakedAction.name = sourceAction.name + "_JSPLINE"
+            animatedObject.animation_data.action = bakedAction
+    directTargets = list(animatedObject['JSPLINE_directTargets'])
+    if((targetName in directTargets) == False):
+        directTargets.append(targetName)
+        animatedObject['JSPLINE_directTargets'] = directTargets
+
+#key grouping armatures that play the same action with the same selected bones from a root that doesn't move, or None if the armature can't share a bake
+#such instances only differ by where their root is, so bone animation baked for one of them fits all of them
+def JSPLINE_InstanceBakeKey(armatureObject,boneTargets):
+    if((armatureObject.animation_data == None) or (armatureObject.animation_data.action == None)):
+        return None
+    armatureAction = armatureObject.animation_data.action
+    #an action moving the armature object itself would move each instance differently
+    if(any(fcurve.data_path.startswith('pose.bones[') == False for fcurve in armatureAction.fcurves)):
+        return None
+    chainObject = armatureObject
+    while(chainObject != None):
+        if(JSPLINE_ObjectEvaluationProblem(chainObject) != None):
+            return None
+        if((chainObject != armatureObject) and (chainObject.animation_data != None) and (chainObject.animation_data.action != None)):
+            return None
+        chainObject = chainObject.parent
+    solvedBoneNames = JSPLINE_SolvedBoneNames(armatureObject)
+    if(any(JSPLINE_PoseBoneEvaluationProblem(poseBone,solvedBoneNames) != None for poseBone in armatureObject.pose.bones)):
+        return None
+    #rest pose, unanimated pose channels and root scale have to match as well, linked duplicates and library overrides usually do
+    instanceParts = [armatureAction.name_full,[(bakeTarget.boneName,bakeTarget.frameDelay) for bakeTarget in boneTargets],
+        [(armatureBone.name,numpy.array(armatureBone.matrix_local).round(5).tolist(),armatureBone.use_connect) for armatureBone in armatureObject.data.bones],
+        [numpy.array(poseBone.matrix_basis).round(5).tolist() for poseBone in armatureObject.pose.bones],numpy.array(armatureObject.matrix_world.to_scale()).round(5).tolist()]
+    return repr(instanceParts)
+
+#leave out bone targets of armatures that can share the bake of another selected armature
+#returns the targets left to bake, and (instance, armature it shares the bake of, bone names) for each left out armature
+def JSPLINE_FindSharedInstances(bakeTargets):
+    scene = bpy.context.scene
+    #every instance is baked on its own when each needs its own noise
+    if((scene.JSPLINEInstanceNoise == True) and ((scene.JSPLINELocationNoise > 0) or (scene.JSPLINERotationNoise > 0))):
+        return bakeTargets, []
+    armatureTargets = {}
+    for bakeTarget in bakeTargets:
+        if(bakeTarget.boneName != None):
+            armatureTargets.setdefault(bakeTarget.animatedObject.name,[]).append(bakeTarget)
+    instanceLeaders = {}
+    sharedInstances = []
+    for boneTargets in armatureTargets.values():
+        armatureObject = boneTargets[0].animatedObject
+        instanceKey = JSPLINE_InstanceBakeKey(armatureObject,boneTargets)
+        if(instanceKey == None):
+            continue
+        if(instanceKey in instanceLeaders):
+            sharedInstances.append((armatureObject,instanceLeaders[instanceKey],[bakeTarget.boneName for bakeTarget in boneTargets]))
+        else:
+            instanceLeaders[instanceKey] = armatureObject
+    sharingNames = set(sharedInstance[0].name for sharedInstance in sharedInstances)
+    return [bakeTarget for bakeTarget in bakeTargets if (bakeTarget.animatedObject.name in sharingNames) == False], sharedInstances
+
+#give an instance the directly baked action of the armature it shares a bake with, keeping its own action to go back to
+def JSPLINE_ShareDirectBake(instanceObject,leaderObject,boneNames):
+    instanceObject['JSPLINE_sourceAction'] = instanceObject.animation_data.action
+    instanceObject['JSPLINE_directTargets'] = list(boneNames)
+    instanceObject.animation_data.action = leaderObject.animation_data.action
+
+#bring back the animation a bone or object had before it was baked directly
+def JSPLINE_RemoveDirectBake(animatedObject,selectedBoneName):
+    targetName = ''
+    dataPathPrefix = ''
+    if(selectedBoneName != None):
+        targetName = selectedBoneName
+        dataPathPrefix = JSPLINE_PoseBoneDataPath(selectedBoneName) + '.'
+    if((('JSPLINE_directTargets' in animatedObject) == False) or ((targetName in animatedObject['JSPLINE_directTargets']) == False)):
+        return
+    directTargets = list(animatedObject['JSPLINE_directTargets'])
+    directTargets.remove(targetName)
+    sourceAction = animatedObject.get('JSPLINE_sourceAction')
+    bakedAction = None
+    if(animatedObject.animation_data != None):
+        bakedAction = animatedObject.animation_data.action
+    if(len(directTargets) == 0):
+        #nothing else is baked directly, switch back to the original action
+        del animatedObject['JSPLINE_directTargets']
+        if(sourceAction != None):
+            del animatedObject['JSPLINE_sourceAction']
+        if(animatedObject.animation_data != None):
+            animatedObject.animation_data.action = sourceAction
+        if((bakedAction != None) and (bakedAction != sourceAction) and (bakedAction.users == 0)):
+            bpy.data.actions.remove(bakedAction)
+    else:
+        #other bones are still baked, only bring back the original channels of this one
+        animatedObject['JSPLINE_directTargets'] = directTargets
+        if(bakedAction != None):
+            #instances can share one baked action, give this one its own before changing it
+            if(bakedAction.users > 1):
+                bakedAction = bakedAction.copy()
+                animatedObject.animation_data.action = bakedAction
+            for bakedFCurve in JSPLINE_FindTransformFCurves(bakedAction,dataPathPrefix):
+                bakedAction.fcurves.remove(bakedFCurve)
+            if(sourceAction != None):
+                for sourceFCurve in JSPLINE_FindTransformFCurves(sourceAction,dataPathPrefix):
+                    JSPLINE_CopyFCurve(sourceFCurve,bakedAction)
+
+#effect empties of every baked bone and object, keyed by object and bone name
+#every empty records the object and bone it belongs to, so all of them are found in one pass without building names
+def JSPLINE_FindEffectEmpties():
+    effectEmpties = {}
+    for possibleEffectEmpty in bpy.data.objects:
+        ownerObject = possibleEffectEmpty.get('JSPLINE_object')
+        if(ownerObject != None):
+            effectEmpties.setdefault((ownerObject.name,possibleEffectEmpty.get('JSPLINE_bonename')),[]).append(possibleEffectEmpty)
+    return effectEmpties
+
+#remove empties and effect constraints of bones and objects given as (object, bone name or None), and bring back their animation if they were baked directly
+#empties are deleted all at once, along with actions only they used
+def JSPLINE_RemoveEffects(effectOwners):
+    effectEmpties = JSPLINE_FindEffectEmpties()
+    removedEmpties = []
+    transformOwners = []
+    for animatedObject,boneName in effectOwners:
+        removedEmpties += effectEmpties.get((animatedObject.name,boneName),[])
+        if(boneName != None):
+            transformOwners.append(animatedObject.pose.bones[boneName])
+        else:
+            transformOwners.append(animatedObject)
+    emptyActions = set(removedEmpty.animation_data.action for removedEmpty in removedEmpties if (removedEmpty.animation_data != None) and (removedEmpty.animation_data.action != None))
+    #empties go first, constraints without targets are much quicker to remove
+    bpy.data.batch_remove(removedEmpties)
+    bpy.data.batch_remove([emptyAction for emptyAction in emptyActions if emptyAction.users == 0])
+    for ownerNumber in range(0,len(effectOwners)):
+        transformOwner = transformOwners[ownerNumber]
+        #find constraints first, removing them while going through the constraints skips some
+        effectConstraints = [possibleEffectConstraint for possibleEffectConstraint in transformOwner.constraints if "JSPLINE_" in possibleEffectConstraint.name]
+        for effectConstraint in effectConstraints:
+            transformOwner.constraints.remove(effectConstraint)
+        #restore animation of bones and objects baked directly
+        JSPLINE_RemoveDirectBake(*effectOwners[ownerNumber])
+
+#remove all effect constraints and empties from selected bones and objects
 def JSPLINE_removeFromSelected():
-    nameVariants = ["_delay","_delay_roll","_delay_rot","_smooth","_smooth_roll","_smooth_rot"]
-    #remove all empties tied to selected objects
+    effectOwners = []
     for possibleModifiedObject in bpy.context.selected_objects:
-        emptyNameBase = "JSPLINE_EMPTY_" + possibleModifiedObject.name
         if(possibleModifiedObject.type == 'ARMATURE'):
             for possibleSelectedBone in possibleModifiedObject.pose.bones:
                 if(possibleSelectedBone.bone.select == True):
-                    #get empties by name in scene and delete from data
-                    emptyWithBoneName = emptyNameBase + "_" + possibleSelectedBone.name
-                    for nameVariantNumber in range(0,len(nameVariants)):
-                        if(emptyWithBoneName + nameVariants[nameVariantNumber] in bpy.context.scene.objects):
-                            bpy.data.objects.remove(bpy.context.scene.objects[emptyWithBoneName + nameVariants[nameVariantNumber]])
-                    #remove constraints from bones
-                    for possibleEffectConstraint in possibleSelectedBone.constraints:
-                        if("JSPLINE_" in possibleEffectConstraint.name):
-                            possibleSelectedBone.constraints.remove(possibleEffectConstraint)
-        elif(possibleModifiedObject.type == 'MESH'):
-            for nameVariantNumber in range(0,len(nameVariants)):
-                if(emptyNameBase + nameVariants[nameVariantNumber] in bpy.context.scene.objects):
-                    bpy.data.objects.remove(bpy.context.scene.objects[emptyNameBase + nameVariants[nameVariantNumber]])
-            #remove constraints from object
-            for possibleEffectConstraint in possibleModifiedObject.constraints:
-                if("JSPLINE_" in possibleEffectConstraint.name):
-                    possibleModifiedObject.constraints.remove(possibleEffectConstraint)
+                    effectOwners.append((possibleModifiedObject,possibleSelectedBone.name))
+        #any other object can have an effect, apart from the empties making effects
+        elif(('JSPLINE_emptyType' in possibleModifiedObject) == False):
+            effectOwners.append((possibleModifiedObject,None))
+    JSPLINE_RemoveEffects(effectOwners)
+
+#data path of a pose bone in its armature's action
+def JSPLINE_PoseBoneDataPath(boneName):
+    return 'pose.bones["' + bpy.utils.escape_identifier(boneName) + '"]'
+
+#evaluates location, rotation and scale channels of objects or pose bones straight from an action, without updating the scene
+class JSPLINE_TransformChannels():
+    #each owner has 10 channel slots, 3 for location, 4 for rotation and 3 for scale
+    def __init__(self,action,transformOwners,dataPathPrefixes):
+        ownerCount = len(transformOwners)
+        self.constantValues = numpy.zeros((ownerCount,10))
+        self.animatedFCurves = []
+        animatedSlots = []
+        rotationModeOwners = {}
+        for ownerNumber in range(0,ownerCount):
+            transformOwner = transformOwners[ownerNumber]
+            rotationMode = transformOwner.rotation_mode
+            if(rotationMode == 'QUATERNION'):
+                rotationChannel = ('rotation_quaternion',transformOwner.rotation_quaternion)
+            elif(rotationMode == 'AXIS_ANGLE'):
+                rotationChannel = ('rotation_axis_angle',transformOwner.rotation_axis_angle)
+            else:
+                rotationChannel = ('rotation_euler',transformOwner.rotation_euler)
+            rotationModeOwners.setdefault(rotationMode,[]).append(ownerNumber)
+            #unanimated channels keep their current value
+            for dataPath,currentValues,firstSlot in (('location',transformOwner.location,0),(rotationChannel[0],rotationChannel[1],3),('scale',transformOwner.scale,7)):
+                for arrayIndex in range(0,len(currentValues)):
+                    self.constantValues[ownerNumber,firstSlot+arrayIndex] = currentValues[arrayIndex]
+                    fcurve = None
+                    if(action != None):
+                        fcurve = action.fcurves.find(dataPathPrefixes[ownerNumber] + dataPath,index=arrayIndex)
+                    if((fcurve != None) and (fcurve.mute == False)):
+                        animatedSlots.append(ownerNumber*10 + firstSlot + arrayIndex)
+                        self.animatedFCurves.append(fcurve)
+        self.animatedSlots = numpy.array(animatedSlots,dtype=numpy.int64)
+        #owners are grouped by rotation mode so each mode is converted once for all its owners
+        self.rotationModeOwners = [(rotationMode,numpy.array(ownerNumbers)) for rotationMode,ownerNumbers in rotationModeOwners.items()]
+
+    #local transform matrix of every owner for a frame
+    def evaluate(self,frameNumber):
+        channelValues = self.constantValues.copy()
+        if(len(self.animatedFCurves) > 0):
+            channelValues.reshape(-1)[self.animatedSlots] = [fcurve.evaluate(frameNumber) for fcurve in self.animatedFCurves]
+        rotationMatrices = numpy.empty((len(channelValues),3,3))
+        for rotationMode,ownerNumbers in self.rotationModeOwners:
+            rotationValues = channelValues[ownerNumbers,3:7]
+            if(rotationMode == 'QUATERNION'):
+                rotationMatrices[ownerNumbers] = JSPLINE_QuaternionsToMatrices(rotationValues)
+            elif(rotationMode == 'AXIS_ANGLE'):
+                #angle comes first, followed by the axis
+                axisLengths = numpy.linalg.norm(rotationValues[:,1:4],axis=-1,keepdims=True)
+                axisLengths[axisLengths == 0] = 1
+                halfAngles = rotationValues[:,0:1] * 0.5
+                rotationMatrices[ownerNumbers] = JSPLINE_QuaternionsToMatrices(numpy.concatenate([numpy.cos(halfAngles),numpy.sin(halfAngles)*rotationValues[:,1:4]/axisLengths],axis=-1))
+            else:
+                rotationMatrices[ownerNumbers] = JSPLINE_EulersToMatrices(rotationValues[:,0:3],rotationMode)
+        basisMatrices = numpy.zeros((len(channelValues),4,4))
+        basisMatrices[:,:3,:3] = rotationMatrices * channelValues[:,None,7:10]
+        basisMatrices[:,:3,3] = channelValues[:,0:3]
+        basisMatrices[:,3,3] = 1
+        return basisMatrices
+
+#reason the world matrix of an object isn't just its parent's world matrix, parent inverse and own transform, or None if it is
+def JSPLINE_ObjectTransformProblem(animatedObject):
+    if(any(objectConstraint.enabled for objectConstraint in animatedObject.constraints)):
+        return animatedObject.name + " has constraints"
+    if((animatedObject.parent != None) and (animatedObject.parent_type != 'OBJECT')):
+        return animatedObject.name + " has a " + animatedObject.parent_type.lower() + " parent"
+    if((tuple(animatedObject.delta_location) != (0,0,0)) or (tuple(animatedObject.delta_scale) != (1,1,1)) or (tuple(animatedObject.delta_rotation_euler) != (0,0,0)) or (tuple(animatedObject.delta_rotation_quaternion) != (1,0,0,0))):
+        return animatedObject.name + " has delta transforms"
+    return None
+
+#reason an object can't be evaluated straight from its action, or None if it can
+def JSPLINE_ObjectEvaluationProblem(animatedObject):
+    transformProblem = JSPLINE_ObjectTransformProblem(animatedObject)
+    if(transformProblem != None):
+        return transformProblem
+    for animatedData in (animatedObject,animatedObject.data):
+        if((animatedData != None) and (animatedData.animation_data != None)):
+            animationData = animatedData.animation_data
+            if(len(animationData.drivers) > 0):
+                return animatedData.name + " has drivers"
+            if((animationData.use_nla == True) and any((nlaTrack.mute == False) and (len(nlaTrack.strips) > 0) for nlaTrack in animationData.nla_tracks)):
+                return animatedData.name + " has NLA strips"
+            if((animationData.action_influence != 1) or (animationData.action_blend_type != 'REPLACE')):
+                return animatedData.name + " blends its action"
+    return None
+
+#names of bones moved by IK or spline IK constraints of an armature, with the bone whose constraint moves each one
+#IK chains start at the constrained bone, or at its parent without 'use_tail', and a chain length of 0 reaches the root
+def JSPLINE_SolvedBoneNames(armatureObject):
+    solvedBoneNames = {}
+    for constrainedBone in armatureObject.pose.bones:
+        for boneConstraint in constrainedBone.constraints:
+            if((boneConstraint.enabled == False) or ((boneConstraint.type in ('IK','SPLINE_IK')) == False)):
+                continue
+            solvedBones = [constrainedBone] + list(constrainedBone.parent_recursive)
+            if((boneConstraint.type == 'IK') and (boneConstraint.use_tail == False)):
+                solvedBones = solvedBones[1:]
+            if(boneConstraint.chain_count > 0):
+                solvedBones = solvedBones[:boneConstraint.chain_count]
+            for solvedBone in solvedBones:
+                solvedBoneNames.setdefault(solvedBone.name,constrainedBone.name)
+    return solvedBoneNames
+
+#solved bone names of an armature, found once and kept in solvedBoneCache by armature name for the other bones of the same armature
+def JSPLINE_CachedSolvedBoneNames(armatureObject,solvedBoneCache):
+    if((armatureObject.name in solvedBoneCache) == False):
+        solvedBoneCache[armatureObject.name] = JSPLINE_SolvedBoneNames(armatureObject)
+    return solvedBoneCache[armatureObject.name]
+
+#reason a pose bone can't be evaluated straight from its armature's action, or None if it can
+#bones are also moved by IK and spline IK constraints on bones further down their chain, solvedBoneNames are those of the bone's armature
+def JSPLINE_PoseBoneEvaluationProblem(poseBone,solvedBoneNames):
+    if(any(boneConstraint.enabled for boneConstraint in poseBone.constraints)):
+        return poseBone.name + " has constraints"
+    if(poseBone.name in solvedBoneNames):
+        return poseBone.name + " is moved by an IK constraint on " + solvedBoneNames[poseBone.name]
+    if((poseBone.bone.use_inherit_rotation == False) or (poseBone.bone.inherit_scale != 'FULL') or (poseBone.bone.use_local_location == False) or (poseBone.bone.use_relative_parent == True)):
+        return poseBone.name + " has custom parent inheritance"
+    return None
+
+#reason a bone or object can't be baked straight into its own keyframes, or None if it can
+#keyframes are worked out from where the bone or object ends up, so its own constraints would apply on top of keyframes already holding their result
+def JSPLINE_DirectBakeProblem(bakeTarget,solvedBoneCache):
+    if(bakeTarget.boneName != None):
+        solvedBoneNames = JSPLINE_CachedSolvedBoneNames(bakeTarget.animatedObject,solvedBoneCache)
+        return JSPLINE_PoseBoneEvaluationProblem(bakeTarget.animatedObject.pose.bones[bakeTarget.boneName],solvedBoneNames)
+    return JSPLINE_ObjectTransformProblem(bakeTarget.animatedObject)
+
+#evaluates the world matrix of an object and its parents straight from their actions
+class JSPLINE_ObjectWorldEvaluator():
+    def __init__(self,animatedObject):
+        #parent chain from the top parent down to the object itself
+        self.objectChain = []
+        chainObject = animatedObject
+        while(chainObject != None):
+            objectAction = None
+            if(chainObject.animation_data != None):
+                objectAction = chainObject.animation_data.action
+            #the parent inverse matrix is only used when there is a parent
+            parentInverseMatrix = numpy.eye(4)
+            if(chainObject.parent != None):
+                parentInverseMatrix = numpy.array(chainObject.matrix_parent_inverse)
+            self.objectChain.insert(0,(JSPLINE_TransformChannels(objectAction,[chainObject],['']),parentInverseMatrix))
+            chainObject = chainObject.parent
+
+    def evaluate(self,frameNumber):
+        return self.evaluateWithParent(frameNumber)[0]
+
+    #world matrix of the object, and the matrix it would have with no transform of its own
+    def evaluateWithParent(self,frameNumber):
+        worldMatrix = numpy.eye(4)
+        parentMatrix = worldMatrix
+        for transformChannels,parentInverseMatrix in self.objectChain:
+            parentMatrix = worldMatrix @ parentInverseMatrix
+            worldMatrix = parentMatrix @ transformChannels.evaluate(frameNumber)[0]
+        return worldMatrix, parentMatrix
+
+#evaluates armature space matrices of pose bones straight from the armature's action
+class JSPLINE_PoseEvaluator():
+    def __init__(self,armatureObject,boneNames):
+        #bones and all their parents are needed, ordered so parents come before children
+        neededBones = {}
+        for boneName in boneNames:
+            chainBone = armatureObject.pose.bones[boneName]
+            while((chainBone != None) and ((chainBone.name in neededBones) == False)):
+                neededBones[chainBone.name] = chainBone
+                chainBone = chainBone.parent
+        orderedBones = sorted(neededBones.values(),key=lambda poseBone: len(poseBone.parent_recursive))
+        boneIndices = {orderedBones[boneNumber].name:boneNumber for boneNumber in range(0,len(orderedBones))}
+        self.targetBoneIndices = numpy.array([boneIndices[boneName] for boneName in boneNames])
+        self.parentIndices = numpy.array([boneIndices[poseBone.parent.name] if poseBone.parent != None else -1 for poseBone in orderedBones])
+        #rest matrix of each bone relative to its parent's rest matrix
+        self.restMatrices = numpy.array([numpy.array(poseBone.bone.matrix_local) for poseBone in orderedBones])
+        for boneNumber in range(0,len(orderedBones)):
+            if(self.parentIndices[boneNumber] >= 0):
+                self.restMatrices[boneNumber] = numpy.linalg.inv(numpy.array(orderedBones[boneNumber].parent.bone.matrix_local)) @ self.restMatrices[boneNumber]
+        #bones at the same hierarchy depth are calculated together
+        boneDepths = numpy.array([len(poseBone.parent_recursive) for poseBone in orderedBones])
+        self.depthLevels = [numpy.flatnonzero(boneDepths == boneDepth) for boneDepth in range(0,boneDepths.max()+1)]
+        armatureAction = None
+        if(armatureObject.animation_data != None):
+            armatureAction = armatureObject.animation_data.action
+        self.transformChannels = JSPLINE_TransformChannels(armatureAction,orderedBones,[JSPLINE_PoseBoneDataPath(poseBone.name) + '.' for poseBone in orderedBones])
+        #connected bones ignore their location
+        self.connectedBoneIndices = numpy.array([boneNumber for boneNumber in range(0,len(orderedBones)) if orderedBones[boneNumber].bone.use_connect == True],dtype=numpy.int64)
+
+    def evaluate(self,frameNumber):
+        basisMatrices = self.transformChannels.evaluate(frameNumber)
+        basisMatrices[self.connectedBoneIndices,:3,3] = 0
+        poseMatrices = self.restMatrices @ basisMatrices
+        for depthLevel in self.depthLevels[1:]:
+            poseMatrices[depthLevel] = poseMatrices[self.parentIndices[depthLevel]] @ poseMatrices[depthLevel]
+        return poseMatrices[self.targetBoneIndices]
+
+    #armature space matrices of the target bones, and the matrices they would have with no transform of their own
+    def evaluateWithParents(self,frameNumber):
+        basisMatrices = self.transformChannels.evaluate(frameNumber)
+        basisMatrices[self.connectedBoneIndices,:3,3] = 0
+        parentMatrices = self.restMatrices.copy()
+        poseMatrices = self.restMatrices @ basisMatrices
+        for depthLevel in self.depthLevels[1:]:
+            parentMatrices[depthLevel] = poseMatrices[self.parentIndices[depthLevel]] @ self.restMatrices[depthLevel]
+            poseMatrices[depthLevel] = parentMatrices[depthLevel] @ basisMatrices[depthLevel]
+        return poseMatrices[self.targetBoneIndices], parentMatrices[self.targetBoneIndices]
+
+#reads world matrices of the bones and objects to bake for a frame
+#matrices are calculated straight from actions and parent chains where possible, otherwise the whole scene is updated for the frame
+class JSPLINE_TargetSampler():
+    def __init__(self,targetObjects,targetBoneNames):
+        self.targetObjects = targetObjects
+        self.targetBoneNames = targetBoneNames
+        #seconds spent reading each armature and object, for showing which are slow to bake
+        self.sourceSeconds = {}
+        #group bone targets by armature so all pose matrices of an armature are read in one call
+        self.armatureSamplers = {}
+        self.objectTargetIndices = []
+        for targetNumber in range(0,len(targetObjects)):
+            targetObject = targetObjects[targetNumber]
+            if(targetBoneNames[targetNumber] != None):
+                if((targetObject.name in self.armatureSamplers) == False):
+                    self.armatureSamplers[targetObject.name] = {'object':targetObject,'targetIndices':[],'boneIndices':[],'boneNames':[],'parentBoneIndices':[],'restMatrices':[],
+                        'buffer':numpy.empty(len(targetObject.pose.bones)*16,dtype=numpy.float32)}
+                self.armatureSamplers[targetObject.name]['targetIndices'].append(targetNumber)
+                self.armatureSamplers[targetObject.name]['boneIndices'].append(targetObject.pose.bones.find(targetBoneNames[targetNumber]))
+                self.armatureSamplers[targetObject.name]['boneNames'].append(targetBoneNames[targetNumber])
+                #parent bone and rest matrix relative to it, for reading parent matrices out of the pose
+                targetBone = targetObject.pose.bones[targetBoneNames[targetNumber]]
+                restMatrix = numpy.array(targetBone.bone.matrix_local)
+                parentBoneIndex = -1
+                if(targetBone.parent != None):
+                    restMatrix = numpy.linalg.inv(numpy.array(targetBone.parent.bone.matrix_local)) @ restMatrix
+                    parentBoneIndex = targetObject.pose.bones.find(targetBone.parent.name)
+                self.armatureSamplers[targetObject.name]['parentBoneIndices'].append(parentBoneIndex)
+                self.armatureSamplers[targetObject.name]['restMatrices'].append(restMatrix)
+            else:
+                self.objectTargetIndices.append(targetNumber)
+        #only evaluate poses directly if nothing needs the rest of the scene
+        self.evaluationProblem = None
+        if(bpy.context.scene.JSPLINEEvaluationMode == 'SCENE'):
+            self.evaluationProblem = "full scene evaluation is selected"
+        else:
+            self.evaluationProblem = self.findEvaluationProblem()
+        self.usePoseEvaluation = (self.evaluationProblem == None)
+        if(self.usePoseEvaluation == True):
+            for armatureSampler in self.armatureSamplers.values():
+                armatureSampler['objectEvaluator'] = JSPLINE_ObjectWorldEvaluator(armatureSampler['object'])
+                armatureSampler['poseEvaluator'] = JSPLINE_PoseEvaluator(armatureSampler['object'],armatureSampler['boneNames'])
+            self.objectEvaluators = [JSPLINE_ObjectWorldEvaluator(targetObjects[targetNumber]) for targetNumber in self.objectTargetIndices]
+
+    #first reason found that the targets need full scene evaluation, or None
+    def findEvaluationProblem(self):
+        checkedObjects = set()
+        solvedBoneCache = {}
+        for targetNumber in range(0,len(self.targetObjects)):
+            chainObject = self.targetObjects[targetNumber]
+            while((chainObject != None) and ((chainObject.name in checkedObjects) == False)):
+                checkedObjects.add(chainObject.name)
+                evaluationProblem = JSPLINE_ObjectEvaluationProblem(chainObject)
+                if(evaluationProblem != None):
+                    return evaluationProblem
+                chainObject = chainObject.parent
+            if(self.targetBoneNames[targetNumber] != None):
+                poseBone = self.targetObjects[targetNumber].pose.bones[self.targetBoneNames[targetNumber]]
+                solvedBoneNames = JSPLINE_CachedSolvedBoneNames(self.targetObjects[targetNumber],solvedBoneCache)
+                for chainBone in [poseBone] + list(poseBone.parent_recursive):
+                    evaluationProblem = JSPLINE_PoseBoneEvaluationProblem(chainBone,solvedBoneNames)
+                    if(evaluationProblem != None):
+                        return evaluationProblem
+        return None
+
+    #add the time since sourceStartTime to the time spent reading an armature or object
+    def addSourceTime(self,sourceName,sourceStartTime):
+        self.sourceSeconds[sourceName] = self.sourceSeconds.get(sourceName,0) + time.perf_counter() - sourceStartTime
+
+    #bones or objects each armature or object read by the sampler has as targets
+    def sourceTargetCounts(self):
+        targetCounts = {}
+        for targetObject in self.targetObjects:
+            targetCounts[targetObject.name] = targetCounts.get(targetObject.name,0) + 1
+        return targetCounts
+
+    #world matrix of every target at a frame
+    #if a parentMatrices array is given, it is filled with the world matrix each target would have with no transform of its own
+    def sampleFrame(self,frameNumber,parentMatrices=None):
+        targetMatrices = numpy.empty((len(self.targetObjects),4,4),dtype=numpy.float32)
+        if(self.usePoseEvaluation == True):
+            for armatureSampler in self.armatureSamplers.values():
+                sourceStartTime = time.perf_counter()
+                armatureMatrix = armatureSampler['objectEvaluator'].evaluate(frameNumber)
+                if(parentMatrices is None):
+                    targetMatrices[armatureSampler['targetIndices']] = armatureMatrix @ armatureSampler['poseEvaluator'].evaluate(frameNumber)
+                else:
+                    poseMatrices, poseParentMatrices = armatureSampler['poseEvaluator'].evaluateWithParents(frameNumber)
+                    targetMatrices[armatureSampler['targetIndices']] = armatureMatrix @ poseMatrices
+                    parentMatrices[armatureSampler['targetIndices']] = armatureMatrix @ poseParentMatrices
+                self.addSourceTime(armatureSampler['object'].name,sourceStartTime)
+            for objectNumber in range(0,len(self.objectTargetIndices)):
+                sourceStartTime = time.perf_counter()
+                worldMatrix, parentMatrix = self.objectEvaluators[objectNumber].evaluateWithParent(frameNumber)
+                targetMatrices[self.objectTargetIndices[objectNumber]] = worldMatrix
+                if(parentMatrices is not None):
+                    parentMatrices[self.objectTargetIndices[objectNumber]] = parentMatrix
+                self.addSourceTime(self.targetObjects[self.objectTargetIndices[objectNumber]].name,sourceStartTime)
+        else:
+            if(bpy.context.scene.frame_current != frameNumber):
+                bpy.context.scene.frame_set(frameNumber)
+            for armatureSampler in self.armatureSamplers.values():
+                sourceStartTime = time.perf_counter()
+                armatureObject = armatureSampler['object']
+                armatureObject.pose.bones.foreach_get('matrix',armatureSampler['buffer'])
+                #matrices are read column by column, transpose to get rows
+                allPoseMatrices = armatureSampler['buffer'].reshape(-1,4,4).transpose(0,2,1)
+                armatureMatrix = numpy.array(armatureObject.matrix_world,dtype=numpy.float32)
+                targetMatrices[armatureSampler['targetIndices']] = armatureMatrix @ allPoseMatrices[armatureSampler['boneIndices']]
+                if(parentMatrices is not None):
+                    parentBoneIndices = numpy.array(armatureSampler['parentBoneIndices'])
+                    parentPoseMatrices = numpy.where((parentBoneIndices >= 0)[:,None,None],allPoseMatrices[parentBoneIndices],numpy.eye(4))
+                    parentMatrices[armatureSampler['targetIndices']] = armatureMatrix @ parentPoseMatrices @ numpy.array(armatureSampler['restMatrices'])
+                self.addSourceTime(armatureObject.name,sourceStartTime)
+            for targetNumber in self.objectTargetIndices:
+                sourceStartTime = time.perf_counter()
+                targetObject = self.targetObjects[targetNumber]
+                targetMatrices[targetNumber] = numpy.array(targetObject.matrix_world,dtype=numpy.float32)
+                if(parentMatrices is not None):
+                    #from the parent like JSPLINE_ObjectWorldEvaluator, inverting the object's own transform fails at zero scale
+                    #only object parents are baked directly, see JSPLINE_DirectBakeProblem
+                    parentMatrices[targetNumber] = numpy.eye(4)
+                    if(targetObject.parent != None):
+                        parentMatrices[targetNumber] = numpy.array(targetObject.parent.matrix_world) @ numpy.array(targetObject.matrix_parent_inverse)
+                self.addSourceTime(targetObject.name,sourceStartTime)
+        return targetMatrices
+
+#sampled world matrices of baked bones and objects, kept between bakes so a re-bake only samples what changed
+#each entry is keyed by object and bone name and holds the source fingerprint the matrices were sampled with
+#with a sample cache folder set, entries are also saved there and loaded back by later Blender sessions and other computers
+JSPLINE_sampleCache = {}
+
+#scene settings that change the baked empties of every bone and object
+JSPLINE_effectSettingNames = ['JSPLINERotationNoise','JSPLINELocationNoise','JSPLINENoiseType','JSPLINENoiseSeed','JSPLINENoisePeriod',
+    'JSPLINESmoothFilter','JSPLINESmoothFrames','JSPLINESmoothSpeedResponse','JSPLINESmoothPosInfluence','JSPLINESmoothRotInfluence',
+    'JSPLINEDelayPosInfluence','JSPLINEDelayRotInfluence','JSPLINEDelayStep','JSPLINEDelayFalloff','JSPLINELoopedAnimation','JSPLINELoopBlendFrames',
+    'JSPLINELocationTolerance','JSPLINERotationTolerance','JSPLINEBakeTarget']
+
+#settings a bone or object was baked with, it only needs baking again if these or its animation change
+def JSPLINE_EffectSettings(bakeTarget):
+    scene = bpy.context.scene
+    return [scene.frame_start,scene.frame_end,bakeTarget.frameDelay,bakeTarget.offsetLength] + [getattr(scene,settingName) for settingName in JSPLINE_effectSettingNames]
+
+#keyframe points of an F-curve as rows of frame, value, handles and interpolation settings
+def JSPLINE_ReadFCurveKeyframes(fcurve):
+    keyCount = len(fcurve.keyframe_points)
+    keyColumns = []
+    for propertyName,propertySize,propertyType in (('co',2,numpy.float32),('handle_left',2,numpy.float32),('handle_right',2,numpy.float32),
+            ('interpolation',1,numpy.int32),('easing',1,numpy.int32),('back',1,numpy.float32),('amplitude',1,numpy.float32),('period',1,numpy.float32)):
+        propertyValues = numpy.empty(keyCount*propertySize,dtype=propertyType)
+        fcurve.keyframe_points.foreach_get(propertyName,propertyValues)
+        keyColumns.append(propertyValues.reshape(keyCount,propertySize).astype(numpy.float64))
+    return numpy.concatenate(keyColumns,axis=1)
+
+#type and settable properties of an F-curve modifier, constraint or other RNA struct, with those of the items of its collections, for fingerprinting
+#properties pointing to other datablocks and skippedNames are left out, as are ones that only change how the interface shows it
+def JSPLINE_RNASettings(rnaStruct,skippedNames=()):
+    rnaSettings = [getattr(rnaStruct,'type',None)]
+    for rnaProperty in rnaStruct.bl_rna.properties:
+        if((rnaProperty.identifier in skippedNames) or (rnaProperty.identifier in ('rna_type','active','show_expanded'))):
+            continue
+        if(rnaProperty.type == 'COLLECTION'):
+            rnaSettings.append([rnaProperty.identifier,[JSPLINE_RNASettings(collectionItem) for collectionItem in getattr(rnaStruct,rnaProperty.identifier)]])
+        elif((rnaProperty.type != 'POINTER') and (rnaProperty.is_readonly == False)):
+            propertyValue = getattr(rnaStruct,rnaProperty.identifier)
+            if(getattr(rnaProperty,'is_array',False) == True):
+                propertyValue = list(propertyValue)
+            elif(isinstance(propertyValue,set) == True):
+                propertyValue = sorted(propertyValue)
+            rnaSettings.append([rnaProperty.identifier,propertyValue])
+    return rnaSettings
+
+#everything the sampled world matrix of a bone or object depends on, for finding what changed since it was last sampled
+#returns a hash of everything that changes the whole frame range, and the keyframes of every animated channel in the parent chain
+#bones and objects that need the whole scene updated to be sampled can't be fingerprinted and give None
+#solvedBoneCache keeps the solved bone names of armatures between calls for their other bones
+def JSPLINE_SourceFingerprint(animatedObject,boneName,solvedBoneCache):
+    rangeParts = []
+    channelKeyframes = {}
+    transformOwners = []
+    if(boneName != None):
+        poseBone = animatedObject.pose.bones[boneName]
+        solvedBoneNames = JSPLINE_CachedSolvedBoneNames(animatedObject,solvedBoneCache)
+        for chainBone in [poseBone] + list(poseBone.parent_recursive):
+            if(JSPLINE_PoseBoneEvaluationProblem(chainBone,solvedBoneNames) != None):
+                return None
+            transformOwners.append((animatedObject,chainBone,JSPLINE_PoseBoneDataPath(chainBone.name) + '.'))
+            rangeParts.append([chainBone.name,numpy.array(chainBone.bone.matrix_local).tolist(),chainBone.bone.use_connect])
+    chainObject = animatedObject
+    while(chainObject != None):
+        if(JSPLINE_ObjectEvaluationProblem(chainObject) != None):
+            return None
+        transformOwners.append((chainObject,chainObject,''))
+        rangeParts.append([chainObject.name,numpy.array(chainObject.matrix_parent_inverse).tolist()])
+        chainObject = chainObject.parent
+    for ownerObject,transformOwner,dataPathPrefix in transformOwners:
+        ownerAction = None
+        if(ownerObject.animation_data != None):
+            ownerAction = ownerObject.animation_data.action
+        #unanimated channels change every frame the same way
+        transformChannels = JSPLINE_TransformChannels(ownerAction,[transformOwner],[dataPathPrefix])
+        rangeParts.append([transformOwner.rotation_mode,numpy.delete(transformChannels.constantValues.ravel(),transformChannels.animatedSlots).tolist()])
+        for fcurve in transformChannels.animatedFCurves:
+            channelKeyframes[(ownerObject.name,fcurve.data_path,fcurve.array_index)] = JSPLINE_ReadFCurveKeyframes(fcurve)
+            #modifiers can change any frame, so they are part of the whole range
+            rangeParts.append([fcurve.data_path,fcurve.array_index,fcurve.extrapolation,[JSPLINE_RNASettings(fcurveModifier) for fcurveModifier in fcurve.modifiers]])
+    return zlib.crc32(repr(rangeParts).encode('utf-8')), channelKeyframes
+
+#first and last frame between which a channel evaluates differently with newKeyframes than with oldKeyframes, or None if nothing changed
+def JSPLINE_ChangedFrameRange(oldKeyframes,newKeyframes):
+    if((oldKeyframes.shape == newKeyframes.shape) and numpy.array_equal(oldKeyframes,newKeyframes)):
+        return None
+    #keys only in one of the versions, including neighbours whose automatic handles moved with them
+    changedRows = set(map(tuple,oldKeyframes.tolist())) ^ set(map(tuple,newKeyframes.tolist()))
+    if(len(changedRows) == 0):
+        return None
+    changedFrames = [keyRow[0] for keyRow in changedRows]
+    keyFrames = numpy.unique(numpy.concatenate([oldKeyframes[:,0],newKeyframes[:,0]]))
+    #curves change up to the next key on each side, and all the way out past the first and last keys
+    firstIndex = numpy.searchsorted(keyFrames,min(changedFrames)) - 1
+    lastIndex = numpy.searchsorted(keyFrames,max(changedFrames),side='right')
+    firstFrame = keyFrames[firstIndex] if firstIndex >= 0 else -math.inf
+    lastFrame = keyFrames[lastIndex] if lastIndex < len(keyFrames) else math.inf
+    return firstFrame, lastFrame
+
+#frames of the scene frame range a bone or object needs sampled again, as a first and last frame, or None if its cached samples are still right
+def JSPLINE_FindChangedFrames(bakeTarget):
+    scene = bpy.context.scene
+    cacheEntry = JSPLINE_GetCacheEntry(bakeTarget)
+    wholeRange = (scene.frame_start,scene.frame_end)
+    if((bakeTarget.sourceFingerprint == None) or (cacheEntry == None) or (cacheEntry['frameRange'] != wholeRange) or (cacheEntry['rangeFingerprint'] != bakeTarget.sourceFingerprint[0])):
+        return wholeRange
+    oldChannels = cacheEntry['channelKeyframes']
+    newChannels = bakeTarget.sourceFingerprint[1]
+    firstFrame = math.inf
+    lastFrame = -math.inf
+    for channelId in set(oldChannels) | set(newChannels):
+        if((channelId in oldChannels) and (channelId in newChannels)):
+            changedRange = JSPLINE_ChangedFrameRange(oldChannels[channelId],newChannels[channelId])
+        else:
+            changedRange = (-math.inf,math.inf)
+        if(changedRange != None):
+            firstFrame = min(firstFrame,changedRange[0])
+            lastFrame = max(lastFrame,changedRange[1])
+    if(firstFrame > lastFrame):
+        return None
+    firstFrame = max(scene.frame_start,math.floor(firstFrame)) if firstFrame != -math.inf else scene.frame_start
+    lastFrame = min(scene.frame_end,math.ceil(lastFrame)) if lastFrame != math.inf else scene.frame_end
+    if(firstFrame > lastFrame):
+        return None
+    return (firstFrame,lastFrame)
+
+#keep sampled world matrices of the bones and objects of a finished bake for the next bake
+def JSPLINE_CacheSamples(bakeJob,sampledMatrices):
+    scene = bpy.context.scene
+    cacheFolder = JSPLINE_SampleCacheFolder()
+    for targetNumber in range(0,len(bakeJob.bakeTargets)):
+        bakeTarget = bakeJob.bakeTargets[targetNumber]
+        cacheKey = (bakeTarget.animatedObject.name,bakeTarget.boneName)
+        if(bakeTarget.sourceFingerprint == None):
+            JSPLINE_sampleCache.pop(cacheKey,None)
+            continue
+        JSPLINE_sampleCache[cacheKey] = {'frameRange':(scene.frame_start,scene.frame_end),'rangeFingerprint':bakeTarget.sourceFingerprint[0],
+            'channelKeyframes':bakeTarget.sourceFingerprint[1],'effectSettings':bakeTarget.effectSettings,'effectFingerprint':None,'sampledMatrices':sampledMatrices[:,targetNumber].copy()}
+        if(cacheFolder != None):
+            JSPLINE_SaveCacheEntry(cacheFolder,cacheKey,JSPLINE_sampleCache[cacheKey])
+
+#keep what the empties and constraints of a finished bake are like, a later bake only keeps them if they are still the same
+def JSPLINE_CacheEffectFingerprints(bakeJob):
+    for bakeTarget in bakeJob.bakeTargets:
+        cacheKey = (bakeTarget.animatedObject.name,bakeTarget.boneName)
+        if(cacheKey in JSPLINE_sampleCache):
+            JSPLINE_sampleCache[cacheKey]['effectFingerprint'] = bakeTarget.effectFingerprint()
+
+#cached samples of a bone or object, from memory or else from the sample cache folder, or None
+#a saved entry is also tried when the one in memory was sampled from different animation, another session may have sampled the current animation
+def JSPLINE_GetCacheEntry(bakeTarget):
+    cacheKey = (bakeTarget.animatedObject.name,bakeTarget.boneName)
+    cacheEntry = JSPLINE_sampleCache.get(cacheKey)
+    if((cacheEntry != None) and ((bakeTarget.sourceFingerprint == None) or (cacheEntry['rangeFingerprint'] == bakeTarget.sourceFingerprint[0]))):
+        return cacheEntry
+    cacheFolder = JSPLINE_SampleCacheFolder()
+    if(cacheFolder != None):
+        savedEntry = JSPLINE_LoadCacheEntry(cacheFolder,cacheKey)
+        if((savedEntry != None) and ((cacheEntry == None) or (bakeTarget.sourceFingerprint == None) or (savedEntry['rangeFingerprint'] == bakeTarget.sourceFingerprint[0]))):
+            JSPLINE_sampleCache[cacheKey] = savedEntry
+            cacheEntry = savedEntry
+    return cacheEntry
+
+#folder to save sample caches in, or None when they are only kept in memory, unsaved .blend files have nothing to key saved caches by
+def JSPLINE_SampleCacheFolder():
+    if((bpy.context.scene.JSPLINESampleCacheFolder == "") or (bpy.data.filepath == "")):
+        return None
+    return bpy.path.abspath(bpy.context.scene.JSPLINESampleCacheFolder)
+
+#what a saved sample cache belongs to, the .blend file and the object and bone names
+def JSPLINE_CacheEntryOwner(cacheKey):
+    return [os.path.normcase(os.path.abspath(bpy.data.filepath)),cacheKey[0],cacheKey[1]]
+
+#saved sample caches are a JSON header and an .npy file of world matrices shaped (frames, 4, 4) that can be memory mapped
+#the header names the .npy file it describes, so a header is never read next to matrices written for another one
+def JSPLINE_SaveCacheEntry(cacheFolder,cacheKey,cacheEntry):
+    cacheOwner = JSPLINE_CacheEntryOwner(cacheKey)
+    cacheName = "JSPLINE_" + format(zlib.crc32(repr(cacheOwner).encode('utf-8')),'08x')
+    sampledMatrices = numpy.ascontiguousarray(cacheEntry['sampledMatrices'],dtype=numpy.float32)
+    samplesFileName = cacheName + "_" + format(zlib.crc32(sampledMatrices.tobytes()),'08x') + ".npy"
+    cacheHeader = {'owner':cacheOwner,'frameRange':list(cacheEntry['frameRange']),'rangeFingerprint':cacheEntry['rangeFingerprint'],'samplesFile':samplesFileName,
+        'channelKeyframes':[[channelId[0],channelId[1],channelId[2],channelKeys.tolist()] for channelId,channelKeys in cacheEntry['channelKeyframes'].items()]}
+    try:
+        os.makedirs(cacheFolder,exist_ok=True)
+        #replace whole files at once, other Blender sessions may be reading them
+        previousSamplesFile = None
+        if(os.path.exists(os.path.join(cacheFolder,cacheName + ".json")) == True):
+            with open(os.path.join(cacheFolder,cacheName + ".json"),'r') as headerFile:
+                previousSamplesFile = json.load(headerFile).get('samplesFile')
+        with open(os.path.join(cacheFolder,samplesFileName + ".tmp"),'wb') as samplesFile:
+            numpy.save(samplesFile,sampledMatrices)
+        os.replace(os.path.join(cacheFolder,samplesFileName + ".tmp"),os.path.join(cacheFolder,samplesFileName))
+        with open(os.path.join(cacheFolder,cacheName + ".json.tmp"),'w') as headerFile:
+            json.dump(cacheHeader,headerFile)
+        os.replace(os.path.join(cacheFolder,cacheName + ".json.tmp"),os.path.join(cacheFolder,cacheName + ".json"))
+        if((previousSamplesFile != None) and (previousSamplesFile != samplesFileName) and (os.path.exists(os.path.join(cacheFolder,previousSamplesFile)) == True)):
+            os.remove(os.path.join(cacheFolder,previousSamplesFile))
+    except (OSError,ValueError) as cacheError:
+        JSPLINE_logger.warning("couldn't save sample cache %s: %s",cacheName,cacheError)
+
+#load a saved sample cache, with its matrices memory mapped rather than read in, or None if there isn't a usable one
+#saved entries don't keep the settings they were baked with, the .blend file may have been saved before that bake, so they are always baked again from the samples
+def JSPLINE_LoadCacheEntry(cacheFolder,cacheKey):
+    cacheOwner = JSPLINE_CacheEntryOwner(cacheKey)
+    cacheName = "JSPLINE_" + format(zlib.crc32(repr(cacheOwner).encode('utf-8')),'08x')
+    try:
+        with open(os.path.join(cacheFolder,cacheName + ".json"),'r') as headerFile:
+            cacheHeader = json.load(headerFile)
+        if(cacheHeader['owner'] != cacheOwner):
+            return None
+        frameRange = tuple(cacheHeader['frameRange'])
+        sampledMatrices = numpy.load(os.path.join(cacheFolder,cacheHeader['samplesFile']),mmap_mode='r')
+        channelKeyframes = {}
+        for ownerName,dataPath,arrayIndex,channelKeys in cacheHeader['channelKeyframes']:
+            channelKeyframes[(ownerName,dataPath,arrayIndex)] = numpy.array(channelKeys,dtype=numpy.float64).reshape(-1,11)
+    except (OSError,ValueError,KeyError,TypeError):
+        return None
+    if(sampledMatrices.shape != (frameRange[1]-frameRange[0]+1,4,4)):
+        return None
+    return {'frameRange':frameRange,'rangeFingerprint':cacheHeader['rangeFingerprint'],'channelKeyframes':channelKeyframes,'effectSettings':None,'effectFingerprint':None,'sampledMatrices':sampledMatrices}
+
+#set keyframes of an F-curve from arrays in one go, replacing any existing keyframes on the same frames or inside replacedFrames
+#keys with a slope get aligned handles a third of the way to their neighbouring keys, keys without one get auto clamped handles
+def JSPLINE_SetFCurveKeyframes(fcurve,frameNumbers,keyValues,interpolation='BEZIER',keySlopes=None,replacedFrames=None):
+    keyframeProperties = bpy.types.Keyframe.bl_rna.properties
+    keyCount = len(frameNumbers)
+    keyPoints = numpy.column_stack([frameNumbers,keyValues]).astype(numpy.float32)
+    if(keySlopes is None):
+        keySlopes = numpy.full(keyCount,numpy.nan,dtype=numpy.float32)
+    keySlopes = numpy.asarray(keySlopes,dtype=numpy.float32)
+    autoClampedHandle = keyframeProperties['handle_left_type'].enum_items['AUTO_CLAMPED'].value
+    alignedHandle = keyframeProperties['handle_left_type'].enum_items['ALIGNED'].value
+    handleTypes = numpy.where(numpy.isnan(keySlopes),autoClampedHandle,alignedHandle)
+    keyInterpolations = numpy.full(keyCount,keyframeProperties['interpolation'].enum_items[interpolation].value)
+    leftHandles = numpy.zeros((keyCount,2),dtype=numpy.float32)
+    rightHandles = numpy.zeros((keyCount,2),dtype=numpy.float32)
+    existingKeyCount = len(fcurve.keyframe_points)
+    if(existingKeyCount > 0):
+        #merge with existing keyframes that are not replaced, keeping their handles and interpolation as they were
+        existingPoints = numpy.empty(existingKeyCount*2,dtype=numpy.float32)
+        fcurve.keyframe_points.foreach_get('co',existingPoints)
+        existingPoints = existingPoints.reshape(-1,2)
+        existingKept = numpy.isin(existingPoints[:,0],keyPoints[:,0]) == False
+        if(replacedFrames != None):
+            existingKept &= (existingPoints[:,0] < replacedFrames[0]) | (existingPoints[:,0] > replacedFrames[1])
+        existingLeftHandles = numpy.empty(existingKeyCount*2,dtype=numpy.float32)
+        existingRightHandles = numpy.empty(existingKeyCount*2,dtype=numpy.float32)
+        fcurve.keyframe_points.foreach_get('handle_left',existingLeftHandles)
+        fcurve.keyframe_points.foreach_get('handle_right',existingRightHandles)
+        existingEnums = {}
+        for enumName in ['interpolation','handle_left_type','handle_right_type']:
+            existingEnums[enumName] = numpy.empty(existingKeyCount,dtype=numpy.int32)
+            fcurve.keyframe_points.foreach_get(enumName,existingEnums[enumName])
+        keyPoints = numpy.concatenate([existingPoints[existingKept],keyPoints])
+        keySlopes = numpy.concatenate([numpy.full(numpy.count_nonzero(existingKept),numpy.nan,dtype=numpy.float32),keySlopes])
+        leftHandles = numpy.concatenate([existingLeftHandles.reshape(-1,2)[existingKept],leftHandles])
+        rightHandles = numpy.concatenate([existingRightHandles.reshape(-1,2)[existingKept],rightHandles])
+        keyInterpolations = numpy.concatenate([existingEnums['interpolation'][existingKept],keyInterpolations])
+        leftHandleTypes = numpy.concatenate([existingEnums['handle_left_type'][existingKept],handleTypes])
+        rightHandleTypes = numpy.concatenate([existingEnums['handle_right_type'][existingKept],handleTypes])
+        sortOrder = numpy.argsort(keyPoints[:,0],kind='stable')
+        keyPoints, keySlopes, leftHandles, rightHandles = keyPoints[sortOrder], keySlopes[sortOrder], leftHandles[sortOrder], rightHandles[sortOrder]
+        keyInterpolations, leftHandleTypes, rightHandleTypes = keyInterpolations[sortOrder], leftHandleTypes[sortOrder], rightHandleTypes[sortOrder]
+        fcurve.keyframe_points.clear()
+    else:
+        leftHandleTypes = handleTypes
+        rightHandleTypes = handleTypes
+    keyCount = len(keyPoints)
+    #handles of keys with slopes reach a third of the way to the neighbouring keys
+    keyGaps = numpy.diff(keyPoints[:,0])
+    gapsBefore = numpy.concatenate([keyGaps[:1],keyGaps]) if keyCount > 1 else numpy.ones(keyCount,dtype=numpy.float32)
+    gapsAfter = numpy.concatenate([keyGaps,keyGaps[-1:]]) if keyCount > 1 else numpy.ones(keyCount,dtype=numpy.float32)
+    slopedKeys = numpy.isnan(keySlopes) == False
+    leftHandles[slopedKeys] = keyPoints[slopedKeys] - numpy.column_stack([gapsBefore,gapsBefore * keySlopes])[slopedKeys] / 3
+    rightHandles[slopedKeys] = keyPoints[slopedKeys] + numpy.column_stack([gapsAfter,gapsAfter * keySlopes])[slopedKeys] / 3
+    fcurve.keyframe_points.add(keyCount)
+    fcurve.keyframe_points.foreach_set('co',keyPoints.ravel())
+    fcurve.keyframe_points.foreach_set('interpolation',keyInterpolations)
+    fcurve.keyframe_points.foreach_set('handle_left_type',leftHandleTypes)
+    fcurve.keyframe_points.foreach_set('handle_right_type',rightHandleTypes)
+    fcurve.keyframe_points.foreach_set('handle_left',leftHandles.ravel())
+    fcurve.keyframe_points.foreach_set('handle_right',rightHandles.ravel())
+    #recalculate auto handles once for all keyframes
+    fcurve.update()
+
+#collects keyframes for many objects and channels, then writes each F-curve once
+#instead of resolving and inserting into F-curves for every single keyframe
+#existing keyframes inside replacedFrames, a (first, last) frame pair, are removed from every written F-curve
+#cyclic F-curves get a cycles modifier, so looped animation keeps repeating past its keyframes
+#the cycles modifier repeats from the first to the last keyframe, so every other keyframe is removed from cyclic F-curves
+class JSPLINE_KeyframeWriter():
+    def __init__(self,replacedFrames=None,cyclic=False):
+        self.replacedFrames = replacedFrames
+        self.cyclic = cyclic
+        self.animatedObjects = {}
+        self.channelKeys = {}
+
+    #add keyframes on several frames at once, values has a row of channel values for each frame
+    #keySlopes can give the slope of the curve at each keyframe in the same layout as values, otherwise handles are auto clamped
+    def addKeys(self,animatedObject,dataPath,frameNumbers,keyValues,groupName=None,keySlopes=None):
+        if(len(frameNumbers) == 0):
+            return
+        channelId = (animatedObject.name,dataPath)
+        if((channelId in self.channelKeys) == False):
+            self.animatedObjects[animatedObject.name] = animatedObject
+            self.channelKeys[channelId] = {'groupName':groupName,'frameNumbers':[],'keyValues':[],'keySlopes':[]}
+        self.channelKeys[channelId]['frameNumbers'].append(numpy.asarray(frameNumbers,dtype=numpy.float32).reshape(-1))
+        self.channelKeys[channelId]['keyValues'].append(numpy.asarray(keyValues,dtype=numpy.float32).reshape(len(self.channelKeys[channelId]['frameNumbers'][-1]),-1))
+        if(keySlopes is None):
+            keySlopes = numpy.full(self.channelKeys[channelId]['keyValues'][-1].shape,numpy.nan)
+        self.channelKeys[channelId]['keySlopes'].append(numpy.asarray(keySlopes,dtype=numpy.float32).reshape(self.channelKeys[channelId]['keyValues'][-1].shape))
+
+    #add a keyframe for a single frame
+    def addKey(self,animatedObject,dataPath,frameNumber,keyValue):
+        self.addKeys(animatedObject,dataPath,[frameNumber],[keyValue])
+
+    #create F-curves and write all collected keyframes into them
+    def write(self):
+        for channelId in self.channelKeys:
+            animatedObject = self.animatedObjects[channelId[0]]
+            channelKeys = self.channelKeys[channelId]
+            frameNumbers = numpy.concatenate(channelKeys['frameNumbers'])
+            keyValues = numpy.concatenate(channelKeys['keyValues'])
+            keySlopes = numpy.concatenate(channelKeys['keySlopes'])
+            #later keys replace earlier keys on the same frame, like keyframe_insert does
+            frameNumbers, lastKeyIndices = numpy.unique(frameNumbers[::-1],return_index=True)
+            keyValues = keyValues[::-1][lastKeyIndices]
+            keySlopes = keySlopes[::-1][lastKeyIndices]
+            if(animatedObject.animation_data == None):
+                animatedObject.animation_data_create()
+            if(animatedObject.animation_data.action == None):
+                animatedObject.animation_data.action = bpy.data.actions.new(animatedObject.name + "Action")
+            action = animatedObject.animation_data.action
+            for arrayIndex in range(0,keyValues.shape[1]):
+                fcurve = action.fcurves.find(channelId[1],index=arrayIndex)
+                if(fcurve == None):
+                    if(channelKeys['groupName'] != None):
+                        fcurve = action.fcurves.new(channelId[1],index=arrayIndex,action_group=channelKeys['groupName'])
+                    else:
+                        fcurve = action.fcurves.new(channelId[1],index=arrayIndex)
+                replacedFrames = self.replacedFrames
+                if(self.cyclic == True):
+                    replacedFrames = (-math.inf,math.inf)
+                JSPLINE_SetFCurveKeyframes(fcurve,frameNumbers,keyValues[:,arrayIndex],keySlopes=keySlopes[:,arrayIndex],replacedFrames=replacedFrames)
+                if((self.cyclic == True) and (any(curveModifier.type == 'CYCLES' for curveModifier in fcurve.modifiers) == False)):
+                    fcurve.modifiers.new('CYCLES')
+        self.channelKeys = {}
+
+#bake engine stepping frame by frame, positioning delay empties as it goes and keyframing all empties once all frames are stepped through
+#smoothing empties don't depend on earlier frames, so they are computed from the sampled bones and objects in one go when baking finishes
+class JSPLINE_PerFrameBakeEngine():
+    def __init__(self,bakeJob):
+        scene = bpy.context.scene
+        self.bakeJob = bakeJob
+        self.bakeDirect = False
+        #frames to bake, always the whole frame range
+        self.firstFrame = scene.frame_start
+        self.lastFrame = scene.frame_end
+        emptyCount = len(bakeJob.emptyObjects)
+        frameCount = scene.frame_end - scene.frame_start + 1
+        self.delayEmpties = numpy.flatnonzero(bakeJob.isDelayEmpty)
+        #history slots for delay empties, enough frames for the longest delay
+        self.historyIndices = numpy.cumsum(bakeJob.isDelayEmpty) - 1
+        self.transformHistory = JSPLINE_TransformHistory(scene.JSPLINEMaxFrameDelay+1,len(self.delayEmpties))
+        #noise of every empty for the whole frame range, the same noise the two-pass engine bakes
+        self.noiseOffsets = bakeJob.generateNoise(frameCount)
+        #world matrices of every target, and transforms of delay empties on every frame and whether they can be keyed
+        self.sampledMatrices = numpy.zeros((frameCount,len(bakeJob.targetObjects),4,4),dtype=numpy.float32)
+        self.locations = numpy.zeros((frameCount,emptyCount,3),dtype=numpy.float32)
+        self.rotations = numpy.zeros((frameCount,emptyCount,4),dtype=numpy.float32)
+        self.keyableFrames = numpy.ones((frameCount,emptyCount),dtype=bool)
+        self.bakedFrameCount = 0
+        #frames stepped through in this bake, for the bake profile
+        self.steppedFrameCount = 0
+        #whether the last computed effect closes a loop, see JSPLINE_IsCyclicBake
+        self.bakeCyclic = False
+        self.targetSampler = JSPLINE_TargetSampler(bakeJob.targetObjects,bakeJob.targetBoneNames)
+
+    #position each delay empty at the current frame and record its transform
+    def bakeFrame(self,frameNumber):
+        scene = bpy.context.scene
+        frameIndex = frameNumber - scene.frame_start
+        with JSPLINE_MeasurePhase('evaluation'):
+            targetMatrices = self.targetSampler.sampleFrame(frameNumber)
+        self.sampledMatrices[frameIndex] = targetMatrices
+        with JSPLINE_MeasurePhase('effect math'):
+            self.positionDelayEmpties(frameNumber,targetMatrices)
+        self.bakedFrameCount = frameIndex + 1
+        self.steppedFrameCount += 1
+
+    #position each delay empty for a frame from the world matrices of the targets, and record its transform
+    def positionDelayEmpties(self,frameNumber,targetMatrices):
+        bakeJob = self.bakeJob
+        frameIndex = frameNumber - bpy.context.scene.frame_start
+        for emptyNumber in self.delayEmpties:
+            bakingEmpty = bakeJob.emptyObjects[emptyNumber]
+            bakeTarget = bakeJob.bakeTargets[bakeJob.emptyTargetIndices[emptyNumber]]
+            JSPLINE_PositionEmptyForCurrentFrame(bakingEmpty,bakeTarget,bakeJob.emptyTypes[emptyNumber],mathutils.Matrix(targetMatrices[bakeJob.emptyTargetIndices[emptyNumber]].tolist()))
+            #store transform history before delaying
+            historyIndex = self.historyIndices[emptyNumber]
+            self.transformHistory.record(frameNumber,historyIndex,bakingEmpty)
+            #if the required delay is more than the elapsed frames, no keyframe can be recorded yet
+            #delay function will determine this
+            canRecordKeyFrame = JSPLINE_DelayEmpty(bakingEmpty,bakeTarget.frameDelay,self.transformHistory,historyIndex)
+            #add empty noise if possible
+            if(bakeJob.noiseAmounts[emptyNumber] > 0):
+                bakingEmpty.location += mathutils.Vector(self.noiseOffsets[frameIndex,emptyNumber])
+            self.locations[frameIndex,emptyNumber] = bakingEmpty.location
+            self.rotations[frameIndex,emptyNumber] = bakingEmpty.rotation_quaternion
+            self.keyableFrames[frameIndex,emptyNumber] = canRecordKeyFrame
+
+    #keyframe all recorded frames once all frames have been stepped through, or baking was stopped
+    def finishBake(self,bakeCompleted):
+        scene = bpy.context.scene
+        bakeJob = self.bakeJob
+        frameCount = self.bakedFrameCount
+        if(frameCount == 0):
+            return
+        with JSPLINE_MeasurePhase('effect math'):
+            locations, rotations, locationKeys, rotationKeys = self.computeEmptyTransforms(bakeCompleted)
+        frameNumbers = numpy.arange(scene.frame_start,scene.frame_start+len(locations))
+        bakeJob.writeEmptyKeyframes(frameNumbers,locations,rotations,locationKeys,rotationKeys,self.bakeCyclic)
+
+    #delay, noise, smoothing and keyframes for all empties over the recorded frames
+    def computeEmptyTransforms(self,bakeCompleted):
+        bakeJob = self.bakeJob
+        frameCount = self.bakedFrameCount
+        self.bakeCyclic = JSPLINE_IsCyclicBake(bpy.context.scene,bakeCompleted,frameCount)
+        #smoothing empties follow their targets with noise, delay empties use what was recorded while stepping
+        locations, rotations = bakeJob.findEmptyTransforms(self.sampledMatrices[:frameCount])
+        delayedLocations = self.locations[:frameCount].copy()
+        delayedRotations = self.rotations[:frameCount].copy()
+        keyableFrames = self.keyableFrames[:frameCount].copy()
+        if(self.bakeCyclic == True):
+            #frames stepped before the delay had enough history delay across the loop instead, from the frames recorded at the end
+            loopLocations, loopRotations = JSPLINE_DelayEmptyTransforms(locations,rotations,bakeJob.emptyDelays,bakeJob.isDelayEmpty,True)[:2]
+            earlyFrames = keyableFrames == False
+            delayedLocations[earlyFrames] = loopLocations[earlyFrames] + self.noiseOffsets[:frameCount][earlyFrames]
+            delayedRotations[earlyFrames] = loopRotations[earlyFrames]
+            keyableFrames[:] = True
+        locations += self.noiseOffsets[:frameCount]
+        locations[:,self.delayEmpties] = delayedLocations[:,self.delayEmpties]
+        rotations[:,self.delayEmpties] = delayedRotations[:,self.delayEmpties]
+        requiredKeys = numpy.zeros_like(keyableFrames)
+        locations, rotations = bakeJob.smoothEmptyTransforms(locations,rotations)
+        if(self.bakeCyclic == True):
+            locations, rotations = JSPLINE_BlendAndCloseLoop(locations,rotations,bpy.context.scene.JSPLINELoopBlendFrames)
+            keyableFrames = JSPLINE_CloseLoop(keyableFrames)
+            requiredKeys = JSPLINE_CloseLoop(requiredKeys)
+        rotations, locationKeys, rotationKeys = bakeJob.findEmptyKeyframes(locations,rotations,keyableFrames,requiredKeys,True,self.bakeCyclic)
+        return locations, rotations, locationKeys, rotationKeys
+
+#bake engine sampling every target over the whole frame range first, then computing all empties at once
+#when the bake job bakes directly, no empties exist and the effect is keyframed into the targets themselves
+#only frames from the first to the last of sampledFrames are sampled, the rest come from samples cached by an earlier bake
+class JSPLINE_TwoPassBakeEngine():
+    def __init__(self,bakeJob,sampledFrames=None):
+        self.bakeJob = bakeJob
+        self.bakeDirect = bakeJob.bakeDirect
+        self.frameStart = bpy.context.scene.frame_start
+        self.frameEnd = bpy.context.scene.frame_end
+        self.firstFrame = self.frameStart
+        self.lastFrame = self.frameEnd
+        if(sampledFrames != None):
+            self.firstFrame, self.lastFrame = sampledFrames
+        #several empties share the same bone or object, so only sample each target once
+        self.targetObjects = bakeJob.targetObjects
+        self.targetBoneNames = bakeJob.targetBoneNames
+        self.targetSampler = JSPLINE_TargetSampler(self.targetObjects,self.targetBoneNames)
+        #world matrix of every target for every frame in the range
+        self.sampledMatrices = numpy.zeros((self.frameEnd-self.frameStart+1,len(self.targetObjects),4,4),dtype=numpy.float32)
+        self.sampledFrameCount = 0
+        #frames sampled in this bake, not counting cached frames, for the bake profile
+        self.steppedFrameCount = 0
+        self.bakeCyclic = False
+        if((self.firstFrame != self.frameStart) or (self.lastFrame != self.frameEnd)):
+            for targetNumber in range(0,len(bakeJob.bakeTargets)):
+                bakeTarget = bakeJob.bakeTargets[targetNumber]
+                cacheEntry = JSPLINE_GetCacheEntry(bakeTarget)
+                if((cacheEntry != None) and (cacheEntry['frameRange'] == (self.frameStart,self.frameEnd))):
+                    self.sampledMatrices[:,targetNumber] = cacheEntry['sampledMatrices']
+            #cached frames before the first sampled frame count as sampled already
+            self.sampledFrameCount = max(min(self.firstFrame,self.frameEnd+1) - self.frameStart,0)
+        if(self.bakeDirect == True):
+            #world matrix of every target without its own transform, for turning baked world matrices back into keyframes
+            self.sampledParentMatrices = numpy.zeros_like(self.sampledMatrices)
+            self.findTargetHierarchy()
+
+    #nearest parent of each target that is baked as well, and targets grouped so parents come before their children
+    def findTargetHierarchy(self):
+        targetIndices = {}
+        for targetNumber in range(0,len(self.targetObjects)):
+            targetIndices[(self.targetObjects[targetNumber].name,self.targetBoneNames[targetNumber])] = targetNumber
+        self.targetAncestorIndices = numpy.full(len(self.targetObjects),-1,dtype=numpy.int64)
+        for targetNumber in range(0,len(self.targetObjects)):
+            targetObject = self.targetObjects[targetNumber]
+            if(self.targetBoneNames[targetNumber] != None):
+                #bones follow bones of the same armature
+                for chainBone in targetObject.pose.bones[self.targetBoneNames[targetNumber]].parent_recursive:
+                    if((targetObject.name,chainBone.name) in targetIndices):
+                        self.targetAncestorIndices[targetNumber] = targetIndices[(targetObject.name,chainBone.name)]
+                        break
+            else:
+                chainObject = targetObject.parent
+                while(chainObject != None):
+                    if((chainObject.name,None) in targetIndices):
+                        self.targetAncestorIndices[targetNumber] = targetIndices[(chainObject.name,None)]
+                        break
+                    chainObject = chainObject.parent
+        self.targetDepthLevels = JSPLINE_FindDepthLevels(self.targetAncestorIndices)
+
+    #first pass, store world matrices of all targets for the current frame
+    def bakeFrame(self,frameNumber):
+        frameIndex = frameNumber - self.frameStart
+        with JSPLINE_MeasurePhase('evaluation'):
+            if(self.bakeDirect == True):
+                self.sampledMatrices[frameIndex] = self.targetSampler.sampleFrame(frameNumber,self.sampledParentMatrices[frameIndex])
+            else:
+                self.sampledMatrices[frameIndex] = self.targetSampler.sampleFrame(frameNumber)
+        self.sampledFrameCount = frameIndex + 1
+        self.steppedFrameCount += 1
+
+    #second pass, compute delay, noise, smoothing and keyframes for all empties over all sampled frames
+    #cyclic bakes of looped animation get a closing frame after the last sampled frame, see JSPLINE_ComputeEmptyEffect
+    def computeEmptyTransforms(self,bakeCompleted,reduceKeys=True):
+        bakeJob = self.bakeJob
+        frameCount = self.sampledFrameCount
+        self.bakeCyclic = JSPLINE_IsCyclicBake(bpy.context.scene,bakeCompleted,frameCount)
+        #seeded noise for the whole frame range at once
+        locations, rotations, keyableFrames, requiredKeys = JSPLINE_ComputeEmptyEffect(self.sampledMatrices[:frameCount],bakeJob.generateNoise(frameCount),bakeJob,bpy.context.scene,self.bakeCyclic)
+        rotations, locationKeys, rotationKeys = bakeJob.findEmptyKeyframes(locations,rotations,keyableFrames,requiredKeys,reduceKeys,self.bakeCyclic)
+        return locations, rotations, locationKeys, rotationKeys
+
+    #write computed transforms into keyframes for every empty
+    def finishBake(self,bakeCompleted):
+        if(bakeCompleted == True):
+            #frames after the last sampled frame are cached, keep all samples for the next bake
+            self.sampledFrameCount = len(self.sampledMatrices)
+            if(self.bakeDirect == False):
+                JSPLINE_CacheSamples(self.bakeJob,self.sampledMatrices)
+        if((self.sampledFrameCount == 0) or (len(self.targetObjects) == 0)):
+            return
+        with JSPLINE_MeasurePhase('effect math'):
+            locations, rotations, locationKeys, rotationKeys = self.computeEmptyTransforms(bakeCompleted)
+        if(self.bakeDirect == True):
+            self.writeTargetKeyframes(locations,locationKeys)
+            return
+        self.bakeJob.writeEmptyKeyframes(numpy.arange(self.frameStart,self.frameStart+len(locations)),locations,rotations,locationKeys,rotationKeys,self.bakeCyclic)
+        if(bakeCompleted == True):
+            JSPLINE_CacheEffectFingerprints(self.bakeJob)
+
+    #matrices of every target relative to its parent with the effect of the computed empties applied, shaped (frames, targets, 4, 4)
+    def computeTargetBases(self,emptyLocations,locationKeys):
+        frameCount = self.sampledFrameCount
+        return JSPLINE_ApplyEffectToTargets(self.sampledMatrices[:frameCount],self.sampledParentMatrices[:frameCount],self.targetAncestorIndices,self.targetDepthLevels,
+            self.bakeJob.targetEmptyIndices,emptyLocations,locationKeys,JSPLINE_GetConstraintInfluences(),self.bakeCyclic)
+
+    #apply the effect of the computed empties straight to every target and keyframe the result, with the fewest keyframes within the keyframe tolerances
+    #cyclic bakes key a closing frame repeating the first frame, so the F-curves can repeat
+    def writeTargetKeyframes(self,emptyLocations,locationKeys):
+        cyclic = self.bakeCyclic
+        #split world matrices back into location, rotation and scale relative to each target's parent
+        with JSPLINE_MeasurePhase('effect math'):
+            basisMatrices = self.computeTargetBases(emptyLocations,locationKeys)
+        locations = basisMatrices[...,:3,3]
+        scales = numpy.linalg.norm(basisMatrices[...,:3,:3],axis=-2)
+        quaternions = JSPLINE_MakeQuaternionsContinuous(JSPLINE_MatricesToQuaternions(basisMatrices[...,:3,:3]))
+        if(cyclic == True):
+            locations = JSPLINE_CloseLoop(locations)
+            scales = JSPLINE_CloseLoop(scales)
+            quaternions = JSPLINE_CloseLoop(quaternions,quaternions=True)
+        frameCount = len(locations)
+        frameNumbers = numpy.arange(self.frameStart,self.frameStart+frameCount)
+        #keep the fewest keyframes within the keyframe tolerances, scale is measured by how far the end of each bone or object moves
+        scene = bpy.context.scene
+        allFrames = numpy.ones((frameCount,len(self.targetObjects)),dtype=bool)
+        noFrames = numpy.zeros_like(allFrames)
+        offsetLengths = numpy.array([bakeTarget.offsetLength if bakeTarget.offsetLength > 0 else 1 for bakeTarget in self.bakeJob.bakeTargets])
+        with JSPLINE_MeasurePhase('keyframe reduction'):
+            targetLocationKeys = JSPLINE_ReduceKeyframes(locations,allFrames,noFrames,JSPLINE_LocationErrors,scene.JSPLINELocationTolerance,cyclic)
+            targetScaleKeys = JSPLINE_ReduceKeyframes(scales,allFrames,noFrames,JSPLINE_LocationErrors,scene.JSPLINELocationTolerance,cyclic,offsetLengths)
+        locationSlopes = JSPLINE_KeyframeSlopes(targetLocationKeys,locations,cyclic)
+        scaleSlopes = JSPLINE_KeyframeSlopes(targetScaleKeys,scales,cyclic)
+        #existing keyframes of the baked frames are replaced, including frames that don't need keyframes any more
+        keyframeWriter = JSPLINE_KeyframeWriter((self.frameStart,self.frameStart+frameCount-1),cyclic)
+        #rotation values of every target are read on this thread, then their keyframes are reduced by the worker threads
+        rotationChannels = []
+        for targetNumber in range(0,len(self.targetObjects)):
+            targetObject = self.targetObjects[targetNumber]
+            boneName = self.targetBoneNames[targetNumber]
+            transformOwner = targetObject
+            dataPathPrefix = ''
+            if(boneName != None):
+                transformOwner = targetObject.pose.bones[boneName]
+                dataPathPrefix = JSPLINE_PoseBoneDataPath(boneName) + '.'
+            locationKeys = targetLocationKeys[:,targetNumber]
+            keyframeWriter.addKeys(targetObject,dataPathPrefix + "location",frameNumbers[locationKeys],locations[locationKeys,targetNumber],boneName,locationSlopes[locationKeys,targetNumber])
+            rotationMode = transformOwner.rotation_mode
+            if(rotationMode == 'QUATERNION'):
+                rotationPath = "rotation_quaternion"
+                rotationValues = quaternions[:,targetNumber]
+                findRotationErrors = JSPLINE_QuaternionErrors
+            elif(rotationMode == 'AXIS_ANGLE'):
+                rotationPath = "rotation_axis_angle"
+                rotationValues = JSPLINE_QuaternionsToAxisAngles(quaternions[:,targetNumber])
+                findRotationErrors = lambda curveValues,keyValues: JSPLINE_QuaternionErrors(JSPLINE_AxisAnglesToQuaternions(curveValues),JSPLINE_AxisAnglesToQuaternions(keyValues))
+            else:
+                rotationPath = "rotation_euler"
+                #each euler is kept close to the one before so rotations don't flip between frames
+                rotationValues = numpy.empty((frameCount,3))
+                previousEuler = transformOwner.rotation_euler.copy()
+                for frameIndex in range(0,frameCount):
+                    previousEuler = mathutils.Quaternion(quaternions[frameIndex,targetNumber]).to_euler(rotationMode,previousEuler)
+                    rotationValues[frameIndex] = previousEuler
+                findRotationErrors = JSPLINE_EulerErrorFunction(rotationMode)
+            rotationChannels.append((rotationValues[:,None],findRotationErrors,targetObject,dataPathPrefix,rotationPath,boneName))
+        rotationTolerance = scene.JSPLINERotationTolerance
+        reduceRotationKeys = lambda rotationChannel: JSPLINE_ReduceKeyframes(rotationChannel[0],allFrames[:,:1],noFrames[:,:1],rotationChannel[1],rotationTolerance,cyclic)
+        with JSPLINE_MeasurePhase('keyframe reduction'):
+            channelRotationKeys = JSPLINE_MapInParallel(reduceRotationKeys,rotationChannels)
+        for targetNumber in range(0,len(self.targetObjects)):
+            rotationValues, findRotationErrors, targetObject, dataPathPrefix, rotationPath, boneName = rotationChannels[targetNumber]
+            rotationKeys = channelRotationKeys[targetNumber]
+            rotationSlopes = JSPLINE_KeyframeSlopes(rotationKeys,rotationValues,cyclic)
+            rotationKeys = rotationKeys[:,0]
+            keyframeWriter.addKeys(targetObject,dataPathPrefix + rotationPath,frameNumbers[rotationKeys],rotationValues[rotationKeys,0],boneName,rotationSlopes[rotationKeys,0])
+            scaleKeys = targetScaleKeys[:,targetNumber]
+            keyframeWriter.addKeys(targetObject,dataPathPrefix + "scale",frameNumbers[scaleKeys],scales[scaleKeys,targetNumber],boneName,scaleSlopes[scaleKeys,targetNumber])
+        with JSPLINE_MeasurePhase('keyframe writes'):
+            keyframeWriter.write()
+
+#phases of a bake, in the order they happen
+JSPLINE_profilePhases = ['setup','bone split','evaluation','effect math','keyframe reduction','keyframe writes','cleanup']
+
+#where the time of a bake goes, for the baking panel and for comparing versions of the addon
+#phase times don't include phases measured inside them, and every measured span is kept as a Chrome trace event
+class JSPLINE_BakeProfile():
+    def __init__(self):
+        self.startTime = time.perf_counter()
+        self.phaseSeconds = dict((phaseName,0.0) for phaseName in JSPLINE_profilePhases)
+        self.traceEvents = []
+        #time spent in phases measured inside each phase still being measured
+        self.innerSeconds = []
+        self.isOpen = True
+        self.frameCount = 0
+        self.targetCount = 0
+        self.sourceSeconds = {}
+        self.sourceTargetCounts = {}
+
+    #time everything done inside a with block as a phase
+    @contextlib.contextmanager
+    def measure(self,phaseName):
+        spanStartTime = time.perf_counter()
+        self.innerSeconds.append(0.0)
+        try:
+            yield
+        finally:
+            spanSeconds = time.perf_counter() - spanStartTime
+            self.phaseSeconds[phaseName] += spanSeconds - self.innerSeconds.pop()
+            if(len(self.innerSeconds) > 0):
+                self.innerSeconds[-1] += spanSeconds
+            self.traceEvents.append({'name':phaseName,'ph':'X','ts':(spanStartTime - self.startTime) * 1000000,'dur':spanSeconds * 1000000,'pid':0,'tid':0})
+
+    #stop measuring and gather frame and target counts and time spent reading each armature and object from a finished bake engine
+    def finish(self,bakeEngine):
+        self.isOpen = False
+        self.frameCount = bakeEngine.steppedFrameCount
+        self.targetCount = len(bakeEngine.bakeJob.bakeTargets)
+        self.sourceSeconds = dict(bakeEngine.targetSampler.sourceSeconds)
+        self.sourceTargetCounts = bakeEngine.targetSampler.sourceTargetCounts()
+
+    #lines summing up the bake for the baking panel and the log
+    def summaryLines(self):
+        totalSeconds = sum(self.phaseSeconds.values())
+        summaryLines = [str(self.frameCount) + " frames of " + str(self.targetCount) + " bones and objects in " + "{:.2f}s, {:.1f} frames/sec".format(totalSeconds,self.frameCount / max(totalSeconds,0.000001))]
+        for phaseName in JSPLINE_profilePhases:
+            summaryLines.append(phaseName + ": " + "{:.3f}s".format(self.phaseSeconds[phaseName]))
+        if((self.frameCount > 0) and (self.targetCount > 0)):
+            summaryLines.append("{:.3f} ms per bone or object per frame".format(totalSeconds * 1000 / (self.frameCount * self.targetCount)))
+            #slowest armatures and objects to read, bones of an armature are read together so their time is only known as an average
+            sourceCosts = sorted(((self.sourceSeconds[sourceName] * 1000 / self.frameCount,sourceName) for sourceName in self.sourceSeconds),reverse=True)
+            for sourceCost,sourceName in sourceCosts[:3]:
+                sourceTargetCount = self.sourceTargetCounts.get(sourceName,1)
+                summaryLines.append("reading " + sourceName + ": " + "{:.3f} ms per frame, average {:.3f} ms per bone or object".format(sourceCost,sourceCost / sourceTargetCount))
+        return summaryLines
+
+    #write the profile as a Chrome trace, a JSON file that chrome://tracing and Perfetto show as a timeline, with the summary under otherData
+    def export(self,exportPath):
+        totalSeconds = sum(self.phaseSeconds.values())
+        profileData = {'traceEvents':self.traceEvents,'displayTimeUnit':'ms','otherData':{'addonVersion':".".join(str(versionPart) for versionPart in bl_info['version']),
+            'blenderVersion':bpy.app.version_string,'frames':self.frameCount,'targets':self.targetCount,'seconds':totalSeconds,
+            'framesPerSecond':self.frameCount / max(totalSeconds,0.000001),'phaseSeconds':self.phaseSeconds,'sourceSeconds':self.sourceSeconds,'sourceTargets':self.sourceTargetCounts}}
+        with open(exportPath,'w') as exportFile:
+            json.dump(profileData,exportFile,indent=1)
+
+#profile of the bake running or last finished, None before the first bake
+JSPLINE_bakeProfile = None
+
+#start profiling a new bake, and set the log level for it
+def JSPLINE_StartProfile():
+    global JSPLINE_bakeProfile
+    JSPLINE_logger.setLevel(bpy.context.scene.JSPLINELogLevel)
+    JSPLINE_bakeProfile = JSPLINE_BakeProfile()
+
+#measure a phase of the bake running, measuring nothing when not baking
+def JSPLINE_MeasurePhase(phaseName):
+    if((JSPLINE_bakeProfile == None) or (JSPLINE_bakeProfile.isOpen == False)):
+        return contextlib.nullcontext()
+    return JSPLINE_bakeProfile.measure(phaseName)
+
+#finish the profile of a bake, log it and export it if an export file is set
+def JSPLINE_FinishProfile(bakeEngine):
+    if((JSPLINE_bakeProfile == None) or (JSPLINE_bakeProfile.isOpen == False)):
+        return
+    JSPLINE_bakeProfile.finish(bakeEngine)
+    for summaryLine in JSPLINE_bakeProfile.summaryLines():
+        JSPLINE_logger.info(summaryLine)
+    if(bpy.context.scene.JSPLINEProfileFile != ""):
+        exportPath = bpy.path.abspath(bpy.context.scene.JSPLINEProfileFile)
+        try:
+            JSPLINE_bakeProfile.export(exportPath)
+        except OSError as exportError:
+            JSPLINE_logger.warning("couldn't export bake profile to %s: %s",exportPath,exportError)
 
 #make sure scene variables exist in scene
 def JSPLINE_setupSceneVariables():
     #make sure variables are up to date in scene
     bpy.context.scene.JSPLINEStopSignal = True
     bpy.context.scene.JSPLINEProgressFrame = bpy.context.scene.frame_start
-    bpy.context.scene.JSPLINEBakeEmpties = ""
     bpy.context.scene.JSPLINEMaxFrameDelay = 1
 
+#disconnect selected bones from their parents so that position effects can move them
+#each armature goes into edit mode once for all of its bones, then the original selection is put back
+def JSPLINE_SplitSelectedBones(armatureObjects):
+    originalSelection = list(bpy.context.selected_objects)
+    originalActive = bpy.context.view_layer.objects.active
+    for armatureObject in armatureObjects:
+        splitBoneNames = [poseBone.name for poseBone in armatureObject.pose.bones if (poseBone.bone.select == True) and (poseBone.bone.use_connect == True)]
+        #no need for edit mode if selected bones are already split
+        if(len(splitBoneNames) == 0):
+            continue
+        #ops appears to be the only way to do this
+        bpy.ops.object.select_all(action='DESELECT')
+        armatureObject.select_set(True)
+        bpy.context.view_layer.objects.active = armatureObject
+        bpy.ops.object.mode_set(mode='EDIT', toggle=False)
+        for boneName in splitBoneNames:
+            armatureObject.data.edit_bones[boneName].use_connect = False
+        bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
+    #put back the selection from before splitting
+    for selectedObject in bpy.context.selected_objects:
+        selectedObject.select_set(False)
+    for selectedObject in originalSelection:
+        selectedObject.select_set(True)
+    bpy.context.view_layer.objects.active = originalActive
+
+#bones of selected armatures and selected objects, with their delay frames
+def JSPLINE_FindBakeTargets(selectedObjects):
+    bakeTargets = []
+    #delay frames of all selected objects, worked out once for whole parent chains
+    objectDelays = JSPLINE_FindChainDelays([selectedObject for selectedObject in selectedObjects if selectedObject.type == 'MESH'],JSPLINE_SelectedParentObject)
+    for possibleBakeObject in selectedObjects:
+        if(possibleBakeObject.type == 'ARMATURE'):
+            selectedBones = [possibleSelectedBone for possibleSelectedBone in possibleBakeObject.pose.bones if possibleSelectedBone.bone.select == True]
+            boneDelays = JSPLINE_FindChainDelays(selectedBones,JSPLINE_SelectedParentBone)
+            for possibleSelectedBone in selectedBones:
+                bakeTargets.append(JSPLINE_BakeTarget(possibleBakeObject,possibleSelectedBone.name,boneDelays[possibleSelectedBone.name]))
+        elif(possibleBakeObject.type == 'MESH'):
+            bakeTargets.append(JSPLINE_BakeTarget(possibleBakeObject,None,objectDelays[possibleBakeObject.name]))
+    return bakeTargets
+
+#create empties and constraints for selected, ready for baking, and return the engine to bake them with
+#with incremental baking, bones and objects whose animation and settings haven't changed since they were baked are kept as they are
+def JSPLINE_SetupBake():
+    scene = bpy.context.scene
+    #bake into bones and objects themselves instead of making empties and constraints if selected
+    bakeDirect = (scene.JSPLINEBakeTarget == 'DIRECT')
+    #only the two-pass engine baking empties keeps its samples and can sample part of the frame range
+    cacheSamples = (bakeDirect == False) and (scene.JSPLINEBakeEngine == 'TWOPASS')
+    bakeIncremental = (scene.JSPLINEIncrementalBake == True) and (cacheSamples == True)
+    if(bakeIncremental == False):
+        #remove existing constraints and empties from selected for best results
+        JSPLINE_removeFromSelected()
+    #set frame to start, ready to begin stepping through all frames
+    scene.frame_set(scene.frame_start)
+    
+    #make sure collection exists to put empties
+    if(('JSPLINEComponents' in bpy.data.collections) == False):
+        newCollection = bpy.data.collections.new('JSPLINEComponents')
+        scene.collection.children.link(newCollection)
+    
+    #split bones of all selected armatures first if allowed, this changes the selection until it is put back
+    selectedObjects = list(bpy.context.selected_objects)
+    if(scene.JSPLINESplitBones == True):
+        with JSPLINE_MeasurePhase('bone split'):
+            JSPLINE_SplitSelectedBones([selectedObject for selectedObject in selectedObjects if selectedObject.type == 'ARMATURE'])
+    
+    #find bones and objects that are to be baked
+    bakeTargets = JSPLINE_FindBakeTargets(selectedObjects)
+    
+    #work out which bones and objects changed since they were last baked, and which frames of them need sampling again
+    keptTargets = []
+    sampledFrames = [scene.frame_start,scene.frame_end]
+    if(cacheSamples == True):
+        #effect constraints stay off while sampling, so bones and objects are sampled without their own effect or the effect of their parents
+        solvedBoneCache = {}
+        for bakeTarget in bakeTargets:
+            JSPLINE_disableAnimatedObjectConstraints(bakeTarget.transformOwner)
+            bakeTarget.sourceFingerprint = JSPLINE_SourceFingerprint(bakeTarget.animatedObject,bakeTarget.boneName,solvedBoneCache)
+    if(bakeIncremental == True):
+        changedTargets = []
+        sampledFrames = [scene.frame_end+1,scene.frame_start-1]
+        for bakeTarget in bakeTargets:
+            changedFrames = JSPLINE_FindChangedFrames(bakeTarget)
+            cacheEntry = JSPLINE_GetCacheEntry(bakeTarget)
+            if((changedFrames == None) and (cacheEntry['effectSettings'] == bakeTarget.effectSettings) and (cacheEntry['effectFingerprint'] != None)
+                    and (cacheEntry['effectFingerprint'] == bakeTarget.effectFingerprint())):
+                keptTargets.append(bakeTarget)
+                continue
+            changedTargets.append(bakeTarget)
+            if(changedFrames != None):
+                sampledFrames = [min(sampledFrames[0],changedFrames[0]),max(sampledFrames[1],changedFrames[1])]
+        JSPLINE_RemoveEffects([(bakeTarget.animatedObject,bakeTarget.boneName) for bakeTarget in changedTargets])
+        bakeTargets = changedTargets
+    #bones and objects whose own transform isn't all that moves them are left out of baking directly
+    skippedProblems = []
+    if(bakeDirect == True):
+        directTargets = []
+        solvedBoneCache = {}
+        for bakeTarget in bakeTargets:
+            directBakeProblem = JSPLINE_DirectBakeProblem(bakeTarget,solvedBoneCache)
+            if(directBakeProblem != None):
+                skippedProblems.append(directBakeProblem)
+                JSPLINE_logger.warning("not baking directly because %s, bake it into empties instead",directBakeProblem)
+                continue
+            directTargets.append(bakeTarget)
+        bakeTargets = directTargets
+    #armatures playing the same action only need baking once when baking into bones
+    sharedInstances = []
+    if((bakeDirect == True) and (scene.JSPLINEShareInstanceBakes == True)):
+        bakeTargets, sharedInstances = JSPLINE_FindSharedInstances(bakeTargets)
+    for bakeTarget in bakeTargets:
+        if(bakeDirect == True):
+            JSPLINE_PrepareDirectBake(bakeTarget.animatedObject,bakeTarget.boneName)
+        else:
+            #create empties
+            emptyArray = JSPLINE_CreateEmptySet(bakeTarget)
+            #create bone or object constraints
+            JSPLINE_createAnimatedObjectConstraints(bakeTarget.transformOwner,emptyArray)
+    
+    #set up engine to step through frames with, baking directly always uses the two-pass engine
+    bakeJob = JSPLINE_BakeJob(bakeTargets,bakeDirect,keptTargets,sharedInstances,skippedProblems)
+    if((bakeDirect == False) and (scene.JSPLINEBakeEngine == 'PERFRAME')):
+        bakeEngine = JSPLINE_PerFrameBakeEngine(bakeJob)
+    else:
+        bakeEngine = JSPLINE_TwoPassBakeEngine(bakeJob,sampledFrames)
+    scene.JSPLINEProgressFrame = bakeEngine.firstFrame
+    return bakeEngine
+
+#keep baked keyframes and turn on effect constraints once baking has finished or has been stopped
+def JSPLINE_FinishBake(bakeEngine,bakeCompleted):
+    with JSPLINE_MeasurePhase('cleanup'):
+        bakeEngine.finishBake(bakeCompleted)
+        for instanceObject,leaderObject,boneNames in bakeEngine.bakeJob.sharedInstances:
+            JSPLINE_ShareDirectBake(instanceObject,leaderObject,boneNames)
+        #enable all constraints, including those of bones and objects kept from an earlier bake, there are none when baking directly
+        if(bakeEngine.bakeDirect == False):
+            for bakeTarget in bakeEngine.bakeJob.bakeTargets + bakeEngine.bakeJob.keptTargets:
+                JSPLINE_enableAnimatedObjectConstraints(bakeTarget.transformOwner)
+        #update the scene to show the baked effect from the start
+        bpy.context.scene.frame_set(bpy.context.scene.frame_start)
+    JSPLINE_FinishProfile(bakeEngine)
+
+#bake selected from start to end without a modal timer, for scripts and background mode
+def JSPLINE_BakeSelected():
+    #make sure scene variables exist
+    JSPLINE_setupSceneVariables()
+    bpy.context.scene.JSPLINEStopSignal = False
+    JSPLINE_StartProfile()
+    with JSPLINE_MeasurePhase('setup'):
+        bakeEngine = JSPLINE_SetupBake()
+    bakeStartTime = time.perf_counter()
+    while(bpy.context.scene.JSPLINEProgressFrame <= bakeEngine.lastFrame):
+        bakeEngine.bakeFrame(bpy.context.scene.JSPLINEProgressFrame)
+        bpy.context.scene.JSPLINEProgressFrame += 1
+    bakedFrames = max(bakeEngine.lastFrame - bakeEngine.firstFrame + 1,0)
+    bpy.context.scene.JSPLINEBakeFramesPerSecond = bakedFrames / max(time.perf_counter() - bakeStartTime,0.001)
+    JSPLINE_FinishBake(bakeEngine,True)
+    bpy.context.scene.JSPLINEStopSignal = True
+    return bakeEngine
+
+#select bones and objects to bake by name patterns and collections, for baking without the interface
+#armatures matching armaturePatterns get bones matching bonePatterns selected
+#objects matching objectPatterns and objects in named collections are selected as well
+#only armatures and meshes are baked, other matching objects are left unselected with a warning
+def JSPLINE_SelectBakeTargets(armaturePatterns=(),bonePatterns=('*',),objectPatterns=(),collectionNames=()):
+    candidateObjects = {}
+    for sceneObject in bpy.context.scene.objects:
+        if((sceneObject.type == 'ARMATURE') and any(fnmatch.fnmatchcase(sceneObject.name,namePattern) for namePattern in armaturePatterns)):
+            candidateObjects[sceneObject.name] = sceneObject
+        elif((sceneObject.type != 'ARMATURE') and any(fnmatch.fnmatchcase(sceneObject.name,namePattern) for namePattern in objectPatterns)):
+            candidateObjects[sceneObject.name] = sceneObject
+    for collectionName in collectionNames:
+        if((collectionName in bpy.data.collections) == False):
+            raise KeyError("Jeane Spline could not find collection " + collectionName)
+        for collectionObject in bpy.data.collections[collectionName].all_objects:
+            if(collectionObject.name in bpy.context.scene.objects):
+                candidateObjects[collectionObject.name] = collectionObject
+    for candidateObject in list(candidateObjects.values()):
+        if((candidateObject.type in ('ARMATURE','MESH')) == False):
+            JSPLINE_logger.warning("skipping %s, only armatures and meshes are baked, not %s objects",candidateObject.name,candidateObject.type.lower())
+            del candidateObjects[candidateObject.name]
+    #replace the current selection
+    for sceneObject in bpy.context.scene.objects:
+        sceneObject.select_set(False)
+    selectedBoneCount = 0
+    for candidateObject in candidateObjects.values():
+        candidateObject.select_set(True)
+        if(candidateObject.type == 'ARMATURE'):
+            for armatureBone in candidateObject.data.bones:
+                armatureBone.select = any(fnmatch.fnmatchcase(armatureBone.name,namePattern) for namePattern in bonePatterns)
+                if(armatureBone.select == True):
+                    selectedBoneCount += 1
+    return len(candidateObjects), selectedBoneCount
+
+#transform channels of bones and objects, set by the preview
+JSPLINE_transformChannelNames = ['location','rotation_quaternion','rotation_euler','rotation_axis_angle','scale']
+
+#bake-free preview of the effect on selected bones and objects, applied straight to their transforms whenever the frame changes
+#source animation is sampled for the whole frame range, smoothing looks ahead as well as back so it can't work from recent frames alone
+#sampling steps through frames, which can't be done from a frame change handler, so it runs when the preview starts and later from a timer
+#effects are computed again when effect settings change, and samples are taken again when the animation of previewed bones and objects changes
+class JSPLINE_LivePreview():
+    def __init__(self,bakeTargets):
+        #baked effect constraints would add to the preview, they are turned off until the preview stops and then set back as they were
+        constraintStates = [JSPLINE_EffectConstraintStates(bakeTarget.transformOwner) for bakeTarget in bakeTargets]
+        for bakeTarget in bakeTargets:
+            JSPLINE_disableAnimatedObjectConstraints(bakeTarget.transformOwner)
+        #the preview sets transforms like baking directly, so bones and objects that can't be baked directly are left out
+        self.bakeTargets = []
+        self.originalConstraintStates = []
+        self.skippedProblems = []
+        solvedBoneCache = {}
+        for bakeTarget,targetConstraintStates in zip(bakeTargets,constraintStates):
+            directBakeProblem = JSPLINE_DirectBakeProblem(bakeTarget,solvedBoneCache)
+            if(directBakeProblem != None):
+                self.skippedProblems.append(directBakeProblem)
+                JSPLINE_RestoreEffectConstraintStates(bakeTarget.transformOwner,targetConstraintStates)
+            else:
+                self.bakeTargets.append(bakeTarget)
+                self.originalConstraintStates.append(targetConstraintStates)
+        #transform channels to put back when the preview stops or samples again, setting matrices back wouldn't give exactly the same values
+        self.originalChannels = [[getattr(bakeTarget.transformOwner,channelName)[:] for channelName in JSPLINE_transformChannelNames] for bakeTarget in self.bakeTargets]
+        self.previewEngine = None
+        self.previewSettings = None
+        self.sourceFingerprints = None
+        self.basisMatrices = None
+        #frame changes made while sampling don't apply the preview
+        self.isSampling = False
+        #an action was edited since the source was sampled, it may be one the previewed bones and objects play
+        self.sourceMayHaveChanged = False
+
+    #frame range and effect settings the preview is computed for
+    def currentSettings(self):
+        scene = bpy.context.scene
+        return [scene.frame_start,scene.frame_end] + [getattr(scene,settingName) for settingName in JSPLINE_effectSettingNames]
+
+    #source fingerprint of every previewed target, taken with the transforms the targets had before previewing
+    def findSourceFingerprints(self):
+        self.restoreSource()
+        solvedBoneCache = {}
+        return [JSPLINE_SourceFingerprint(bakeTarget.animatedObject,bakeTarget.boneName,solvedBoneCache) for bakeTarget in self.bakeTargets]
+
+    #whether the animation of any previewed target changed since it was sampled, targets that can't be fingerprinted always count as changed
+    def findSourceChange(self):
+        for oldFingerprint,newFingerprint in zip(self.sourceFingerprints,self.findSourceFingerprints()):
+            if((oldFingerprint == None) or (newFingerprint == None) or (oldFingerprint[0] != newFingerprint[0]) or (oldFingerprint[1].keys() != newFingerprint[1].keys())):
+                return True
+            if(any(JSPLINE_ChangedFrameRange(oldFingerprint[1][channelId],newFingerprint[1][channelId]) != None for channelId in oldFingerprint[1])):
+                return True
+        return False
+
+    #sample world matrices of every previewed target over the whole frame range, like the first pass of baking directly
+    def sampleSource(self):
+        scene = bpy.context.scene
+        self.isSampling = True
+        self.sourceFingerprints = self.findSourceFingerprints()
+        currentFrame = scene.frame_current
+        self.previewEngine = JSPLINE_TwoPassBakeEngine(JSPLINE_BakeJob(self.bakeTargets,True))
+        for frameNumber in range(scene.frame_start,scene.frame_end+1):
+            self.previewEngine.bakeFrame(frameNumber)
+        scene.frame_set(currentFrame)
+        self.isSampling = False
+
+    #delay frames of every previewed bone and object for the current delay settings, chains are made of previewed parents
+    def updateTargetDelays(self):
+        previewedNames = set((bakeTarget.animatedObject.name,bakeTarget.boneName) for bakeTarget in self.bakeTargets)
+        previewedParentBone = lambda poseBone: poseBone.parent if (poseBone.parent != None) and ((poseBone.id_data.name,poseBone.parent.name) in previewedNames) else None
+        previewedParentObject = lambda chainObject: chainObject.parent if (chainObject.parent != None) and ((chainObject.parent.name,None) in previewedNames) else None
+        objectDelays = JSPLINE_FindChainDelays([bakeTarget.animatedObject for bakeTarget in self.bakeTargets if bakeTarget.boneName == None],previewedParentObject,False)
+        armatureDelays = {}
+        for bakeTarget in self.bakeTargets:
+            if(bakeTarget.boneName == None):
+                bakeTarget.frameDelay = objectDelays[bakeTarget.animatedObject.name]
+                continue
+            if((bakeTarget.animatedObject.name in armatureDelays) == False):
+                armatureBones = [otherTarget.poseBone for otherTarget in self.bakeTargets if otherTarget.animatedObject == bakeTarget.animatedObject]
+                armatureDelays[bakeTarget.animatedObject.name] = JSPLINE_FindChainDelays(armatureBones,previewedParentBone,False)
+            bakeTarget.frameDelay = armatureDelays[bakeTarget.animatedObject.name][bakeTarget.boneName]
+
+    #compute the effect for every sampled frame, with every keyable frame of the empties kept so nothing is lost to keyframe tolerances
+    def computeEffect(self):
+        self.updateTargetDelays()
+        self.previewEngine.bakeJob = JSPLINE_BakeJob(self.bakeTargets,True)
+        locations, rotations, locationKeys, rotationKeys = self.previewEngine.computeEmptyTransforms(True,False)
+        self.basisMatrices = self.previewEngine.computeTargetBases(locations,locationKeys).astype(numpy.float32)
+        self.previewSettings = self.currentSettings()
+
+    #sample again if the frame range or source animation changed, compute the effect again if settings changed, and show the current frame
+    #this steps through frames, so it runs from the timer of JSPLINE_SchedulePreviewRefresh rather than from a handler
+    def refresh(self):
+        previewSettings = self.currentSettings()
+        sourceChanged = (self.previewEngine == None) or (previewSettings[:2] != self.previewSettings[:2])
+        if((sourceChanged == False) and (self.sourceMayHaveChanged == True)):
+            sourceChanged = self.findSourceChange()
+        self.sourceMayHaveChanged = False
+        if(sourceChanged == True):
+            self.sampleSource()
+        if((sourceChanged == True) or (previewSettings != self.previewSettings)):
+            self.computeEffect()
+        self.applyFrame(bpy.context.scene.frame_current)
+
+    #whether the preview needs a refresh before it shows the current settings and animation
+    def needsRefresh(self):
+        return (self.sourceMayHaveChanged == True) or (self.currentSettings() != self.previewSettings)
+
+    #put the previewed effect of a frame onto every target, the only scene data written from the frame change handler
+    def applyFrame(self,frameNumber):
+        if((self.isSampling == True) or (self.basisMatrices is None)):
+            return
+        frameIndex = frameNumber - self.previewSettings[0]
+        if((frameIndex < 0) or (frameIndex >= len(self.basisMatrices))):
+            return
+        for targetNumber in range(0,len(self.bakeTargets)):
+            self.bakeTargets[targetNumber].transformOwner.matrix_basis = mathutils.Matrix(self.basisMatrices[frameIndex,targetNumber].tolist())
+
+    #put back the transforms targets had before previewing, animated channels are set again by the next frame change
+    def restoreSource(self):
+        for targetNumber in range(0,len(self.bakeTargets)):
+            for channelNumber in range(0,len(JSPLINE_transformChannelNames)):
+                setattr(self.bakeTargets[targetNumber].transformOwner,JSPLINE_transformChannelNames[channelNumber],self.originalChannels[targetNumber][channelNumber])
+
+    #end the preview and leave targets with their own animation, and baked effect constraints on or off as they were before previewing
+    def stop(self):
+        self.restoreSource()
+        for bakeTarget,targetConstraintStates in zip(self.bakeTargets,self.originalConstraintStates):
+            JSPLINE_RestoreEffectConstraintStates(bakeTarget.transformOwner,targetConstraintStates)
+        bpy.context.scene.frame_set(bpy.context.scene.frame_current)
+
+#preview currently running, None when not previewing
+JSPLINE_livePreview = None
+
+#refresh the live preview from a timer, outside of any handler
+def JSPLINE_RefreshPreview():
+    if(JSPLINE_livePreview != None):
+        JSPLINE_livePreview.refresh()
+    return None
+
+#refresh the live preview as soon as Blender is idle, once however often it is asked for before then
+def JSPLINE_SchedulePreviewRefresh():
+    if(bpy.app.timers.is_registered(JSPLINE_RefreshPreview) == False):
+        bpy.app.timers.register(JSPLINE_RefreshPreview,first_interval=0)
+
+#apply the live preview after every frame change, the handler isn't persistent so loading another file ends the preview
+#settings changed since the effect was computed show once the refresh has run
+def JSPLINE_PreviewFrameHandler(scene,depsgraph=None):
+    if(JSPLINE_livePreview != None):
+        if(JSPLINE_livePreview.needsRefresh() == True):
+            JSPLINE_SchedulePreviewRefresh()
+        JSPLINE_livePreview.applyFrame(scene.frame_current)
+
+#notice edited actions and changed settings while previewing, so the preview refreshes without waiting for a frame change
+def JSPLINE_PreviewDepsgraphHandler(scene,depsgraph=None):
+    if((JSPLINE_livePreview == None) or (JSPLINE_livePreview.isSampling == True) or (depsgraph == None)):
+        return
+    if(any(isinstance(depsgraphUpdate.id,bpy.types.Action) for depsgraphUpdate in depsgraph.updates)):
+        JSPLINE_livePreview.sourceMayHaveChanged = True
+    if(JSPLINE_livePreview.needsRefresh() == True):
+        JSPLINE_SchedulePreviewRefresh()
+
+#start previewing the effect on selected bones and objects, replacing any preview already running
+def JSPLINE_StartPreview():
+    global JSPLINE_livePreview
+    JSPLINE_StopPreview()
+    bakeTargets = JSPLINE_FindBakeTargets(list(bpy.context.selected_objects))
+    if(len(bakeTargets) == 0):
+        return 0
+    JSPLINE_livePreview = JSPLINE_LivePreview(bakeTargets)
+    for skippedProblem in JSPLINE_livePreview.skippedProblems:
+        JSPLINE_logger.warning("not previewing because %s, bake it into empties instead",skippedProblem)
+    if(len(JSPLINE_livePreview.bakeTargets) == 0):
+        JSPLINE_livePreview = None
+        return 0
+    JSPLINE_livePreview.refresh()
+    bpy.app.handlers.frame_change_post.append(JSPLINE_PreviewFrameHandler)
+    bpy.app.handlers.depsgraph_update_post.append(JSPLINE_PreviewDepsgraphHandler)
+    return len(JSPLINE_livePreview.bakeTargets)
+
+#stop the live preview if one is running
+def JSPLINE_StopPreview():
+    global JSPLINE_livePreview
+    if(JSPLINE_livePreview == None):
+        return
+    previewToStop = JSPLINE_livePreview
+    JSPLINE_livePreview = None
+    if(bpy.app.timers.is_registered(JSPLINE_RefreshPreview) == True):
+        bpy.app.timers.unregister(JSPLINE_RefreshPreview)
+    if(JSPLINE_PreviewDepsgraphHandler in bpy.app.handlers.depsgraph_update_post):
+        bpy.app.handlers.depsgraph_update_post.remove(JSPLINE_PreviewDepsgraphHandler)
+    #after loading another file the handler is already gone, along with the previewed bones and objects
+    if(JSPLINE_PreviewFrameHandler in bpy.app.handlers.frame_change_post):
+        bpy.app.handlers.frame_change_post.remove(JSPLINE_PreviewFrameHandler)
+        previewToStop.stop()
+
 #function to begin modal running
 class JSPLINE_OT_StartBake(bpy.types.Operator):
     bl_idname = "jspline.startbake"
@@ -337,77 +2153,45 @@ class JSPLINE_OT_StartBake(bpy.types.Operator):
     
     #timer for running modal
     JSPLINETimer = None
+    #engine doing the baking work for each frame
+    JSPLINEEngine = None
+    #time baking started and frames baked since, for showing baking speed
+    JSPLINEBakeStartTime = 0
+    JSPLINEBakedFrames = 0
     
     #repeated while running
     def modal(self, context, event):
-        bakeEmptyNamesList = bpy.context.scene.JSPLINEBakeEmpties.split(',')
         #stop modal timer if the stop signal is activated
         if(bpy.context.scene.JSPLINEStopSignal == True):
             context.window_manager.event_timer_remove(self.JSPLINETimer)
-            #enable all constraints
-            for bakedEmptyName in bakeEmptyNamesList:
-                bakedEmpty = bpy.context.scene.objects[bakedEmptyName]
-                JSPLINE_enableAnimatedObjectConstraints(bakedEmpty)
+            #keep whatever has been baked so far
+            JSPLINE_FinishBake(self.JSPLINEEngine,False)
             self.report({'INFO'},"Jeane Spline baking stopped.")
             return {'CANCELLED'}
+        #only bake on timer ticks so other events pass straight through to the interface
+        elif(event.type != 'TIMER'):
+            return {'PASS_THROUGH'}
         else: 
-            #step through frames in scene
-            if(bpy.context.scene.JSPLINEProgressFrame <= bpy.context.scene.frame_end):
-                #record keyframe for each empty to be baked
-                for bakingEmptyName in bakeEmptyNamesList:
-                    bakingEmpty = bpy.context.scene.objects[bakingEmptyName]
-                    JSPLINE_PositionEmptyForCurrentFrame(bakingEmpty)
-                    canRecordKeyFrame = True
-                    locationRecordInterval = 3
-                    rotationRecordInterval = 4
-                    #only delay if it is an empty of delay type
-                    if(('delay' in bakingEmpty['JSPLINE_emptyType']) == True):
-                        #if the required delay is more than the elapsed frames, no keyframe can be recorded yet
-                        #delay function will determine this
-                        canRecordKeyFrame = JSPLINE_DelayEmpty(bakingEmpty)
-                        #record closer intervals for delay empties
-                        locationRecordInterval = 2
-                        rotationRecordInterval = 2
-                    #add empty noise if possible
-                    JSPLINE_AddNoiseToEmpty(bakingEmpty)
-                    #don't record a keyframe if looped is enabled and it's close to the end of the animation
-                    if(bpy.context.scene.JSPLINELoopedAnimation == True):
-                        if(bpy.context.scene.JSPLINEProgressFrame > bpy.context.scene.frame_end - 4):
-                            canRecordKeyFrame = False
-                    #don't record keyframe if not appropriate
-                    if(canRecordKeyFrame == True):
-                        #keyframe in intervals for smoothing
-                        if(bpy.context.scene.JSPLINEProgressFrame % locationRecordInterval == 0):
-                            bakingEmpty.keyframe_insert("location")
-                        if(bpy.context.scene.JSPLINEProgressFrame % rotationRecordInterval == 0):
-                            bakingEmpty.keyframe_insert("rotation_quaternion")
-                    #prepare last frame for wrap-around if looping animation is selected
-                    if((bpy.context.scene.JSPLINELoopedAnimation == True) and (bpy.context.scene.JSPLINEProgressFrame == bpy.context.scene.frame_end)):
-                        bakingEmpty.location = bakingEmpty['JSPLINE_endLocations']['0']
-                        bakingEmpty.rotation_quaternion = bakingEmpty['JSPLINE_endRotations']['0']
-                        bakingEmpty.keyframe_insert("location")
-                        bakingEmpty.keyframe_insert("rotation_quaternion")
+            #step through as many frames as fit into the time budget for this tick
+            tickStartTime = time.perf_counter()
+            frameBudget = bpy.context.scene.JSPLINEFrameBudget * 0.001
+            while((bpy.context.scene.JSPLINEProgressFrame <= self.JSPLINEEngine.lastFrame) and (time.perf_counter() - tickStartTime < frameBudget)):
+                self.JSPLINEEngine.bakeFrame(bpy.context.scene.JSPLINEProgressFrame)
                 bpy.context.scene.JSPLINEProgressFrame += 1
-                bpy.context.scene.frame_set(bpy.context.scene.JSPLINEProgressFrame)
+                self.JSPLINEBakedFrames += 1
+            bpy.context.scene.JSPLINEBakeFramesPerSecond = self.JSPLINEBakedFrames / max(time.perf_counter() - self.JSPLINEBakeStartTime,0.001)
+            #redraw panels to show progress
+            if(context.screen != None):
+                for screenArea in context.screen.areas:
+                    if(screenArea.type == 'VIEW_3D'):
+                        screenArea.tag_redraw()
+            if(bpy.context.scene.JSPLINEProgressFrame <= self.JSPLINEEngine.lastFrame):
                 return {'PASS_THROUGH'}
             else:
                 #stop baking when last frame reached
                 context.window_manager.event_timer_remove(self.JSPLINETimer)
                 bpy.context.scene.JSPLINEStopSignal = True
-                #return to frame 1 for wrapping changes if loop is enabled
-                if(bpy.context.scene.JSPLINELoopedAnimation == True):
-                    bpy.context.scene.frame_set(bpy.context.scene.frame_start)
-                #iterate all empties for final changes
-                for bakedEmptyName in bakeEmptyNamesList:
-                    bakedEmpty = bpy.context.scene.objects[bakedEmptyName]
-                    #wrap animation for empty if looping animation is selected
-                    if(bpy.context.scene.JSPLINELoopedAnimation == True):
-                        bakedEmpty.location = bakedEmpty['JSPLINE_endLocations']['1']
-                        bakedEmpty.rotation_quaternion = bakedEmpty['JSPLINE_endRotations']['1']
-                        bakedEmpty.keyframe_insert("location")
-                        bakedEmpty.keyframe_insert("rotation_quaternion")
-                    #enable all constraints
-                    JSPLINE_enableAnimatedObjectConstraints(bakedEmpty)
+                JSPLINE_FinishBake(self.JSPLINEEngine,True)
                 self.report({'INFO'},"Jeane Spline baking completed.")
                 return {'CANCELLED'}
             
@@ -422,53 +2206,26 @@ class JSPLINE_OT_StartBake(bpy.types.Operator):
             
             #cancelling currently playing animation seems only possible with an operator
             bpy.ops.screen.animation_cancel()
-            #remove existing constraints and empties from selected for best results
-            JSPLINE_removeFromSelected()
-            #set frame to start, ready to begin stepping through all frames
-            bpy.context.scene.frame_set(bpy.context.scene.frame_start)
-            bpy.context.scene.JSPLINEProgressFrame = bpy.context.scene.frame_start
-            
-            #new bake empties string list for new bake
-            bpy.context.scene.JSPLINEBakeEmpties = ""
-            
-            
-            #make sure collection exists to put empties
-            if(('JSPLINEComponents' in bpy.data.collections) == False):
-                newCollection = bpy.data.collections.new('JSPLINEComponents')
-                bpy.context.scene.collection.children.link(newCollection)
-            
-            #create empties for objects that are to be baked
-            for possibleBakeObject in bpy.context.selected_objects:
-                if(possibleBakeObject.type == 'ARMATURE'):
-                    for possibleSelectedBone in possibleBakeObject.pose.bones:
-                        if(possibleSelectedBone.bone.select == True):
-                            #split bone if allowed
-                            if(bpy.context.scene.JSPLINESplitBones == True):
-                                boneName = possibleSelectedBone.name
-                                #ops appears to be the only way to do this
-                                bpy.ops.object.select_all(action='DESELECT')
-                                possibleBakeObject.select_set(True)
-                                bpy.context.view_layer.objects.active = possibleBakeObject
-                                bpy.ops.object.mode_set(mode='EDIT', toggle=False)
-                                possibleBakeObject.data.edit_bones[boneName].use_connect = False
-                                bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
-                            #create empties
-                            emptyArray = JSPLINE_CreateEmptySet(possibleBakeObject,possibleSelectedBone.name)
-                            #create bone constraints
-                            JSPLINE_createAnimatedObjectConstraints(possibleSelectedBone,emptyArray)
-                elif(possibleBakeObject.type == 'MESH'):
-                    #create empties
-                    emptyArray = JSPLINE_CreateEmptySet(possibleBakeObject,None)
-                    #create object constraints
-                    JSPLINE_createAnimatedObjectConstraints(possibleBakeObject,emptyArray)
-            #remove last comma in bake empties comma string
-            if(bpy.context.scene.JSPLINEBakeEmpties[-1:] == ','):
-                bpy.context.scene.JSPLINEBakeEmpties = bpy.context.scene.JSPLINEBakeEmpties[:-1]
+            #baking samples the animation of bones and objects without a preview on them
+            JSPLINE_StopPreview()
+            #create empties and constraints, and the engine to bake them with
+            JSPLINE_StartProfile()
+            with JSPLINE_MeasurePhase('setup'):
+                self.JSPLINEEngine = JSPLINE_SetupBake()
                 
             self.report({'INFO'},"Started baking space-switch delay effect for selected with Jeane Spline.")
+            for skippedProblem in self.JSPLINEEngine.bakeJob.skippedProblems:
+                self.report({'WARNING'},"Jeane Spline is not baking directly because " + skippedProblem + ", bake it into empties instead.")
+            if((bpy.context.scene.JSPLINEEvaluationMode == 'AUTO') and (self.JSPLINEEngine.targetSampler.usePoseEvaluation == False)):
+                self.report({'INFO'},"Jeane Spline is updating the whole scene for each frame because " + self.JSPLINEEngine.targetSampler.evaluationProblem + ".")
+                JSPLINE_logger.info("updating the whole scene for each frame because %s",self.JSPLINEEngine.targetSampler.evaluationProblem)
             
-            #set up timer and handler last, errors generated in execute may cause a crash otherwise  
-            self.JSPLINETimer = context.window_manager.event_timer_add(0.1, window=context.window)
+            #set up timer and handler last, errors generated in execute may cause a crash otherwise
+            #timer ticks often, each tick bakes frames for the time budget and then lets the interface update
+            self.JSPLINEBakeStartTime = time.perf_counter()
+            self.JSPLINEBakedFrames = 0
+            bpy.context.scene.JSPLINEBakeFramesPerSecond = 0
+            self.JSPLINETimer = context.window_manager.event_timer_add(0.01, window=context.window)
             context.window_manager.modal_handler_add(self)  
             return {'RUNNING_MODAL'}
         else:
@@ -504,6 +2261,65 @@ class JSPLINE_OT_RemoveFromSelected(bpy.types.Operator):
         self.report({'INFO'},"Cleared all Jeane Spline effects from selected.")
         return {'FINISHED'}
     
+#function to preview the effect on selected without baking
+class JSPLINE_OT_StartPreview(bpy.types.Operator):
+    bl_idname = "jspline.startpreview"
+    bl_label = "Start Live Preview for Selected"
+    bl_description = "Show the effect on selected bones and objects while the frame changes, without creating empties or keyframes. Changed settings and edited animation show after a moment"
+    
+    #sample selected and start applying the effect on frame changes
+    def execute(self, context):
+        #make sure scene variables exist
+        JSPLINE_setupSceneVariables()
+        previewedCount = JSPLINE_StartPreview()
+        if(previewedCount == 0):
+            self.report({'WARNING'},"Select bones or objects to preview Jeane Spline effects on, bones and objects moved by their own constraints can't be previewed.")
+            return {'CANCELLED'}
+        self.report({'INFO'},"Previewing Jeane Spline effects on " + str(previewedCount) + " bones and objects.")
+        return {'FINISHED'}
+
+#function to stop previewing
+class JSPLINE_OT_StopPreview(bpy.types.Operator):
+    bl_idname = "jspline.stoppreview"
+    bl_label = "Stop Live Preview"
+    bl_description = "Stop previewing and put back the animation of previewed bones and objects"
+    
+    #stop applying the effect on frame changes
+    def execute(self, context):
+        JSPLINE_StopPreview()
+        return {'FINISHED'}
+
+#set Jeane Spline settings to the values of a named preset
+def JSPLINE_ApplyPresetValues(presetType):
+    if(presetType == "followthrough"):
+        bpy.context.scene.JSPLINERotationNoise = 0
+        bpy.context.scene.JSPLINELocationNoise = 0
+        bpy.context.scene.JSPLINESmoothPosInfluence = 0
+        bpy.context.scene.JSPLINESmoothRotInfluence = 0
+        bpy.context.scene.JSPLINEDelayPosInfluence = 0.05
+        bpy.context.scene.JSPLINEDelayRotInfluence = 1
+    elif(presetType == "noisyfollowthrough"):
+        bpy.context.scene.JSPLINERotationNoise = 0.2
+        bpy.context.scene.JSPLINELocationNoise = 0.05
+        bpy.context.scene.JSPLINESmoothPosInfluence = 0
+        bpy.context.scene.JSPLINESmoothRotInfluence = 0
+        bpy.context.scene.JSPLINEDelayPosInfluence = 0.05
+        bpy.context.scene.JSPLINEDelayRotInfluence = 1
+    elif(presetType == "squashstretch"):
+        bpy.context.scene.JSPLINERotationNoise = 0
+        bpy.context.scene.JSPLINELocationNoise = 0
+        bpy.context.scene.JSPLINESmoothPosInfluence = 0
+        bpy.context.scene.JSPLINESmoothRotInfluence = 0
+        bpy.context.scene.JSPLINEDelayPosInfluence = 0.6
+        bpy.context.scene.JSPLINEDelayRotInfluence = 0.2
+    elif(presetType == "noisysmooth"):
+        bpy.context.scene.JSPLINERotationNoise = 0.3
+        bpy.context.scene.JSPLINELocationNoise = 0.2
+        bpy.context.scene.JSPLINESmoothPosInfluence = 1
+        bpy.context.scene.JSPLINESmoothRotInfluence = 1
+        bpy.context.scene.JSPLINEDelayPosInfluence = 0
+        bpy.context.scene.JSPLINEDelayRotInfluence = 0
+
 #function to apply a preset to Jeane Spline setup
 class JSPLINE_OT_ApplyPreset(bpy.types.Operator):
     bl_idname = "jspline.applypreset"
@@ -515,34 +2331,7 @@ class JSPLINE_OT_ApplyPreset(bpy.types.Operator):
     def execute(self, context):
         #make sure scene variables exist
         JSPLINE_setupSceneVariables()
-        if(self.presetType == "followthrough"):
-            bpy.context.scene.JSPLINERotationNoise = 0
-            bpy.context.scene.JSPLINELocationNoise = 0
-            bpy.context.scene.JSPLINESmoothPosInfluence = 0
-            bpy.context.scene.JSPLINESmoothRotInfluence = 0
-            bpy.context.scene.JSPLINEDelayPosInfluence = 0.05
-            bpy.context.scene.JSPLINEDelayRotInfluence = 1
-        elif(self.presetType == "noisyfollowthrough"):
-            bpy.context.scene.JSPLINERotationNoise = 0.2
-            bpy.context.scene.JSPLINELocationNoise = 0.05
-            bpy.context.scene.JSPLINESmoothPosInfluence = 0
-            bpy.context.scene.JSPLINESmoothRotInfluence = 0
-            bpy.context.scene.JSPLINEDelayPosInfluence = 0.05
-            bpy.context.scene.JSPLINEDelayRotInfluence = 1
-        elif(self.presetType == "squashstretch"):
-            bpy.context.scene.JSPLINERotationNoise = 0
-            bpy.context.scene.JSPLINELocationNoise = 0
-            bpy.context.scene.JSPLINESmoothPosInfluence = 0
-            bpy.context.scene.JSPLINESmoothRotInfluence = 0
-            bpy.context.scene.JSPLINEDelayPosInfluence = 0.6
-            bpy.context.scene.JSPLINEDelayRotInfluence = 0.2
-        elif(self.presetType == "noisysmooth"):
-            bpy.context.scene.JSPLINERotationNoise = 0.3
-            bpy.context.scene.JSPLINELocationNoise = 0.2
-            bpy.context.scene.JSPLINESmoothPosInfluence = 1
-            bpy.context.scene.JSPLINESmoothRotInfluence = 1
-            bpy.context.scene.JSPLINEDelayPosInfluence = 0
-            bpy.context.scene.JSPLINEDelayRotInfluence = 0
+        JSPLINE_ApplyPresetValues(self.presetType)
         self.report({'INFO'},"Applied a Jeane Spline preset to settings.")
         return {'FINISHED'}
 
@@ -553,10 +2342,21 @@ addonClasses = (  JSPLINE_PT_SetupPanel,
                     JSPLINE_OT_ApplyPreset,
                     JSPLINE_OT_StartBake,
                     JSPLINE_OT_StopBake,
-                    JSPLINE_OT_RemoveFromSelected
+                    JSPLINE_OT_RemoveFromSelected,
+                    JSPLINE_OT_StartPreview,
+                    JSPLINE_OT_StopPreview
                     )
 
-register, unregister = bpy.utils.register_classes_factory(addonClasses)
+registerClasses, unregisterClasses = bpy.utils.register_classes_factory(addonClasses)
+
+def register():
+    registerClasses()
+
+#a running preview holds a frame change handler, take it out with the addon
+def unregister():
+    JSPLINE_StopPreview()
+    JSPLINE_StopWorkerThreads()
+    unregisterClasses()
 
 if __name__ == '__main__':
     register()
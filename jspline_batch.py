@@ -0,0 +1,149 @@
+# Jeane Spline Blender Addon
+# Copyright (C) 2022 Pierre
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of  MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#command line baking for Jeane Spline
+#
+#bake one file inside background Blender:
+#   blender -b shot.blend --python jspline_batch.py -- --armature "Rig*" --bone "tail*"
+#
+#bake many files, running one background Blender per core:
+#   python jspline_batch.py --blender /path/to/blender --jobs 8 shots/*.blend -- --collection Crowd
+
+import argparse
+import concurrent.futures
+import importlib
+import os
+import subprocess
+import sys
+import time
+
+#arguments after '--' are for Jeane Spline, arguments before it belong to Blender or the batch runner
+def JSPLINE_splitArguments(argumentList):
+    if('--' in argumentList):
+        splitIndex = argumentList.index('--')
+        return argumentList[:splitIndex], argumentList[splitIndex+1:]
+    return argumentList, []
+
+#arguments for baking one file inside Blender
+def JSPLINE_bakeArgumentParser():
+    bakeParser = argparse.ArgumentParser(prog="jspline_batch.py",description="Bake Jeane Spline effects in the currently open .blend file")
+    bakeParser.add_argument("--armature",action='append',default=[],help="name pattern of armatures to bake bones of, can be repeated")
+    bakeParser.add_argument("--bone",action='append',default=[],help="name pattern of bones to bake, can be repeated, defaults to all bones")
+    bakeParser.add_argument("--object",action='append',default=[],help="name pattern of objects to bake, can be repeated")
+    bakeParser.add_argument("--collection",action='append',default=[],help="name of a collection with armatures and objects to bake, can be repeated")
+    bakeParser.add_argument("--preset",choices=['followthrough','noisyfollowthrough','squashstretch','noisysmooth'],help="apply an effect preset before baking")
+    bakeParser.add_argument("--engine",choices=['TWOPASS','PERFRAME'],help="bake engine to use")
+    bakeParser.add_argument("--frames",nargs=2,type=int,metavar=('START','END'),help="frame range to bake instead of the scene range")
+    bakeParser.add_argument("--loop",action='store_true',help="wrap frames for looped animation")
+    bakeParser.add_argument("--sample-cache",help="folder to share sampled animation in between bakes and computers, so re-bakes with other settings skip sampling")
+    bakeParser.add_argument("--profile",help="save where baking time went as a JSON Chrome trace file, for chrome://tracing or comparing versions")
+    bakeParser.add_argument("--log-level",choices=['WARNING','INFO','DEBUG'],help="how much Jeane Spline writes while baking, INFO writes a summary of where baking time went")
+    bakeParser.add_argument("--output",help="where to save the baked .blend file, defaults to saving over the opened file")
+    return bakeParser
+
+#import the addon package this script is part of, it may not be enabled in the Blender preferences
+def JSPLINE_importAddon():
+    addonDirectory = os.path.dirname(os.path.abspath(__file__))
+    if((os.path.dirname(addonDirectory) in sys.path) == False):
+        sys.path.insert(0,os.path.dirname(addonDirectory))
+    return importlib.import_module(os.path.basename(addonDirectory))
+
+#bake the currently open file, run inside Blender
+def JSPLINE_bakeOpenFile(bakeArgumentList):
+    import bpy
+    bakeArguments = JSPLINE_bakeArgumentParser().parse_args(bakeArgumentList)
+    jeaneSpline = JSPLINE_importAddon()
+    scene = bpy.context.scene
+    #the scene keeps its own frame range when saved, only the bake uses the range given
+    sceneFrameRange = (scene.frame_start,scene.frame_end)
+    if(bakeArguments.preset != None):
+        jeaneSpline.JSPLINE_ApplyPresetValues(bakeArguments.preset)
+    if(bakeArguments.engine != None):
+        scene.JSPLINEBakeEngine = bakeArguments.engine
+    if(bakeArguments.frames != None):
+        scene.frame_start, scene.frame_end = bakeArguments.frames
+    if(bakeArguments.loop == True):
+        scene.JSPLINELoopedAnimation = True
+    if(bakeArguments.sample_cache != None):
+        scene.JSPLINESampleCacheFolder = os.path.abspath(bakeArguments.sample_cache)
+    if(bakeArguments.profile != None):
+        scene.JSPLINEProfileFile = os.path.abspath(bakeArguments.profile)
+    if(bakeArguments.log_level != None):
+        scene.JSPLINELogLevel = bakeArguments.log_level
+    bonePatterns = bakeArguments.bone
+    if(len(bonePatterns) == 0):
+        bonePatterns = ['*']
+    selectedObjectCount, selectedBoneCount = jeaneSpline.JSPLINE_SelectBakeTargets(bakeArguments.armature,bonePatterns,bakeArguments.object,bakeArguments.collection)
+    if(selectedObjectCount == 0):
+        print("Jeane Spline found nothing to bake in " + bpy.data.filepath)
+        return 1
+    print("Jeane Spline baking " + str(selectedBoneCount) + " bones in " + str(selectedObjectCount) + " objects of " + bpy.data.filepath)
+    bakeEngine = jeaneSpline.JSPLINE_BakeSelected()
+    print("Jeane Spline baked " + str(len(bakeEngine.bakeJob.bakeTargets)) + " bones and objects at " + "{:.1f}".format(scene.JSPLINEBakeFramesPerSecond) + " frames/sec")
+    scene.frame_start, scene.frame_end = sceneFrameRange
+    if(bakeArguments.output != None):
+        bpy.ops.wm.save_as_mainfile(filepath=os.path.abspath(bakeArguments.output))
+    else:
+        bpy.ops.wm.save_mainfile()
+    return 0
+
+#bake one file in its own background Blender process
+def JSPLINE_bakeFileInBlender(blenderPath,blendFilePath,bakeArgumentList):
+    commandLine = [blenderPath,"-b",blendFilePath,"--python",os.path.abspath(__file__),"--python-exit-code","1","--"] + bakeArgumentList
+    startTime = time.perf_counter()
+    completedProcess = subprocess.run(commandLine,stdout=subprocess.PIPE,stderr=subprocess.STDOUT,text=True)
+    return blendFilePath, completedProcess.returncode, time.perf_counter() - startTime, completedProcess.stdout
+
+#bake many files at once, run outside Blender
+def JSPLINE_bakeFiles(batchArgumentList,bakeArgumentList):
+    batchParser = argparse.ArgumentParser(prog="jspline_batch.py",description="Bake Jeane Spline effects in many .blend files with background Blender processes",
+        epilog="Arguments after '--' are passed on to each bake, see 'blender -b --python jspline_batch.py -- --help'.")
+    batchParser.add_argument("files",nargs='+',help=".blend files to bake")
+    batchParser.add_argument("--blender",default="blender",help="path to the Blender executable")
+    batchParser.add_argument("--jobs",type=int,default=os.cpu_count(),help="how many files to bake at the same time, defaults to one per core")
+    batchParser.add_argument("--output-dir",help="save baked files here with their original names instead of saving over them")
+    batchArguments = batchParser.parse_args(batchArgumentList)
+    if(batchArguments.output_dir != None):
+        os.makedirs(batchArguments.output_dir,exist_ok=True)
+    failedFiles = []
+    #each bake runs in its own process, threads only wait on them
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(batchArguments.jobs,1)) as bakeExecutor:
+        bakeJobs = []
+        for blendFilePath in batchArguments.files:
+            fileBakeArguments = list(bakeArgumentList)
+            if(batchArguments.output_dir != None):
+                fileBakeArguments += ["--output",os.path.join(batchArguments.output_dir,os.path.basename(blendFilePath))]
+            bakeJobs.append(bakeExecutor.submit(JSPLINE_bakeFileInBlender,batchArguments.blender,blendFilePath,fileBakeArguments))
+        for bakeJob in concurrent.futures.as_completed(bakeJobs):
+            blendFilePath, returnCode, bakeSeconds, bakeOutput = bakeJob.result()
+            if(returnCode == 0):
+                print("baked " + blendFilePath + " in " + "{:.1f}".format(bakeSeconds) + "s")
+            else:
+                failedFiles.append(blendFilePath)
+                print("FAILED " + blendFilePath + " (exit code " + str(returnCode) + ")")
+                print(bakeOutput)
+    print(str(len(batchArguments.files) - len(failedFiles)) + " of " + str(len(batchArguments.files)) + " files baked")
+    return 1 if len(failedFiles) > 0 else 0
+
+if __name__ == '__main__':
+    try:
+        import bpy
+    except ImportError:
+        bpy = None
+    if(bpy != None):
+        #running inside Blender, Blender's own arguments come before '--'
+        sys.exit(JSPLINE_bakeOpenFile(JSPLINE_splitArguments(sys.argv)[1]))
+    else:
+        sys.exit(JSPLINE_bakeFiles(*JSPLINE_splitArguments(sys.argv[1:])))
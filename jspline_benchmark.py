@@ -0,0 +1,199 @@
+# Jeane Spline Blender Addon
+# Copyright (C) 2022 Pierre
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of  MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#benchmark of Jeane Spline effect math on synthetic rigs, runs with plain python and numpy, without Blender
+#
+#bake 16 chains of 8 bones over 250 frames, with and without noise and looping:
+#   python jspline_benchmark.py --chains 16 --depth 8 --frames 250
+#
+#compare one worker thread with every core:
+#   python jspline_benchmark.py --threads 1
+#   python jspline_benchmark.py --threads 0
+#
+#save results, and fail when a later run is more than 25% slower:
+#   python jspline_benchmark.py --json before.json
+#   python jspline_benchmark.py --baseline before.json --max-slowdown 1.25
+
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+import types
+import numpy
+
+sys.path.insert(0,os.path.dirname(os.path.abspath(__file__)))
+import jspline_standin
+
+#stages of a bake measured by the benchmark, the effect math of baking after sampling and before writing keyframes
+JSPLINE_benchmarkStages = ['noise','delay and smoothing','keyframe reduction','direct effect']
+
+#bone of a synthetic chain, with what chain delays read from a bone
+class JSPLINE_SyntheticLink(dict):
+    def __init__(self,name,parent):
+        super().__init__()
+        self.name = name
+        self.parent = parent
+
+#rotation matrices about the X axis for an array of angles
+def JSPLINE_XRotations(angles):
+    rotations = numpy.broadcast_to(numpy.eye(4),angles.shape + (4,4)).copy()
+    rotations[...,1,1] = numpy.cos(angles)
+    rotations[...,1,2] = -numpy.sin(angles)
+    rotations[...,2,1] = numpy.sin(angles)
+    rotations[...,2,2] = numpy.cos(angles)
+    return rotations
+
+#world matrices of chainCount chains of chainDepth bones swinging over frameCount frames, shaped (frames, bones, 4, 4)
+#bones are numbered chain by chain from the root, each bone swings a little later than its parent
+#looped chains swing a whole number of times over the frame range, so the last frame leads back into the first
+#returns world matrices, world matrices without each bone's own swing and the parent of each bone, -1 for roots
+def JSPLINE_BuildSyntheticRig(chainCount,chainDepth,frameCount,looped,linkLength=1.0):
+    swingPeriod = frameCount / max(round(frameCount / 48),1) if looped == True else 47.3
+    frameTimes = numpy.arange(frameCount)[:,None] * 2 * numpy.pi / swingPeriod
+    chainPhases = numpy.arange(chainCount)[None,:] * 0.7
+    worldMatrices = numpy.zeros((frameCount,chainCount,chainDepth,4,4))
+    parentMatrices = numpy.zeros_like(worldMatrices)
+    linkOffset = numpy.eye(4)
+    linkOffset[1,3] = linkLength
+    for linkDepth in range(0,chainDepth):
+        swingMatrices = JSPLINE_XRotations(0.6 * numpy.sin(frameTimes - chainPhases - linkDepth * 0.5))
+        if(linkDepth == 0):
+            parentMatrices[:,:,0] = numpy.eye(4)
+            parentMatrices[:,:,0,0,3] = numpy.arange(chainCount) * 2 * linkLength
+        else:
+            parentMatrices[:,:,linkDepth] = worldMatrices[:,:,linkDepth-1] @ linkOffset
+        worldMatrices[:,:,linkDepth] = parentMatrices[:,:,linkDepth] @ swingMatrices
+    boneParents = numpy.arange(chainCount * chainDepth) - 1
+    boneParents[::chainDepth] = -1
+    targetShape = (frameCount,chainCount * chainDepth,4,4)
+    return worldMatrices.reshape(targetShape).astype(numpy.float32), parentMatrices.reshape(targetShape).astype(numpy.float32), boneParents
+
+#bake targets of a synthetic rig, with the attributes a bake job reads, and chain delays found the same way as for selected bones
+def JSPLINE_SyntheticBakeTargets(jeaneSpline,chainCount,chainDepth,linkLength=1.0):
+    chainLinks = []
+    for chainNumber in range(0,chainCount):
+        parentLink = None
+        for linkDepth in range(0,chainDepth):
+            parentLink = JSPLINE_SyntheticLink("Chain" + str(chainNumber) + "_" + str(linkDepth),parentLink)
+            chainLinks.append(parentLink)
+    chainDelays = jeaneSpline.JSPLINE_FindChainDelays(chainLinks,lambda chainLink: chainLink.parent)
+    rigObject = types.SimpleNamespace(name="SyntheticRig")
+    return [types.SimpleNamespace(animatedObject=rigObject,boneName=chainLink.name,frameDelay=chainDelays[chainLink.name],offsetLength=linkLength,effectEmpties=[None] * len(jeaneSpline.JSPLINE_emptyTypeNames)) for chainLink in chainLinks]
+
+#run the effect math of one bake of a synthetic rig, returning seconds spent in each stage
+#baking directly also applies the effect to the bones, baking empties stops at their keyframes
+def JSPLINE_BenchmarkBake(jeaneSpline,bakeTargets,worldMatrices,parentMatrices,boneParents,bakeDirect):
+    scene = jeaneSpline.bpy.context.scene
+    stageSeconds = dict((stageName,0.0) for stageName in JSPLINE_benchmarkStages)
+    frameCount = len(worldMatrices)
+    bakeCyclic = jeaneSpline.JSPLINE_IsCyclicBake(scene,True,frameCount)
+    bakeJob = jeaneSpline.JSPLINE_BakeJob(bakeTargets,True)
+    stageStartTime = time.perf_counter()
+    noiseOffsets = bakeJob.generateNoise(frameCount)
+    stageSeconds['noise'] = time.perf_counter() - stageStartTime
+    stageStartTime = time.perf_counter()
+    locations, rotations, keyableFrames, requiredKeys = jeaneSpline.JSPLINE_ComputeEmptyEffect(worldMatrices,noiseOffsets,bakeJob,scene,bakeCyclic)
+    stageSeconds['delay and smoothing'] = time.perf_counter() - stageStartTime
+    stageStartTime = time.perf_counter()
+    rotations, locationKeys, rotationKeys = jeaneSpline.JSPLINE_FindEmptyKeyframes(locations,rotations,keyableFrames,requiredKeys,scene,True,bakeCyclic)
+    stageSeconds['keyframe reduction'] = time.perf_counter() - stageStartTime
+    if(bakeDirect == True):
+        stageStartTime = time.perf_counter()
+        jeaneSpline.JSPLINE_ApplyEffectToTargets(worldMatrices,parentMatrices,boneParents,jeaneSpline.JSPLINE_FindDepthLevels(boneParents),
+            bakeJob.targetEmptyIndices,locations,locationKeys,jeaneSpline.JSPLINE_GetConstraintInfluences(),bakeCyclic)
+        stageSeconds['direct effect'] = time.perf_counter() - stageStartTime
+    return stageSeconds
+
+#benchmark one scenario, fastest of repeatCount runs for timing and one more run for peak memory
+def JSPLINE_RunScenario(jeaneSpline,benchmarkArguments,noiseAmount,looped,bakeDirect):
+    scene = jeaneSpline.bpy.context.scene
+    scene.frame_end = scene.frame_start + benchmarkArguments.frames - 1
+    scene.JSPLINEMaxFrameDelay = 0
+    scene.JSPLINELocationNoise = noiseAmount
+    scene.JSPLINERotationNoise = noiseAmount
+    scene.JSPLINELoopedAnimation = looped
+    scene.JSPLINESmoothFilter = benchmarkArguments.filter
+    scene.JSPLINEWorkerThreads = benchmarkArguments.threads
+    worldMatrices, parentMatrices, boneParents = JSPLINE_BuildSyntheticRig(benchmarkArguments.chains,benchmarkArguments.depth,benchmarkArguments.frames,looped)
+    bakeTargets = JSPLINE_SyntheticBakeTargets(jeaneSpline,benchmarkArguments.chains,benchmarkArguments.depth)
+    bestSeconds = None
+    for repeatNumber in range(0,max(benchmarkArguments.repeat,1)):
+        stageSeconds = JSPLINE_BenchmarkBake(jeaneSpline,bakeTargets,worldMatrices,parentMatrices,boneParents,bakeDirect)
+        if((bestSeconds == None) or (sum(stageSeconds.values()) < sum(bestSeconds.values()))):
+            bestSeconds = stageSeconds
+    #memory is traced in its own run, tracing slows down the loops of the effect math
+    tracemalloc.start()
+    JSPLINE_BenchmarkBake(jeaneSpline,bakeTargets,worldMatrices,parentMatrices,boneParents,bakeDirect)
+    peakBytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    totalSeconds = sum(bestSeconds.values())
+    targetCount = len(bakeTargets)
+    scenarioName = ("direct" if bakeDirect == True else "empties") + (" noise" if noiseAmount > 0 else "") + (" loop" if looped == True else "")
+    threadCount = benchmarkArguments.threads if benchmarkArguments.threads > 0 else (os.cpu_count() or 1)
+    return {'scenario':scenarioName,'chains':benchmarkArguments.chains,'depth':benchmarkArguments.depth,'frames':benchmarkArguments.frames,'threads':threadCount,'targets':targetCount,
+        'seconds':totalSeconds,'stageSeconds':bestSeconds,'framesPerSecond':benchmarkArguments.frames / max(totalSeconds,0.000001),
+        'targetFramesPerSecond':benchmarkArguments.frames * targetCount / max(totalSeconds,0.000001),'peakMegabytes':peakBytes / 1048576}
+
+#scenarios slower than maxSlowdown times their time in a saved benchmark of the same rig size and worker threads
+#benchmarks saved before worker threads were added ran on one thread
+def JSPLINE_FindSlowdowns(benchmarkResults,baselineResults,maxSlowdown):
+    resultKey = lambda benchmarkResult: (benchmarkResult['scenario'],benchmarkResult['chains'],benchmarkResult['depth'],benchmarkResult['frames'],benchmarkResult.get('threads',1))
+    baselineSeconds = dict((resultKey(baselineResult),baselineResult['seconds']) for baselineResult in baselineResults)
+    slowdowns = []
+    for benchmarkResult in benchmarkResults:
+        if((resultKey(benchmarkResult) in baselineSeconds) and (benchmarkResult['seconds'] > baselineSeconds[resultKey(benchmarkResult)] * maxSlowdown)):
+            slowdowns.append((benchmarkResult['scenario'],benchmarkResult['seconds'] / max(baselineSeconds[resultKey(benchmarkResult)],0.000001)))
+    return slowdowns
+
+def JSPLINE_benchmark(argumentList):
+    benchmarkParser = argparse.ArgumentParser(prog="jspline_benchmark.py",description="Benchmark Jeane Spline effect math on synthetic rigs without Blender")
+    benchmarkParser.add_argument("--chains",type=int,default=16,help="number of bone chains in the rig")
+    benchmarkParser.add_argument("--depth",type=int,default=8,help="number of bones in each chain")
+    benchmarkParser.add_argument("--frames",type=int,default=250,help="number of frames to bake")
+    benchmarkParser.add_argument("--filter",choices=['GAUSSIAN','SAVGOL','ONE_EURO','SPRING'],default='GAUSSIAN',help="smoothing filter to bake with")
+    benchmarkParser.add_argument("--threads",type=int,default=0,help="worker threads computing effects, 0 uses every core")
+    benchmarkParser.add_argument("--repeat",type=int,default=3,help="runs of each scenario, the fastest is kept")
+    benchmarkParser.add_argument("--json",help="save results to a JSON file")
+    benchmarkParser.add_argument("--baseline",help="JSON file saved by an earlier run to compare with")
+    benchmarkParser.add_argument("--max-slowdown",type=float,default=1.25,help="fail when a scenario takes this many times longer than in the baseline")
+    benchmarkArguments = benchmarkParser.parse_args(argumentList)
+    jeaneSpline = jspline_standin.JSPLINE_ImportAddon()
+    benchmarkResults = []
+    print("{:<22}{:>10}{:>14}{:>18}{:>12}".format("scenario","seconds","frames/sec","bone frames/sec","peak MB"))
+    for bakeDirect in (False,True):
+        for noiseAmount in (0.0,0.5):
+            for looped in (False,True):
+                benchmarkResult = JSPLINE_RunScenario(jeaneSpline,benchmarkArguments,noiseAmount,looped,bakeDirect)
+                benchmarkResults.append(benchmarkResult)
+                print("{:<22}{:>10.3f}{:>14.1f}{:>18.0f}{:>12.1f}".format(benchmarkResult['scenario'],benchmarkResult['seconds'],benchmarkResult['framesPerSecond'],benchmarkResult['targetFramesPerSecond'],benchmarkResult['peakMegabytes']))
+    #peak memory of the whole process, including the python interpreter and numpy, in kilobytes on Linux
+    print("process peak memory " + "{:.1f}".format(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024) + " MB")
+    if(benchmarkArguments.json != None):
+        with open(benchmarkArguments.json,'w') as resultFile:
+            json.dump({'addonVersion':".".join(str(versionPart) for versionPart in jeaneSpline.bl_info['version']),'numpyVersion':numpy.__version__,'results':benchmarkResults},resultFile,indent=1)
+    if(benchmarkArguments.baseline != None):
+        with open(benchmarkArguments.baseline) as baselineFile:
+            slowdowns = JSPLINE_FindSlowdowns(benchmarkResults,json.load(baselineFile)['results'],benchmarkArguments.max_slowdown)
+        for scenarioName, slowdown in slowdowns:
+            print("SLOWER " + scenarioName + " takes " + "{:.2f}".format(slowdown) + " times as long as in " + benchmarkArguments.baseline)
+        if(len(slowdowns) > 0):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(JSPLINE_benchmark(sys.argv[1:]))
@@ -0,0 +1,711 @@
+# Jeane Spline Blender Addon
+# Copyright (C) 2022 Pierre
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of  MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#effect math of Jeane Spline, working on plain arrays so it runs without Blender
+#
+#bakeJob arguments are a JSPLINE_BakeJob, or anything else with the same empty arrays
+#effectSettings arguments are the scene, or anything else with the same JSPLINE settings
+#
+#benchmark it without Blender with jspline_benchmark.py
+
+import math
+import os
+import threading
+import concurrent.futures
+import numpy
+
+#types of empties made for each bone or object, in the same order as the constraints using them
+JSPLINE_emptyTypeNames = ['delay','delay_rot','delay_roll','smooth','smooth_rot','smooth_roll']
+JSPLINE_constraintTypes = ['COPY_LOCATION','DAMPED_TRACK','LOCKED_TRACK','COPY_LOCATION','DAMPED_TRACK','LOCKED_TRACK']
+#axis each empty type is offset along from its bone or object, -1 for no offset
+JSPLINE_emptyOffsetAxes = [-1,1,2,-1,1,2]
+JSPLINE_delayEmptyTypes = [True,True,True,False,False,False]
+
+#worker threads computing effects of independent bones, objects and empties at the same time
+#numpy lets go of the interpreter while working on arrays, so threads share the work without copying it to other processes
+#work is only split from the main thread, work already running in a worker thread runs in that thread
+JSPLINE_workerCount = 1
+JSPLINE_workerPool = None
+#fewest columns worth handing to a worker thread, fewer are computed in the calling thread
+JSPLINE_minWorkerColumns = 4
+
+#how many worker threads to compute effects with, 0 uses every core
+def JSPLINE_SetWorkerThreads(threadCount):
+    global JSPLINE_workerCount, JSPLINE_workerPool
+    if(threadCount <= 0):
+        threadCount = os.cpu_count() or 1
+    if((threadCount != JSPLINE_workerCount) and (JSPLINE_workerPool != None)):
+        JSPLINE_workerPool.shutdown()
+        JSPLINE_workerPool = None
+    JSPLINE_workerCount = threadCount
+
+#stop the worker threads, they are started again when work is next split
+def JSPLINE_StopWorkerThreads():
+    global JSPLINE_workerPool
+    if(JSPLINE_workerPool != None):
+        JSPLINE_workerPool.shutdown()
+        JSPLINE_workerPool = None
+
+#results of workFunction for every item of workItems in order, shared between the worker threads
+def JSPLINE_MapInParallel(workFunction,workItems):
+    global JSPLINE_workerPool
+    workItems = list(workItems)
+    if((JSPLINE_workerCount <= 1) or (len(workItems) < 2) or (threading.current_thread() != threading.main_thread())):
+        return [workFunction(workItem) for workItem in workItems]
+    if(JSPLINE_workerPool == None):
+        JSPLINE_workerPool = concurrent.futures.ThreadPoolExecutor(max_workers=JSPLINE_workerCount,thread_name_prefix="JSPLINE")
+    return list(JSPLINE_workerPool.map(workFunction,workItems))
+
+#slices splitting columnCount columns into one part for each worker thread, a single slice when the work isn't split
+def JSPLINE_SplitColumns(columnCount):
+    partCount = min(JSPLINE_workerCount,columnCount // JSPLINE_minWorkerColumns)
+    if((partCount <= 1) or (threading.current_thread() != threading.main_thread())):
+        return [slice(0,columnCount)]
+    partEnds = numpy.linspace(0,columnCount,partCount+1).astype(numpy.int64)
+    return [slice(partEnds[partNumber],partEnds[partNumber+1]) for partNumber in range(0,partCount)]
+
+#bounce values back and forth between -limits and limits, like a walk reflecting off the edges of its range
+def JSPLINE_FoldIntoRange(unboundedValues,limits):
+    safeLimits = numpy.where(limits > 0,limits,1)
+    foldedValues = safeLimits - numpy.abs(numpy.mod(unboundedValues + safeLimits,4*safeLimits) - 2*safeLimits)
+    return numpy.where(limits > 0,foldedValues,0)
+
+#noise offsets of every empty for every frame, shape (frames, empties, 3), staying within noiseAmounts times noiseLengths
+#each empty draws from its own random stream seeded by noiseSeeds, so the same seed always gives the same noise for an empty
+def JSPLINE_GenerateNoise(noiseType,noiseSeeds,noiseAmounts,noiseLengths,frameCount,noisePeriod):
+    noiseOffsets = numpy.zeros((frameCount,len(noiseSeeds),3),dtype=numpy.float32)
+    noisyEmpties = numpy.flatnonzero(noiseAmounts > 0)
+    if((len(noisyEmpties) == 0) or (frameCount == 0)):
+        return noiseOffsets
+    randomGenerators = [numpy.random.default_rng(noiseSeeds[emptyNumber]) for emptyNumber in noisyEmpties]
+    lengths = noiseLengths[noisyEmpties][None,:,None].astype(numpy.float64)
+    limits = lengths * noiseAmounts[noisyEmpties][None,:,None]
+    if(noiseType == 'SMOOTH'):
+        #gradient noise with random slopes every noisePeriod frames, starting at a random point along the first period
+        latticeCount = frameCount // noisePeriod + 3
+        gradients = numpy.stack([randomGenerator.uniform(-1,1,size=(latticeCount,3)) for randomGenerator in randomGenerators],axis=1)
+        phases = numpy.array([randomGenerator.uniform(0,1) for randomGenerator in randomGenerators])
+        latticeTimes = numpy.arange(frameCount)[:,None] / noisePeriod + phases[None,:]
+        latticeIndices = numpy.floor(latticeTimes).astype(numpy.int64)
+        u = (latticeTimes - latticeIndices)[...,None]
+        fade = u*u*u*(u*(u*6 - 15) + 10)
+        emptyIndices = numpy.arange(len(noisyEmpties))[None,:]
+        smoothNoise = (1 - fade) * gradients[latticeIndices,emptyIndices] * u + fade * gradients[latticeIndices+1,emptyIndices] * (u - 1)
+        #gradient noise stays within half its slope either side of zero
+        noiseOffsets[:,noisyEmpties] = smoothNoise * 2 * limits
+    elif(noiseType == 'FILTERED'):
+        #white noise blurred with a gaussian about a period wide, scaled so most of it stays within the limits
+        kernelRadius = noisePeriod
+        kernelWeights = numpy.exp(-0.5 * (numpy.arange(-kernelRadius,kernelRadius+1) / (noisePeriod * 0.5)) ** 2)
+        kernelWeights /= numpy.sqrt(numpy.sum(kernelWeights ** 2))
+        whiteNoise = numpy.stack([randomGenerator.standard_normal((frameCount + 2*kernelRadius,3)) for randomGenerator in randomGenerators],axis=1)
+        filteredNoise = numpy.lib.stride_tricks.sliding_window_view(whiteNoise,len(kernelWeights),axis=0) @ kernelWeights
+        noiseOffsets[:,noisyEmpties] = numpy.clip(filteredNoise * 0.5 * limits,-limits,limits)
+    else:
+        #random walk stepping its direction a little every frame, the whole walk is two running sums
+        walkSteps = numpy.stack([randomGenerator.integers(-10,10,size=(frameCount,3)) for randomGenerator in randomGenerators],axis=1) * 0.001
+        walkDirections = JSPLINE_FoldIntoRange(numpy.cumsum(walkSteps,axis=0),0.01*lengths)
+        noiseOffsets[:,noisyEmpties] = JSPLINE_FoldIntoRange(numpy.cumsum(walkDirections * 0.4 * limits,axis=0),limits)
+    return noiseOffsets
+
+#convert an array of 3x3 matrices into w,x,y,z quaternions, ignoring any scale in the matrices
+def JSPLINE_MatricesToQuaternions(rotationMatrices):
+    #normalize matrix axes so scaled bones and objects still give unit quaternions
+    axisLengths = numpy.linalg.norm(rotationMatrices,axis=-2,keepdims=True)
+    axisLengths[axisLengths == 0] = 1
+    m = rotationMatrices / axisLengths
+    m00 = m[...,0,0]
+    m11 = m[...,1,1]
+    m22 = m[...,2,2]
+    trace = m00 + m11 + m22
+    quaternions = numpy.empty(m.shape[:-2] + (4,),dtype=m.dtype)
+    #pick the numerically stable conversion for each matrix based on its largest diagonal value
+    useTrace = trace > 0
+    useX = (useTrace == False) & (m00 >= m11) & (m00 >= m22)
+    useY = (useTrace == False) & (useX == False) & (m11 >= m22)
+    useZ = (useTrace == False) & (useX == False) & (useY == False)
+    with numpy.errstate(divide='ignore',invalid='ignore'):
+        s = numpy.sqrt(numpy.maximum(trace + 1,0)) * 2
+        quaternions[useTrace] = numpy.stack([0.25*s,(m[...,2,1]-m[...,1,2])/s,(m[...,0,2]-m[...,2,0])/s,(m[...,1,0]-m[...,0,1])/s],axis=-1)[useTrace]
+        s = numpy.sqrt(numpy.maximum(1 + m00 - m11 - m22,0)) * 2
+        quaternions[useX] = numpy.stack([(m[...,2,1]-m[...,1,2])/s,0.25*s,(m[...,0,1]+m[...,1,0])/s,(m[...,0,2]+m[...,2,0])/s],axis=-1)[useX]
+        s = numpy.sqrt(numpy.maximum(1 + m11 - m00 - m22,0)) * 2
+        quaternions[useY] = numpy.stack([(m[...,0,2]-m[...,2,0])/s,(m[...,0,1]+m[...,1,0])/s,0.25*s,(m[...,1,2]+m[...,2,1])/s],axis=-1)[useY]
+        s = numpy.sqrt(numpy.maximum(1 + m22 - m00 - m11,0)) * 2
+        quaternions[useZ] = numpy.stack([(m[...,1,0]-m[...,0,1])/s,(m[...,0,2]+m[...,2,0])/s,(m[...,1,2]+m[...,2,1])/s,0.25*s],axis=-1)[useZ]
+    #keep w positive to match the quaternions Blender gives when decomposing matrices
+    quaternions[quaternions[...,0] < 0] *= -1
+    return quaternions
+
+#convert an array of w,x,y,z quaternions into 3x3 rotation matrices, normalizing the quaternions first
+def JSPLINE_QuaternionsToMatrices(quaternions):
+    quaternionLengths = numpy.linalg.norm(quaternions,axis=-1,keepdims=True)
+    quaternionLengths[quaternionLengths == 0] = 1
+    w, x, y, z = numpy.moveaxis(quaternions / quaternionLengths,-1,0)
+    return numpy.stack([
+        numpy.stack([1-2*(y*y+z*z),2*(x*y-w*z),2*(x*z+w*y)],axis=-1),
+        numpy.stack([2*(x*y+w*z),1-2*(x*x+z*z),2*(y*z-w*x)],axis=-1),
+        numpy.stack([2*(x*z-w*y),2*(y*z+w*x),1-2*(x*x+y*y)],axis=-1)],axis=-2)
+
+#convert an array of euler angles into 3x3 rotation matrices, rotating in the order given by an euler rotation mode like 'XYZ'
+def JSPLINE_EulersToMatrices(eulerAngles,rotationMode):
+    rotationMatrices = numpy.broadcast_to(numpy.eye(3),eulerAngles.shape[:-1] + (3,3)).copy()
+    for axisName in rotationMode:
+        axisNumber = 'XYZ'.index(axisName)
+        angleCos = numpy.cos(eulerAngles[...,axisNumber])
+        angleSin = numpy.sin(eulerAngles[...,axisNumber])
+        axisMatrices = numpy.broadcast_to(numpy.eye(3),eulerAngles.shape[:-1] + (3,3)).copy()
+        firstAxis = (axisNumber + 1) % 3
+        secondAxis = (axisNumber + 2) % 3
+        axisMatrices[...,firstAxis,firstAxis] = angleCos
+        axisMatrices[...,firstAxis,secondAxis] = -angleSin
+        axisMatrices[...,secondAxis,firstAxis] = angleSin
+        axisMatrices[...,secondAxis,secondAxis] = angleCos
+        #each following axis rotates the result of the axes before it
+        rotationMatrices = axisMatrices @ rotationMatrices
+    return rotationMatrices
+
+#flip signs of a sequence of w,x,y,z quaternions so each one is on the same side as the one before it, avoiding spins when keyframed
+def JSPLINE_MakeQuaternionsContinuous(quaternions):
+    neighbourDots = numpy.sum(quaternions[1:] * quaternions[:-1],axis=-1)
+    flipSigns = numpy.cumprod(numpy.where(neighbourDots < 0,-1,1),axis=0)
+    continuousQuaternions = quaternions.copy()
+    continuousQuaternions[1:] *= flipSigns[...,None]
+    return continuousQuaternions
+
+#convert an array of w,x,y,z quaternions into angle followed by axis, like rotation_axis_angle
+def JSPLINE_QuaternionsToAxisAngles(quaternions):
+    axisLengths = numpy.linalg.norm(quaternions[...,1:4],axis=-1,keepdims=True)
+    rotationAxes = numpy.where(axisLengths > 0,quaternions[...,1:4] / numpy.where(axisLengths > 0,axisLengths,1),[0,1,0])
+    rotationAngles = 2 * numpy.arctan2(axisLengths,quaternions[...,0:1])
+    return numpy.concatenate([rotationAngles,rotationAxes],axis=-1)
+
+#convert an array of angles followed by axes, like rotation_axis_angle, into w,x,y,z quaternions
+def JSPLINE_AxisAnglesToQuaternions(axisAngles):
+    axisLengths = numpy.linalg.norm(axisAngles[...,1:4],axis=-1,keepdims=True)
+    rotationAxes = numpy.where(axisLengths > 0,axisAngles[...,1:4] / numpy.where(axisLengths > 0,axisLengths,1),0)
+    halfAngles = axisAngles[...,0:1] * 0.5
+    return numpy.concatenate([numpy.cos(halfAngles),numpy.sin(halfAngles) * rotationAxes],axis=-1)
+
+#neighbouring keyframes of every frame in each column of keyMasks, the last key at or before and the first key at or after each frame
+#frames with no key on one side get -1 before the first key and the frame count after the last key
+def JSPLINE_FindNeighbourKeys(keyMasks):
+    frameIndices = numpy.arange(len(keyMasks))[:,None]
+    previousKeys = numpy.maximum.accumulate(numpy.where(keyMasks,frameIndices,-1),axis=0)
+    nextKeys = numpy.minimum.accumulate(numpy.where(keyMasks,frameIndices,len(keyMasks))[::-1],axis=0)[::-1]
+    return previousKeys, nextKeys
+
+#slopes of the curves through the keyed frames of each column at keyFrames of keyColumns, index arrays that broadcast together
+#previousKeys and nextKeys are the neighbouring keys of every frame from JSPLINE_FindNeighbourKeys
+#slopes are those of the parabola through each key and its neighbouring keys, like Catmull-Rom splines weighted by the gaps either side
+#the first and last keys take the slope of the parabola through them and their next two keys, or the straight line to a key they are alone with
+#cyclic curves have a last frame closing the loop back to the first, so the keys before the first key and after the last key are found across the loop
+def JSPLINE_SlopesAtKeys(keyValues,previousKeys,nextKeys,keyFrames,keyColumns,cyclic=False):
+    frameCount = len(keyValues)
+    keysBefore = numpy.where(keyFrames > 0,previousKeys[numpy.maximum(keyFrames-1,0),keyColumns],-1)
+    keysAfter = numpy.where(keyFrames < frameCount-1,nextKeys[numpy.minimum(keyFrames+1,frameCount-1),keyColumns],frameCount)
+    hasBothNeighbours = (keysBefore >= 0) & (keysAfter < frameCount)
+    acrossStart = keysBefore < 0
+    acrossEnd = keysAfter >= frameCount
+    keysBefore = numpy.clip(keysBefore,0,frameCount-1)
+    keysAfter = numpy.clip(keysAfter,0,frameCount-1)
+    frameValues = keyValues[keyFrames,keyColumns]
+    valuesBefore = keyValues[keysBefore,keyColumns]
+    valuesAfter = keyValues[keysAfter,keyColumns]
+    gapsBefore = keyFrames - keysBefore
+    gapsAfter = keysAfter - keyFrames
+    if((cyclic == True) and (frameCount > 2)):
+        #the key before the closing frame comes before the first frame, and the key after the first frame comes after the closing frame
+        #values across the loop are mapped from the closing frame onto the first frame, flipping quaternions that ended on the opposite side and moving euler angles that turned around
+        loopLength = frameCount - 1
+        loopSigns = numpy.where(numpy.all(keyValues[-1] == -keyValues[0],axis=-1,keepdims=True) & numpy.any(keyValues[0] != 0,axis=-1,keepdims=True),-1,1)[keyColumns]
+        loopOffsets = keyValues[0][keyColumns] - loopSigns * keyValues[-1][keyColumns]
+        seamKeysBefore = previousKeys[-2][keyColumns]
+        seamKeysAfter = nextKeys[1][keyColumns]
+        valuesBefore = numpy.where(acrossStart[...,None],loopSigns * keyValues[seamKeysBefore,keyColumns] + loopOffsets,valuesBefore)
+        valuesAfter = numpy.where(acrossEnd[...,None],loopSigns * (keyValues[seamKeysAfter,keyColumns] - keyValues[0][keyColumns]) + keyValues[-1][keyColumns],valuesAfter)
+        gapsBefore = numpy.where(acrossStart,keyFrames + loopLength - seamKeysBefore,gapsBefore)
+        gapsAfter = numpy.where(acrossEnd,seamKeysAfter + loopLength - keyFrames,gapsAfter)
+        hasBothNeighbours = numpy.ones_like(hasBothNeighbours)
+    gapsBefore = numpy.maximum(gapsBefore,1)[...,None]
+    gapsAfter = numpy.maximum(gapsAfter,1)[...,None]
+    slopesBefore = (frameValues - valuesBefore) / gapsBefore
+    slopesAfter = (valuesAfter - frameValues) / gapsAfter
+    #each straight line is weighted by the gap on the other side, giving the slope of the parabola through the key and its neighbours
+    keySlopes = (slopesBefore * gapsAfter + slopesAfter * gapsBefore) / (gapsBefore + gapsAfter)
+    endKeys = hasBothNeighbours == False
+    if(numpy.any(endKeys) == True):
+        #the parabola through an end key and its next two keys, found one key further in
+        endFrames = numpy.broadcast_to(keyFrames,endKeys.shape)[endKeys]
+        endColumns = numpy.broadcast_to(keyColumns,endKeys.shape)[endKeys]
+        endStarts = acrossStart[endKeys]
+        nearKeys = numpy.where(endStarts,keysAfter[endKeys],keysBefore[endKeys])
+        keysBeyond = numpy.where(endStarts,nextKeys[numpy.minimum(nearKeys+1,frameCount-1),endColumns],previousKeys[numpy.maximum(nearKeys-1,0),endColumns])
+        hasKeyBeyond = numpy.where(endStarts,nearKeys < frameCount-1,nearKeys > 0) & (keysBeyond >= 0) & (keysBeyond < frameCount) & (nearKeys != endFrames)
+        keysBeyond = numpy.clip(keysBeyond,0,frameCount-1)
+        nearGaps = numpy.maximum(numpy.abs(nearKeys - endFrames),1)[...,None]
+        farGaps = numpy.maximum(numpy.abs(keysBeyond - nearKeys),1)[...,None]
+        nearSlopes = numpy.where(endStarts[...,None],slopesAfter[endKeys],slopesBefore[endKeys])
+        farSlopes = (keyValues[keysBeyond,endColumns] - keyValues[nearKeys,endColumns]) / numpy.where(endStarts[...,None],farGaps,-farGaps)
+        keySlopes[endKeys] = numpy.where(hasKeyBeyond[...,None],nearSlopes - (farSlopes - nearSlopes) * nearGaps / (nearGaps + farGaps),nearSlopes)
+    #a key on its own stays flat
+    return numpy.where(((hasBothNeighbours == False) & acrossStart & acrossEnd)[...,None],0,keySlopes)
+
+#slope per frame of the curve through the keyed frames of each column, for every keyed frame, see JSPLINE_SlopesAtKeys
+def JSPLINE_KeyframeSlopes(keyMasks,keyValues,cyclic=False):
+    previousKeys, nextKeys = JSPLINE_FindNeighbourKeys(keyMasks)
+    return JSPLINE_SlopesAtKeys(keyValues,previousKeys,nextKeys,numpy.arange(len(keyMasks))[:,None],numpy.arange(keyMasks.shape[1])[None,:],cyclic)
+
+#keys either side of frames of columns, the same key on both sides outside the keys and key 0 for columns without keys
+def JSPLINE_FindSegments(previousKeys,nextKeys,frameIndices,columnIndices):
+    frameCount = len(previousKeys)
+    segmentStarts = previousKeys[frameIndices,columnIndices]
+    segmentEnds = nextKeys[frameIndices,columnIndices]
+    segmentStarts = numpy.where(segmentStarts < 0,segmentEnds,segmentStarts)
+    segmentEnds = numpy.where(segmentEnds >= frameCount,segmentStarts,segmentEnds)
+    segmentStarts[segmentStarts >= frameCount] = 0
+    segmentEnds[segmentEnds >= frameCount] = 0
+    return segmentStarts, segmentEnds
+
+#cubic hermite segments, which is what bezier keyframes with handles a third of the way to each neighbouring key make
+def JSPLINE_HermiteValues(frameIndices,segmentStarts,segmentEnds,startValues,startSlopes,endValues,endSlopes):
+    segmentLengths = segmentEnds - segmentStarts
+    t = ((frameIndices - segmentStarts) / numpy.maximum(segmentLengths,1))[...,None]
+    segmentLengths = segmentLengths[...,None]
+    tSquared = t * t
+    tCubed = tSquared * t
+    return ((2*tCubed - 3*tSquared + 1) * startValues + (tCubed - 2*tSquared + t) * segmentLengths * startSlopes
+        + (3*tSquared - 2*tCubed) * endValues + (tCubed - tSquared) * segmentLengths * endSlopes)
+
+#values at every frame of the curves through the keyed frames of each column, the same curves the keyframes written with these slopes make
+#keyMasks marks the keyed frames of each column, keyValues holds a value for every frame, only keyed frames are used
+#curves stay at the first and last key value outside their keys, columns without keys stay at their first value
+#cyclic curves have a last frame closing the loop back to the first, see JSPLINE_SlopesAtKeys
+def JSPLINE_EvaluateKeyframeCurves(keyMasks,keyValues,cyclic=False):
+    columnIndices = numpy.arange(keyMasks.shape[1])[None,:]
+    frameIndices = numpy.arange(len(keyMasks))[:,None]
+    keySlopes = JSPLINE_KeyframeSlopes(keyMasks,keyValues,cyclic)
+    previousKeys, nextKeys = JSPLINE_FindNeighbourKeys(keyMasks)
+    segmentStarts, segmentEnds = JSPLINE_FindSegments(previousKeys,nextKeys,frameIndices,columnIndices)
+    return JSPLINE_HermiteValues(frameIndices,segmentStarts,segmentEnds,keyValues[segmentStarts,columnIndices],keySlopes[segmentStarts,columnIndices],
+        keyValues[segmentEnds,columnIndices],keySlopes[segmentEnds,columnIndices])
+
+#values of the same curves as JSPLINE_EvaluateKeyframeCurves at frameIndices of columnIndices only, two flat index arrays of the same length
+#only the slopes of the keys either side of the frames are found, once for each key, so few frames cost little however long the curves are
+def JSPLINE_EvaluateCurvesAtFrames(keyValues,previousKeys,nextKeys,frameIndices,columnIndices,cyclic=False):
+    segmentStarts, segmentEnds = JSPLINE_FindSegments(previousKeys,nextKeys,frameIndices,columnIndices)
+    columnCount = keyValues.shape[1]
+    usedKeys, keyNumbers = numpy.unique(numpy.concatenate([segmentStarts,segmentEnds]) * columnCount + numpy.concatenate([columnIndices,columnIndices]),return_inverse=True)
+    keySlopes = JSPLINE_SlopesAtKeys(keyValues,previousKeys,nextKeys,usedKeys // columnCount,usedKeys % columnCount,cyclic)[keyNumbers.ravel()]
+    return JSPLINE_HermiteValues(frameIndices,segmentStarts,segmentEnds,keyValues[segmentStarts,columnIndices],keySlopes[:len(frameIndices)],
+        keyValues[segmentEnds,columnIndices],keySlopes[len(frameIndices):])
+
+#distance between locations of curves and the locations they should pass through
+def JSPLINE_LocationErrors(curveValues,keyValues):
+    return numpy.linalg.norm(curveValues - keyValues,axis=-1)
+
+#angle between w,x,y,z quaternions of curves and the quaternions they should pass through
+def JSPLINE_QuaternionErrors(curveValues,keyValues):
+    quaternionDots = numpy.abs(numpy.sum(curveValues * keyValues,axis=-1))
+    quaternionLengths = numpy.linalg.norm(curveValues,axis=-1) * numpy.linalg.norm(keyValues,axis=-1)
+    return 2 * numpy.arccos(numpy.clip(quaternionDots / numpy.maximum(quaternionLengths,1e-12),0,1))
+
+#angle between rotation matrices of curves and the rotation matrices they should pass through
+def JSPLINE_RotationMatrixErrors(curveMatrices,keyMatrices):
+    rotationCosines = (numpy.einsum('...ij,...ij->...',curveMatrices,keyMatrices) - 1) * 0.5
+    return numpy.arccos(numpy.clip(rotationCosines,-1,1))
+
+#error function measuring angles between euler rotations of rotationMode, for JSPLINE_ReduceKeyframes
+def JSPLINE_EulerErrorFunction(rotationMode):
+    return lambda curveValues,keyValues: JSPLINE_RotationMatrixErrors(JSPLINE_EulersToMatrices(curveValues,rotationMode),JSPLINE_EulersToMatrices(keyValues,rotationMode))
+
+#weights of a centred filter over smoothFrames frames either side, for filters that look at frames both before and after
+def JSPLINE_FilterWeights(filterType,smoothFrames):
+    frameOffsets = numpy.arange(-smoothFrames,smoothFrames+1)
+    if(filterType == 'SAVGOL'):
+        #value at the centre of a cubic fitted to the window by least squares, which keeps peaks sharper than blurring
+        #a three frame window fits a straight line, a curve through all three frames would leave them as they are
+        polynomialDegree = min(3,2*smoothFrames-1)
+        return numpy.linalg.pinv(numpy.vander(frameOffsets,polynomialDegree+1,increasing=True))[0]
+    #gaussian blur reaching about two deviations either side
+    filterWeights = numpy.exp(-0.5 * (frameOffsets / (smoothFrames * 0.5)) ** 2)
+    return filterWeights / numpy.sum(filterWeights)
+
+#one euro filter following frames in order, smoothing heavily when values move slowly and less when they move fast
+#the slowest cutoff takes about smoothFrames frames to catch up, speedResponse raises the cutoff with the speed of each column
+def JSPLINE_OneEuroFilter(frameValues,smoothFrames,speedResponse):
+    filteredValues = numpy.empty_like(frameValues)
+    filteredValues[0] = frameValues[0]
+    filteredSpeeds = numpy.zeros_like(frameValues[0])
+    minimumCutoff = 1 / (2 * math.pi * smoothFrames)
+    for frameIndex in range(1,len(frameValues)):
+        #speed is smoothed with a cutoff of one cycle per frame
+        filteredSpeeds += (frameValues[frameIndex] - filteredValues[frameIndex-1] - filteredSpeeds) * 0.5
+        cutoffs = minimumCutoff + speedResponse * numpy.linalg.norm(filteredSpeeds,axis=-1,keepdims=True)
+        smoothingFactors = 1 / (1 + 1 / (2 * math.pi * cutoffs))
+        filteredValues[frameIndex] = filteredValues[frameIndex-1] + (frameValues[frameIndex] - filteredValues[frameIndex-1]) * smoothingFactors
+    return filteredValues
+
+#critically damped spring following frames in order, settling on each new value in about smoothFrames frames without overshooting
+def JSPLINE_SpringFilter(frameValues,smoothFrames):
+    filteredValues = numpy.empty_like(frameValues)
+    filteredValues[0] = frameValues[0]
+    springVelocities = numpy.zeros_like(frameValues[0])
+    springStrength = 2 / smoothFrames
+    springDecay = math.exp(-springStrength)
+    for frameIndex in range(1,len(frameValues)):
+        #exact spring motion over one frame towards the value of the frame
+        springOffsets = filteredValues[frameIndex-1] - frameValues[frameIndex]
+        springChanges = springVelocities + springStrength * springOffsets
+        springVelocities = (springVelocities - springStrength * springChanges) * springDecay
+        filteredValues[frameIndex] = frameValues[frameIndex] + (springOffsets + springChanges) * springDecay
+    return filteredValues
+
+#smooth values of every column over frames with a filter from JSPLINESmoothFilter, shaped (frames, columns, channels)
+#looped values wrap around from the end to the start, otherwise the first and last frames are repeated past the ends
+#quaternions are kept on the same side as the frames around them while filtering, and normalized afterwards
+def JSPLINE_FilterOverFrames(frameValues,filterType,smoothFrames,looped,speedResponse=0,quaternions=False):
+    frameCount = len(frameValues)
+    if((smoothFrames <= 0) or (frameCount < 2)):
+        return frameValues.copy()
+    isCausal = filterType in ('ONE_EURO','SPRING')
+    if(isCausal == True):
+        #filters following frames in order start from the first frame, or run through the loop once first to start where the loop ends
+        paddedIndices = numpy.arange(frameCount)
+        if(looped == True):
+            paddedIndices = numpy.concatenate([paddedIndices,paddedIndices])
+    else:
+        paddedIndices = numpy.arange(-smoothFrames,frameCount+smoothFrames)
+        if(looped == True):
+            paddedIndices = numpy.mod(paddedIndices,frameCount)
+        else:
+            paddedIndices = numpy.clip(paddedIndices,0,frameCount-1)
+    paddedValues = frameValues[paddedIndices].astype(numpy.float64)
+    if(quaternions == True):
+        paddedValues = JSPLINE_MakeQuaternionsContinuous(paddedValues)
+    if(filterType == 'ONE_EURO'):
+        filteredValues = JSPLINE_OneEuroFilter(paddedValues,smoothFrames,speedResponse)[-frameCount:]
+    elif(filterType == 'SPRING'):
+        filteredValues = JSPLINE_SpringFilter(paddedValues,smoothFrames)[-frameCount:]
+    else:
+        filterWindows = numpy.lib.stride_tricks.sliding_window_view(paddedValues,2*smoothFrames+1,axis=0)
+        filteredValues = filterWindows @ JSPLINE_FilterWeights(filterType,smoothFrames)
+    if(quaternions == True):
+        filteredValues /= numpy.maximum(numpy.linalg.norm(filteredValues,axis=-1,keepdims=True),1e-12)
+    return filteredValues.astype(frameValues.dtype)
+
+#remove keys of each column that its curve stays within tolerance without, going through its keys a quarter at a time
+#keys four apart don't change each other's curves, taking one out only changes the curve from two keys before it to two keys after it
+#the first and last keys stay, and for cyclic curves the keys next to them as well, those change the slopes across the loop
+def JSPLINE_PruneKeyframes(keyMasks,keyValues,requiredKeys,checkedFrames,findErrors,tolerance,cyclic,errorScales):
+    frameCount = len(keyMasks)
+    endRanks = 2 if cyclic == True else 1
+    for keyPhase in range(0,4):
+        keyRanks = numpy.cumsum(keyMasks,axis=0) - 1
+        removableKeys = keyMasks & (requiredKeys == False) & (keyRanks % 4 == keyPhase) & (keyRanks >= endRanks) & (keyRanks <= keyRanks[-1][None,:] - endRanks)
+        removedFrames, removedColumns = numpy.nonzero(removableKeys)
+        if(len(removedFrames) == 0):
+            continue
+        previousKeys, nextKeys = JSPLINE_FindNeighbourKeys(keyMasks)
+        keysBefore = previousKeys[removedFrames-1,removedColumns]
+        keysAfter = nextKeys[removedFrames+1,removedColumns]
+        changedStarts = numpy.where(keysBefore > 0,previousKeys[numpy.maximum(keysBefore-1,0),removedColumns],keysBefore)
+        changedStarts = numpy.where(changedStarts < 0,keysBefore,changedStarts)
+        changedEnds = numpy.where(keysAfter < frameCount-1,nextKeys[numpy.minimum(keysAfter+1,frameCount-1),removedColumns],keysAfter)
+        changedEnds = numpy.where(changedEnds >= frameCount,keysAfter,changedEnds)
+        keyMasks[removedFrames,removedColumns] = False
+        previousKeys, nextKeys = JSPLINE_FindNeighbourKeys(keyMasks)
+        #measure every frame the removals changed, and put back keys whose removal took a frame out of tolerance
+        rangeLengths = changedEnds - changedStarts + 1
+        removalNumbers = numpy.repeat(numpy.arange(len(removedFrames)),rangeLengths)
+        rangeFrames = changedStarts[removalNumbers] + numpy.arange(len(removalNumbers)) - numpy.repeat(numpy.cumsum(rangeLengths) - rangeLengths,rangeLengths)
+        rangeColumns = removedColumns[removalNumbers]
+        measuredFrames = checkedFrames[rangeFrames,rangeColumns] & (keyMasks[rangeFrames,rangeColumns] == False)
+        rangeFrames = rangeFrames[measuredFrames]
+        rangeColumns = rangeColumns[measuredFrames]
+        curveValues = JSPLINE_EvaluateCurvesAtFrames(keyValues,previousKeys,nextKeys,rangeFrames,rangeColumns,cyclic)
+        strayFrames = findErrors(curveValues,keyValues[rangeFrames,rangeColumns]) * errorScales[rangeColumns] > tolerance
+        keptKeys = numpy.bincount(removalNumbers[measuredFrames][strayFrames],minlength=len(removedFrames)) > 0
+        keyMasks[removedFrames[keptKeys],removedColumns[keptKeys]] = True
+
+#fewest keyframes for each column so the curves through them stay within tolerance of keyValues on every keyable frame
+#keyableFrames marks frames of each column that can be keyed, requiredKeys marks frames that must be keyed
+#findErrors measures how far curve values are from keyValues for every frame and column, errorScales can scale the errors of each column
+#cyclic curves have a last frame closing the loop back to the first, see JSPLINE_KeyframeSlopes
+#columns don't depend on each other, so they are split between the worker threads
+def JSPLINE_ReduceKeyframes(keyValues,keyableFrames,requiredKeys,findErrors,tolerance,cyclic=False,errorScales=None):
+    frameCount, columnCount = keyableFrames.shape
+    columnParts = JSPLINE_SplitColumns(columnCount)
+    if(len(columnParts) > 1):
+        reducePart = lambda columnPart: JSPLINE_ReduceKeyframes(keyValues[:,columnPart],keyableFrames[:,columnPart],requiredKeys[:,columnPart],findErrors,tolerance,cyclic,None if errorScales is None else errorScales[columnPart])
+        return numpy.concatenate(JSPLINE_MapInParallel(reducePart,columnParts),axis=1)
+    if(errorScales is None):
+        errorScales = numpy.ones(columnCount)
+    keyMasks = requiredKeys.copy()
+    #start with the first and last keyable frames, then add keys where curves stray too far
+    hasKeyableFrames = numpy.any(keyableFrames,axis=0)
+    columnIndices = numpy.arange(columnCount)
+    keyMasks[numpy.argmax(keyableFrames,axis=0)[hasKeyableFrames],columnIndices[hasKeyableFrames]] = True
+    keyMasks[frameCount-1-numpy.argmax(keyableFrames[::-1],axis=0)[hasKeyableFrames],columnIndices[hasKeyableFrames]] = True
+    checkedFrames = keyableFrames | requiredKeys
+    if(frameCount > 3):
+        #curves stray from their keys about a fiftieth of the third difference of their values times the gap between keys cubed
+        #so keys start out spaced by the largest third difference around each frame, and are only added or removed where that is off
+        thirdDifferences = findErrors(keyValues[3:] - 3*keyValues[2:-1] + 3*keyValues[1:-2],keyValues[:-3]) * errorScales
+        thirdDifferences = numpy.pad(thirdDifferences,((3,4),(0,0)),mode='edge')
+        thirdDifferences = numpy.lib.stride_tricks.sliding_window_view(thirdDifferences,5,axis=0).max(axis=-1)
+        keyDensities = numpy.cbrt(0.02 * thirdDifferences / max(tolerance,1e-12))
+        keyMasks[1:] |= (numpy.diff(numpy.floor(numpy.cumsum(keyDensities,axis=0)),axis=0) > 0) & checkedFrames[1:]
+    #errors of every frame are measured once, after that only frames of the segments whose curves a new key changed are measured again
+    frameErrors = numpy.zeros((frameCount,columnCount))
+    measuredFrames = checkedFrames & (keyMasks == False)
+    #columns without stray frames are done and aren't looked at again
+    activeColumns = columnIndices
+    while(True):
+        activeKeys = keyMasks[:,activeColumns]
+        activeValues = keyValues[:,activeColumns]
+        previousKeys, nextKeys = JSPLINE_FindNeighbourKeys(activeKeys)
+        measuredFrameIndices, measuredColumns = numpy.nonzero(measuredFrames[:,activeColumns])
+        curveValues = JSPLINE_EvaluateCurvesAtFrames(activeValues,previousKeys,nextKeys,measuredFrameIndices,measuredColumns,cyclic)
+        frameErrors[measuredFrameIndices,activeColumns[measuredColumns]] = findErrors(curveValues,activeValues[measuredFrameIndices,measuredColumns]) * errorScales[activeColumns[measuredColumns]]
+        activeErrors = frameErrors[:,activeColumns]
+        strayFrames = numpy.flatnonzero(activeErrors.ravel() > tolerance)
+        if(len(strayFrames) == 0):
+            JSPLINE_PruneKeyframes(keyMasks,keyValues,requiredKeys,checkedFrames,findErrors,tolerance,cyclic,errorScales)
+            return keyMasks
+        #find the frame furthest from the curve in every stray segment between two keys
+        strayFrameIndices, strayColumns = numpy.divmod(strayFrames,len(activeColumns))
+        segmentIds = previousKeys[strayFrameIndices,strayColumns] + strayColumns * (frameCount + 1)
+        sortOrder = numpy.lexsort((-activeErrors.ravel()[strayFrames],segmentIds))
+        firstInSegment = numpy.concatenate([[True],segmentIds[sortOrder][1:] != segmentIds[sortOrder][:-1]])
+        worstFrames = strayFrameIndices[sortOrder[firstInSegment]]
+        worstColumns = strayColumns[sortOrder[firstInSegment]]
+        segmentStarts = previousKeys[worstFrames,worstColumns]
+        segmentLengths = nextKeys[worstFrames,worstColumns] - segmentStarts
+        #curves stray from their keys about with the cube of the gap between keys, so stray segments are split into enough even parts to come within tolerance at once
+        partCounts = numpy.clip(numpy.ceil(numpy.cbrt(activeErrors[worstFrames,worstColumns] / tolerance)),2,segmentLengths).astype(numpy.int64)
+        segmentNumbers = numpy.repeat(numpy.arange(len(worstFrames)),partCounts-1)
+        partNumbers = numpy.arange(len(segmentNumbers)) - numpy.repeat(numpy.cumsum(partCounts-1) - (partCounts-1),partCounts-1) + 1
+        splitFrames = segmentStarts[segmentNumbers] + numpy.rint(partNumbers * segmentLengths[segmentNumbers] / partCounts[segmentNumbers]).astype(numpy.int64)
+        splitColumns = worstColumns[segmentNumbers]
+        #frames that can't be keyed aren't split at, segments left without a split are split at their furthest frame
+        usableSplits = checkedFrames[splitFrames,activeColumns[splitColumns]]
+        hasSplit = numpy.bincount(segmentNumbers[usableSplits],minlength=len(worstFrames)) > 0
+        newFrames = numpy.concatenate([splitFrames[usableSplits],worstFrames[hasSplit == False]])
+        newColumns = numpy.concatenate([splitColumns[usableSplits],worstColumns[hasSplit == False]])
+        keyMasks[newFrames,activeColumns[newColumns]] = True
+        frameErrors[newFrames,activeColumns[newColumns]] = 0
+        #a new key changes the slopes of itself and the keys either side, and so the curves from the key before those to the key after them
+        keysBefore = previousKeys[newFrames,newColumns]
+        keysAfter = nextKeys[newFrames,newColumns]
+        changedStarts = numpy.where(keysBefore > 0,previousKeys[numpy.maximum(keysBefore-1,0),newColumns],0)
+        changedEnds = numpy.where(keysAfter < frameCount-1,nextKeys[numpy.minimum(keysAfter+1,frameCount-1),newColumns],frameCount-1)
+        changedStarts = numpy.clip(changedStarts,0,frameCount-1)
+        changedEnds = numpy.clip(changedEnds,0,frameCount-1)
+        if(cyclic == True):
+            #new keys next to the loop change the slopes of the first and closing frames, and so the first and last segments
+            changedColumns = numpy.unique(newColumns)
+            changedStarts = numpy.concatenate([changedStarts,numpy.zeros(len(changedColumns),dtype=changedStarts.dtype),numpy.maximum(previousKeys[-2,changedColumns],0)])
+            changedEnds = numpy.concatenate([changedEnds,numpy.minimum(nextKeys[1,changedColumns],frameCount-1),numpy.full(len(changedColumns),frameCount-1)])
+            newColumns = numpy.concatenate([newColumns,changedColumns,changedColumns])
+        rangeChanges = numpy.zeros((frameCount+1,len(activeColumns)),dtype=numpy.int32)
+        numpy.add.at(rangeChanges,(changedStarts,newColumns),1)
+        numpy.add.at(rangeChanges,(changedEnds+1,newColumns),-1)
+        changedFrames = numpy.cumsum(rangeChanges[:-1],axis=0) > 0
+        measuredFrames[:,activeColumns] = changedFrames & checkedFrames[:,activeColumns] & (keyMasks[:,activeColumns] == False)
+        activeColumns = activeColumns[numpy.unique(newColumns)]
+
+#undelayed locations and rotations of every empty from world matrices of every target, shaped (frames, targets, 4, 4)
+#emptyTargetIndices is the target of each empty and emptyOffsets how far out from its target each empty is
+def JSPLINE_FindEmptyTransforms(targetMatrices,emptyTargetIndices,emptyOffsets):
+    emptyMatrices = targetMatrices[:,emptyTargetIndices]
+    locations = numpy.einsum('feij,ej->fei',emptyMatrices[...,:3,:3],emptyOffsets) + emptyMatrices[...,:3,3]
+    rotations = JSPLINE_MatricesToQuaternions(emptyMatrices[...,:3,:3])
+    return locations, rotations
+
+#delay empties read from emptyDelays frames earlier, other empties are left as they are
+#delay empties can only be keyframed once enough frames have elapsed, keyableFrames marks the frames each empty can be keyframed on
+#cyclic delays run on from the end of the frames into the start, as if the frames had played through once already
+def JSPLINE_DelayEmptyTransforms(locations,rotations,emptyDelays,isDelayEmpty,cyclic=False):
+    frameCount, emptyCount = locations.shape[:2]
+    elapsedFrames = numpy.arange(frameCount)[:,None]
+    historyIndices = numpy.maximum(elapsedFrames - emptyDelays[None,:],0)
+    emptyIndices = numpy.arange(emptyCount)[None,:]
+    keyableFrames = (isDelayEmpty == False)[None,:] | (emptyDelays[None,:] < elapsedFrames)
+    if(cyclic == True):
+        historyIndices = numpy.mod(elapsedFrames - emptyDelays[None,:],frameCount)
+        keyableFrames = numpy.ones((frameCount,emptyCount),dtype=bool)
+    return locations[historyIndices,emptyIndices], rotations[historyIndices,emptyIndices], keyableFrames
+
+#filter transforms of smoothing empties over frames all at once, delay empties are left as they are
+def JSPLINE_SmoothEmptyTransforms(locations,rotations,isDelayEmpty,effectSettings):
+    smoothEmpties = numpy.flatnonzero(isDelayEmpty == False)
+    locations = locations.copy()
+    rotations = JSPLINE_MakeQuaternionsContinuous(rotations)
+    if(len(smoothEmpties) > 0):
+        filterSettings = (effectSettings.JSPLINESmoothFilter,effectSettings.JSPLINESmoothFrames,effectSettings.JSPLINELoopedAnimation,effectSettings.JSPLINESmoothSpeedResponse)
+        locations[:,smoothEmpties] = JSPLINE_FilterOverFrames(locations[:,smoothEmpties],*filterSettings)
+        rotations[:,smoothEmpties] = JSPLINE_FilterOverFrames(rotations[:,smoothEmpties],*filterSettings,quaternions=True)
+    return locations, rotations
+
+#whether a bake is cyclic, looped animation baked through the whole frame range, with enough frames to blend the seam of the loop
+def JSPLINE_IsCyclicBake(effectSettings,bakeCompleted,frameCount):
+    return (effectSettings.JSPLINELoopedAnimation == True) and (bakeCompleted == True) and (frameCount >= 4)
+
+#blend away the jump where looped values wrap from their last frame back to their first, over blendFrames frames either side of the loop
+#the jump is measured against the average speed either side of the loop, and half of it is blended into each side so the two sides meet
+#quaternions on opposite sides of the loop are blended as if on the same side, and normalized afterwards
+def JSPLINE_BlendLoopSeam(frameValues,blendFrames,quaternions=False):
+    frameCount = len(frameValues)
+    blendFrames = min(blendFrames,frameCount // 2)
+    if((blendFrames < 1) or (frameCount < 4)):
+        return frameValues.copy()
+    blendedValues = frameValues.astype(numpy.float64)
+    seamSigns = 1
+    if(quaternions == True):
+        seamSigns = numpy.where(numpy.sum(blendedValues[0] * blendedValues[-1],axis=-1,keepdims=True) < 0,-1,1)
+    startValues = blendedValues[:2] * seamSigns
+    seamSpeeds = ((blendedValues[-1] - blendedValues[-2]) + (startValues[1] - startValues[0])) * 0.5
+    halfJumps = (startValues[0] - blendedValues[-1] - seamSpeeds) * 0.5
+    #weights ease out from the whole half jump on the frames next to the loop to nothing blendFrames frames away
+    blendDistances = numpy.arange(blendFrames) / blendFrames
+    blendWeights = (1 - blendDistances * blendDistances * (3 - 2 * blendDistances)).reshape((blendFrames,) + (1,) * (frameValues.ndim - 1))
+    blendedValues[frameCount-1:frameCount-1-blendFrames:-1] += blendWeights * halfJumps
+    blendedValues[:blendFrames] -= blendWeights * halfJumps * seamSigns
+    if(quaternions == True):
+        blendedValues /= numpy.maximum(numpy.linalg.norm(blendedValues,axis=-1,keepdims=True),1e-12)
+    return blendedValues.astype(frameValues.dtype)
+
+#looped values with a closing frame after the last frame repeating the first, so curves keyed through it repeat seamlessly
+#quaternions of the closing frame stay on the same side as the last frame, which is the same rotation as the first frame
+def JSPLINE_CloseLoop(frameValues,quaternions=False):
+    closingValues = frameValues[:1].copy()
+    if(quaternions == True):
+        closingValues[numpy.sum(closingValues * frameValues[-1:],axis=-1) < 0] *= -1
+    return numpy.concatenate([frameValues,closingValues])
+
+#delay, noise, smoothing and loop seam blending of every empty over sampled frames, from world matrices of every target shaped (frames, targets, 4, 4)
+#noiseOffsets holds the noise of every empty for every frame
+#cyclic effects delay across the loop, blend the seam over JSPLINELoopBlendFrames frames and get a closing frame repeating the first, see JSPLINE_IsCyclicBake
+#returns locations and rotations of every empty for every frame, with the frames each empty can be keyframed on and the frames each must be keyframed on
+def JSPLINE_ComputeEmptyEffect(targetMatrices,noiseOffsets,bakeJob,effectSettings,cyclic=False):
+    locations, rotations = JSPLINE_FindEmptyTransforms(targetMatrices,bakeJob.emptyTargetIndices,bakeJob.emptyOffsets)
+    locations, rotations, keyableFrames = JSPLINE_DelayEmptyTransforms(locations,rotations,bakeJob.emptyDelays,bakeJob.isDelayEmpty,cyclic)
+    requiredKeys = numpy.zeros_like(keyableFrames)
+    locations += noiseOffsets
+    locations, rotations = JSPLINE_SmoothEmptyTransforms(locations,rotations,bakeJob.isDelayEmpty,effectSettings)
+    if(cyclic == True):
+        locations, rotations = JSPLINE_BlendAndCloseLoop(locations,rotations,effectSettings.JSPLINELoopBlendFrames)
+        keyableFrames = JSPLINE_CloseLoop(keyableFrames)
+        requiredKeys = JSPLINE_CloseLoop(requiredKeys)
+    return locations, rotations, keyableFrames, requiredKeys
+
+#blend the loop seam of empty locations and rotations and add the closing frame, see JSPLINE_BlendLoopSeam and JSPLINE_CloseLoop
+def JSPLINE_BlendAndCloseLoop(locations,rotations,blendFrames):
+    locations = JSPLINE_CloseLoop(JSPLINE_BlendLoopSeam(locations,blendFrames))
+    rotations = JSPLINE_CloseLoop(JSPLINE_BlendLoopSeam(rotations,blendFrames,quaternions=True),quaternions=True)
+    return locations, rotations
+
+#fewest location and rotation keyframes for every empty that stay within the keyframe tolerances
+#keyableFrames marks frames each empty can be keyed on, requiredKeys marks frames each empty must be keyed on
+#without reduceKeys every keyable frame is kept, so curves follow the effect exactly
+#returns rotations made continuous for keyframing, with the location and rotation keyframes
+#cyclic keyframes close a loop, see JSPLINE_ComputeEmptyEffect
+def JSPLINE_FindEmptyKeyframes(locations,rotations,keyableFrames,requiredKeys,effectSettings,reduceKeys=True,cyclic=False):
+    rotations = JSPLINE_MakeQuaternionsContinuous(rotations)
+    if(reduceKeys == False):
+        return rotations, keyableFrames | requiredKeys, keyableFrames | requiredKeys
+    locationKeys = JSPLINE_ReduceKeyframes(locations,keyableFrames,requiredKeys,JSPLINE_LocationErrors,effectSettings.JSPLINELocationTolerance,cyclic)
+    rotationKeys = JSPLINE_ReduceKeyframes(rotations,keyableFrames,requiredKeys,JSPLINE_QuaternionErrors,effectSettings.JSPLINERotationTolerance,cyclic)
+    return rotations, locationKeys, rotationKeys
+
+#apply the effect constraints to world matrices of bones or objects, the same way Blender evaluates the constraints following empties
+#effectLocations holds the location of each empty type for every matrix
+def JSPLINE_ApplyEffectConstraints(ownerMatrices,effectLocations,constraintInfluences):
+    ownerMatrices = ownerMatrices.copy()
+    for constraintNumber in range(0,len(JSPLINE_constraintTypes)):
+        influence = constraintInfluences[constraintNumber]
+        targetLocations = effectLocations[...,constraintNumber,:]
+        if(influence <= 0):
+            continue
+        if(JSPLINE_constraintTypes[constraintNumber] == 'COPY_LOCATION'):
+            ownerMatrices[...,:3,3] += (targetLocations - ownerMatrices[...,:3,3]) * influence
+        elif(JSPLINE_constraintTypes[constraintNumber] == 'DAMPED_TRACK'):
+            #shortest rotation turning the Y axis towards the target, with the angle scaled by influence
+            trackAxes = ownerMatrices[...,:3,1]
+            targetDirections = targetLocations - ownerMatrices[...,:3,3]
+            rotationAxes = numpy.cross(trackAxes,targetDirections)
+            axisLengths = numpy.linalg.norm(rotationAxes,axis=-1,keepdims=True)
+            rotationAngles = numpy.arctan2(axisLengths,numpy.sum(trackAxes * targetDirections,axis=-1,keepdims=True)) * influence
+            rotationAxes = numpy.where(axisLengths > 1e-12,rotationAxes / numpy.where(axisLengths > 1e-12,axisLengths,1),0)
+            angleCos = numpy.cos(rotationAngles)[...,None]
+            angleSin = numpy.sin(rotationAngles)[...,None]
+            x, y, z = numpy.moveaxis(rotationAxes,-1,0)
+            zeros = numpy.zeros_like(x)
+            crossMatrices = numpy.stack([numpy.stack([zeros,-z,y],axis=-1),numpy.stack([z,zeros,-x],axis=-1),numpy.stack([-y,x,zeros],axis=-1)],axis=-2)
+            rotationMatrices = angleCos * numpy.eye(3) + angleSin * crossMatrices + (1 - angleCos) * (rotationAxes[...,:,None] * rotationAxes[...,None,:])
+            ownerMatrices[...,:3,:3] = rotationMatrices @ ownerMatrices[...,:3,:3]
+        #locked track constraints track and lock the same axis, which Blender skips as invalid
+    return ownerMatrices
+
+#inverse of every matrix, matrices that can't be inverted, like those of bones and objects keyed to zero scale, get their pseudo-inverse
+def JSPLINE_InvertMatrices(matrices):
+    isSingular = numpy.abs(numpy.linalg.det(matrices)) < 1e-12
+    if(numpy.any(isSingular) == False):
+        return numpy.linalg.inv(matrices)
+    invertedMatrices = numpy.empty_like(matrices)
+    invertedMatrices[isSingular == False] = numpy.linalg.inv(matrices[isSingular == False])
+    invertedMatrices[isSingular] = numpy.linalg.pinv(matrices[isSingular])
+    return invertedMatrices
+
+#targets grouped by how many baked ancestors they have, so parents come before their children
+#ancestorIndices is the nearest baked ancestor of each target, -1 for none
+def JSPLINE_FindDepthLevels(ancestorIndices):
+    targetDepths = numpy.zeros(len(ancestorIndices),dtype=numpy.int64)
+    for targetNumber in range(0,len(ancestorIndices)):
+        ancestorIndex = ancestorIndices[targetNumber]
+        while(ancestorIndex >= 0):
+            targetDepths[targetNumber] += 1
+            ancestorIndex = ancestorIndices[ancestorIndex]
+    if(len(targetDepths) == 0):
+        return []
+    return [numpy.flatnonzero(targetDepths == targetDepth) for targetDepth in range(0,targetDepths.max()+1)]
+
+#matrices of every target relative to its parent with the effect of the empties applied, shaped (frames, targets, 4, 4)
+#sourceMatrices are world matrices of every target and parentMatrices are world matrices without each target's own transform
+#targets follow the effect already applied to their nearest baked ancestor, depthLevels come from JSPLINE_FindDepthLevels
+#cyclic empty locations and keys have a closing frame after the frames of the targets, see JSPLINE_ComputeEmptyEffect
+def JSPLINE_ApplyEffectToTargets(sourceMatrices,parentMatrices,ancestorIndices,depthLevels,targetEmptyIndices,emptyLocations,locationKeys,constraintInfluences,cyclic=False):
+    frameCount = len(sourceMatrices)
+    #empties are only keyframed on some frames, constraints would follow their curves in between
+    #locked track constraints don't change anything, so their empties are skipped
+    usedEmptyTypes = [typeNumber for typeNumber in range(0,len(JSPLINE_emptyTypeNames)) if (constraintInfluences[typeNumber] > 0) and (JSPLINE_constraintTypes[typeNumber] != 'LOCKED_TRACK')]
+    usedEmpties = targetEmptyIndices[:,usedEmptyTypes].ravel()
+    emptyLocations = emptyLocations.astype(numpy.float64)
+    emptyLocations[:,usedEmpties] = JSPLINE_EvaluateKeyframeCurves(locationKeys[:,usedEmpties],emptyLocations[:,usedEmpties],cyclic)
+    emptyLocations = emptyLocations[:frameCount]
+    sourceMatrices = sourceMatrices.astype(numpy.float64)
+    parentMatrices = parentMatrices.astype(numpy.float64)
+    finalMatrices = sourceMatrices.copy()
+    for depthLevel in depthLevels:
+        ancestorLevel = ancestorIndices[depthLevel]
+        hasAncestor = numpy.flatnonzero(ancestorLevel >= 0)
+        parentCorrections = numpy.broadcast_to(numpy.eye(4),(frameCount,len(depthLevel),4,4)).copy()
+        if(len(hasAncestor) > 0):
+            ancestorTargets = ancestorLevel[hasAncestor]
+            parentCorrections[:,hasAncestor] = finalMatrices[:,ancestorTargets] @ JSPLINE_InvertMatrices(sourceMatrices[:,ancestorTargets])
+        parentMatrices[:,depthLevel] = parentCorrections @ parentMatrices[:,depthLevel]
+        finalMatrices[:,depthLevel] = JSPLINE_ApplyEffectConstraints(parentCorrections @ sourceMatrices[:,depthLevel],emptyLocations[:,targetEmptyIndices[depthLevel]],constraintInfluences)
+    return JSPLINE_InvertMatrices(parentMatrices) @ finalMatrices
@@ -0,0 +1,95 @@
+# Jeane Spline Blender Addon
+# Copyright (C) 2022 Pierre
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of  MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#stand-ins for the bpy and mathutils modules, so Jeane Spline can be imported and benchmarked without Blender
+#
+#only what importing the addon needs is there, properties keep their settings so the stand-in scene starts with the same defaults as a real scene
+#bake jobs and effect math run on the stand-in scene, anything reading real Blender data doesn't
+
+import importlib
+import os
+import sys
+import types
+import numpy
+
+#defaults of each property type when none is given
+JSPLINE_standInDefaults = {'BoolProperty':False,'IntProperty':0,'FloatProperty':0.0,'StringProperty':"",'EnumProperty':None}
+
+#property made with bpy.props, keeping its settings
+class JSPLINE_StandInProperty():
+    def __init__(self,propertyType,propertySettings):
+        self.propertyType = propertyType
+        self.propertySettings = propertySettings
+        self.defaultValue = propertySettings.get('default',JSPLINE_standInDefaults[propertyType])
+        #enum properties default to their first item
+        if((propertyType == 'EnumProperty') and (('default' in propertySettings) == False)):
+            self.defaultValue = propertySettings['items'][0][0]
+
+#function making a property of a type, like bpy.props.IntProperty
+def JSPLINE_StandInPropertyFunction(propertyType):
+    return lambda **propertySettings: JSPLINE_StandInProperty(propertyType,propertySettings)
+
+#stand-in for bpy.types.Scene, the addon adds its properties to the class when it is imported
+class JSPLINE_StandInScene():
+    frame_start = 1
+    frame_end = 250
+    frame_current = 1
+
+    #scene with every addon property at its default, and the frame range given
+    def __init__(self,frameStart=1,frameEnd=250):
+        for propertyName, propertySettings in vars(type(self)).items():
+            if(isinstance(propertySettings,JSPLINE_StandInProperty) == True):
+                setattr(self,propertyName,propertySettings.defaultValue)
+        self.frame_start = frameStart
+        self.frame_end = frameEnd
+        self.frame_current = frameStart
+
+    #go to a frame, nothing is evaluated
+    def frame_set(self,frameNumber):
+        self.frame_current = frameNumber
+
+#stand-in bpy module, with a stand-in scene as bpy.context.scene
+def JSPLINE_MakeStandInBpy():
+    standInBpy = types.ModuleType('bpy')
+    standInBpy.props = types.SimpleNamespace(**dict((propertyType,JSPLINE_StandInPropertyFunction(propertyType)) for propertyType in JSPLINE_standInDefaults))
+    standInBpy.types = types.SimpleNamespace(Panel=object,Operator=object,Scene=JSPLINE_StandInScene)
+    standInBpy.utils = types.SimpleNamespace(register_classes_factory=lambda addonClasses: (lambda: None,lambda: None),escape_identifier=lambda identifier: identifier.replace('\\','\\\\').replace('"','\\"'))
+    standInBpy.app = types.SimpleNamespace(version_string="stand-in",handlers=types.SimpleNamespace(frame_change_post=[]))
+    standInBpy.path = types.SimpleNamespace(abspath=os.path.abspath)
+    standInBpy.data = types.SimpleNamespace(filepath="")
+    standInBpy.context = types.SimpleNamespace(scene=None,selected_objects=[])
+    return standInBpy
+
+#stand-in mathutils module, vectors and matrices are numpy arrays
+def JSPLINE_MakeStandInMathutils():
+    standInMathutils = types.ModuleType('mathutils')
+    standInMathutils.Vector = lambda values: numpy.array(values,dtype=numpy.float64)
+    standInMathutils.Matrix = lambda values: numpy.array(values,dtype=numpy.float64)
+    standInMathutils.Quaternion = lambda values: numpy.array(values,dtype=numpy.float64)
+    return standInMathutils
+
+#import Jeane Spline from the folder this file is in, with stand-ins for bpy and mathutils when not running inside Blender
+#outside Blender, bpy.context.scene of the imported addon is a stand-in scene with the frame range given
+def JSPLINE_ImportAddon(frameStart=1,frameEnd=250):
+    if(('bpy' in sys.modules) == False):
+        sys.modules['bpy'] = JSPLINE_MakeStandInBpy()
+        sys.modules['mathutils'] = JSPLINE_MakeStandInMathutils()
+    addonDirectory = os.path.dirname(os.path.abspath(__file__))
+    if((os.path.dirname(addonDirectory) in sys.path) == False):
+        sys.path.insert(0,os.path.dirname(addonDirectory))
+    jeaneSpline = importlib.import_module(os.path.basename(addonDirectory))
+    if(sys.modules['bpy'].types.Scene == JSPLINE_StandInScene):
+        sys.modules['bpy'].context.scene = JSPLINE_StandInScene(frameStart,frameEnd)
+    return jeaneSpline
@@ -0,0 +1,25 @@
+# Jeane Spline Blender Addon
+# Copyright (C) 2022 Pierre
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of  MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#pytest plugin loaded by pytest.ini, so 'python -m pytest' runs the tests from the Jeane Spline folder as well as from the tests folder
+#the Jeane Spline folder is a package whose __init__.py imports bpy, pytest would import it to set up the package before running any test
+
+import pytest
+
+#collect the Jeane Spline folder as a plain folder instead of a package
+def pytest_collect_directory(path,parent):
+    if(path == parent.config.rootpath):
+        return pytest.Dir.from_parent(parent,path=path)
+    return None
@@ -0,0 +1,282 @@
+# Jeane Spline Blender Addon
+# Copyright (C) 2022 Pierre
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of  MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#tests of the effect math in jspline_effects.py, run with plain python, numpy and pytest, without Blender:
+#   python -m pytest
+
+import os
+import sys
+import numpy
+import pytest
+
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import jspline_effects
+
+#random unit quaternions, the same ones every run
+def randomQuaternions(quaternionCount,randomSeed=3):
+    quaternions = numpy.random.default_rng(randomSeed).normal(size=(quaternionCount,4))
+    return quaternions / numpy.linalg.norm(quaternions,axis=-1,keepdims=True)
+
+#smooth movement over frameCount frames with a different mix of swings in each of three channels
+def smoothCurve(frameCount=250):
+    frameIndices = numpy.arange(frameCount)
+    return numpy.stack([numpy.sin(frameIndices / 10),0.5 * numpy.cos(frameIndices / 17),0.2 * numpy.sin(frameIndices / 6)],axis=-1)[:,None,:]
+
+#keys on every interval frames and on the last frame, like the fixed keyframe intervals baking used before keyframe reduction
+def intervalKeys(frameCount,interval):
+    keyMasks = numpy.zeros((frameCount,1),dtype=bool)
+    keyMasks[::interval] = True
+    keyMasks[-1] = True
+    return keyMasks
+
+def test_quaternions_survive_matrices():
+    quaternions = randomQuaternions(200)
+    roundTrip = jspline_effects.JSPLINE_MatricesToQuaternions(jspline_effects.JSPLINE_QuaternionsToMatrices(quaternions))
+    #q and -q are the same rotation
+    assert numpy.allclose(numpy.abs(numpy.sum(roundTrip * quaternions,axis=-1)),1,atol=1e-6)
+
+def test_matrices_survive_quaternions():
+    rotationMatrices = jspline_effects.JSPLINE_QuaternionsToMatrices(randomQuaternions(200,5))
+    roundTrip = jspline_effects.JSPLINE_QuaternionsToMatrices(jspline_effects.JSPLINE_MatricesToQuaternions(rotationMatrices))
+    assert numpy.allclose(roundTrip,rotationMatrices,atol=1e-6)
+
+def test_quaternions_survive_axis_angles():
+    quaternions = randomQuaternions(200,7)
+    roundTrip = jspline_effects.JSPLINE_AxisAnglesToQuaternions(jspline_effects.JSPLINE_QuaternionsToAxisAngles(quaternions))
+    assert numpy.allclose(numpy.abs(numpy.sum(roundTrip * quaternions,axis=-1)),1,atol=1e-6)
+
+@pytest.mark.parametrize("noiseType",['WALK','SMOOTH','FILTERED'])
+def test_same_seed_gives_same_noise(noiseType):
+    noiseSeeds = numpy.array([11,12,13])
+    noiseAmounts = numpy.array([0.5,0.0,0.3])
+    noiseLengths = numpy.array([1.0,1.0,2.0])
+    firstNoise = jspline_effects.JSPLINE_GenerateNoise(noiseType,noiseSeeds,noiseAmounts,noiseLengths,120,8)
+    secondNoise = jspline_effects.JSPLINE_GenerateNoise(noiseType,noiseSeeds,noiseAmounts,noiseLengths,120,8)
+    otherNoise = jspline_effects.JSPLINE_GenerateNoise(noiseType,noiseSeeds + 100,noiseAmounts,noiseLengths,120,8)
+    assert numpy.array_equal(firstNoise,secondNoise)
+    assert numpy.any(firstNoise[:,0] != otherNoise[:,0])
+    #empties without noise stay still, the rest stay within their noise amount
+    assert numpy.all(firstNoise[:,1] == 0)
+    assert numpy.all(numpy.abs(firstNoise) <= (noiseAmounts * noiseLengths)[None,:,None] + 1e-6)
+
+@pytest.mark.parametrize("cyclic",[False,True])
+def test_reduced_keys_stay_within_tolerance(cyclic):
+    keyValues = smoothCurve()
+    if(cyclic == True):
+        keyValues = jspline_effects.JSPLINE_CloseLoop(jspline_effects.JSPLINE_BlendLoopSeam(keyValues,4))
+    allFrames = numpy.ones(keyValues.shape[:2],dtype=bool)
+    keyMasks = jspline_effects.JSPLINE_ReduceKeyframes(keyValues,allFrames,numpy.zeros_like(allFrames),jspline_effects.JSPLINE_LocationErrors,0.001,cyclic)
+    curveErrors = jspline_effects.JSPLINE_LocationErrors(jspline_effects.JSPLINE_EvaluateKeyframeCurves(keyMasks,keyValues,cyclic),keyValues)
+    assert curveErrors.max() <= 0.001
+    assert keyMasks[0,0] and keyMasks[-1,0]
+
+#for the same accuracy as keying every 2, 3 or 4 frames, reduction keeps fewer keys
+@pytest.mark.parametrize("interval",[2,3,4])
+def test_reduction_beats_fixed_intervals(interval):
+    keyValues = smoothCurve()
+    fixedKeys = intervalKeys(len(keyValues),interval)
+    fixedError = jspline_effects.JSPLINE_LocationErrors(jspline_effects.JSPLINE_EvaluateKeyframeCurves(fixedKeys,keyValues),keyValues).max()
+    allFrames = numpy.ones(keyValues.shape[:2],dtype=bool)
+    keyMasks = jspline_effects.JSPLINE_ReduceKeyframes(keyValues,allFrames,numpy.zeros_like(allFrames),jspline_effects.JSPLINE_LocationErrors,fixedError)
+    assert numpy.count_nonzero(keyMasks) < numpy.count_nonzero(fixedKeys)
+
+#a smooth curve keeps fewer keys than keying every other frame
+def test_smooth_curve_keeps_few_keys():
+    keyValues = numpy.sin(numpy.arange(2000) / 7)[:,None,None]
+    allFrames = numpy.ones(keyValues.shape[:2],dtype=bool)
+    keyMasks = jspline_effects.JSPLINE_ReduceKeyframes(keyValues,allFrames,numpy.zeros_like(allFrames),jspline_effects.JSPLINE_LocationErrors,0.001)
+    assert numpy.count_nonzero(keyMasks) < 900
+
+#slopes aren't flattened at peaks, so curves keyed every other frame stay close around them
+def test_curves_stay_close_around_peaks():
+    keyValues = numpy.sin(numpy.arange(200) / 10)[:,None,None]
+    fixedKeys = intervalKeys(len(keyValues),2)
+    curveErrors = jspline_effects.JSPLINE_LocationErrors(jspline_effects.JSPLINE_EvaluateKeyframeCurves(fixedKeys,keyValues),keyValues)
+    assert curveErrors[2:-2].max() < 0.0001
+
+def test_required_and_unkeyable_frames_are_kept_apart():
+    keyValues = smoothCurve(60)
+    keyableFrames = numpy.ones(keyValues.shape[:2],dtype=bool)
+    keyableFrames[:10] = False
+    requiredKeys = numpy.zeros_like(keyableFrames)
+    requiredKeys[30] = True
+    keyMasks = jspline_effects.JSPLINE_ReduceKeyframes(keyValues,keyableFrames,requiredKeys,jspline_effects.JSPLINE_LocationErrors,0.01)
+    assert numpy.any(keyMasks[:10]) == False
+    assert keyMasks[30,0] and keyMasks[10,0]
+
+#savitzky-golay keeps cubics as they are, but still smooths at its smallest window
+@pytest.mark.parametrize("smoothFrames",[1,2,5])
+def test_savgol_weights(smoothFrames):
+    filterWeights = jspline_effects.JSPLINE_FilterWeights('SAVGOL',smoothFrames)
+    frameOffsets = numpy.arange(-smoothFrames,smoothFrames+1)
+    assert numpy.isclose(numpy.sum(filterWeights),1)
+    assert numpy.isclose(numpy.sum(filterWeights * frameOffsets),0)
+    assert filterWeights[smoothFrames] < 1
+
+#a curve jumping back at the loop is blended so the step across the loop matches the steps either side of it
+def test_loop_seam_is_continuous():
+    frameIndices = numpy.arange(60)
+    frameValues = numpy.stack([numpy.sin(frameIndices * 2 * numpy.pi / 50),frameIndices * 0.01],axis=-1)[:,None,:]
+    closedValues = jspline_effects.JSPLINE_CloseLoop(jspline_effects.JSPLINE_BlendLoopSeam(frameValues,6))
+    assert numpy.array_equal(closedValues[-1],closedValues[0])
+    seamStep = closedValues[-1] - closedValues[-2]
+    originalJump = numpy.abs(frameValues[0] - frameValues[-1]).max()
+    assert numpy.abs(seamStep - (closedValues[1] - closedValues[0])).max() < originalJump * 0.05
+    assert numpy.abs(seamStep - (closedValues[-2] - closedValues[-3])).max() < originalJump * 0.1
+    #the keyed curve leaves the closing frame the way it leaves the first frame, so repeats join smoothly
+    allFrames = numpy.ones(closedValues.shape[:2],dtype=bool)
+    keySlopes = jspline_effects.JSPLINE_KeyframeSlopes(allFrames,closedValues,True)
+    assert numpy.allclose(keySlopes[0],keySlopes[-1])
+
+#quaternions turning all the way round over the loop close on the opposite side, the same rotation as the first frame
+def test_loop_seam_keeps_quaternions_turning():
+    turnAngles = numpy.linspace(0,2 * numpy.pi,48,endpoint=False)
+    quaternions = numpy.stack([numpy.cos(turnAngles / 2),numpy.sin(turnAngles / 2),0 * turnAngles,0 * turnAngles],axis=-1)[:,None,:]
+    closedQuaternions = jspline_effects.JSPLINE_CloseLoop(jspline_effects.JSPLINE_BlendLoopSeam(quaternions,4,quaternions=True),quaternions=True)
+    assert numpy.allclose(closedQuaternions[-1],-closedQuaternions[0])
+    assert numpy.allclose(numpy.linalg.norm(closedQuaternions,axis=-1),1)
+    allFrames = numpy.ones(closedQuaternions.shape[:2],dtype=bool)
+    keySlopes = jspline_effects.JSPLINE_KeyframeSlopes(allFrames,closedQuaternions,True)
+    assert numpy.allclose(keySlopes[0],-keySlopes[-1])
+
+@pytest.fixture
+def workerThreads():
+    jspline_effects.JSPLINE_SetWorkerThreads(4)
+    yield
+    jspline_effects.JSPLINE_SetWorkerThreads(1)
+    jspline_effects.JSPLINE_StopWorkerThreads()
+
+def test_threads_reduce_the_same_keys(workerThreads):
+    columnPhases = numpy.linspace(0,3,40)
+    frameIndices = numpy.arange(200)[:,None]
+    keyValues = numpy.stack([numpy.sin(frameIndices / 9 + columnPhases),numpy.cos(frameIndices / 13 - columnPhases) * columnPhases],axis=-1)
+    keyableFrames = numpy.ones(keyValues.shape[:2],dtype=bool)
+    keyableFrames[:5,::3] = False
+    requiredKeys = numpy.zeros_like(keyableFrames)
+    errorScales = numpy.linspace(0.5,2,40)
+    reduceKeys = lambda: jspline_effects.JSPLINE_ReduceKeyframes(keyValues,keyableFrames,requiredKeys,jspline_effects.JSPLINE_LocationErrors,0.002,False,errorScales)
+    threadedKeys = reduceKeys()
+    assert len(jspline_effects.JSPLINE_SplitColumns(40)) > 1
+    jspline_effects.JSPLINE_SetWorkerThreads(1)
+    assert numpy.array_equal(threadedKeys,reduceKeys())
+
+#every filter leaves values that don't change as they are, and smooths out noise
+@pytest.mark.parametrize("filterType",['GAUSSIAN','SAVGOL','ONE_EURO','SPRING'])
+@pytest.mark.parametrize("looped",[False,True])
+def test_filters_smooth_noise(filterType,looped):
+    constantValues = numpy.full((40,2,3),0.7)
+    assert numpy.allclose(jspline_effects.JSPLINE_FilterOverFrames(constantValues,filterType,4,looped),constantValues)
+    noisyValues = numpy.random.default_rng(9).normal(size=(200,2,3))
+    filteredValues = jspline_effects.JSPLINE_FilterOverFrames(noisyValues,filterType,4,looped)
+    assert filteredValues.shape == noisyValues.shape
+    assert numpy.std(numpy.diff(filteredValues,axis=0)) < numpy.std(numpy.diff(noisyValues,axis=0)) * 0.7
+
+#looped values wrap around, so filtering a loop started on another frame gives the same loop
+@pytest.mark.parametrize("filterType",['GAUSSIAN','SAVGOL'])
+def test_looped_filters_wrap_around(filterType):
+    frameValues = numpy.random.default_rng(4).normal(size=(50,1,3))
+    filteredValues = jspline_effects.JSPLINE_FilterOverFrames(frameValues,filterType,3,True)
+    shiftedValues = jspline_effects.JSPLINE_FilterOverFrames(numpy.roll(frameValues,17,axis=0),filterType,3,True)
+    assert numpy.allclose(numpy.roll(filteredValues,17,axis=0),shiftedValues)
+
+#quaternions flipping to the other side between frames are the same rotations, and filter the same as without flips
+def test_filtered_quaternions_ignore_flips():
+    turnAngles = numpy.linspace(0,1.5,60)
+    quaternions = numpy.stack([numpy.cos(turnAngles / 2),numpy.sin(turnAngles / 2),0 * turnAngles,0 * turnAngles],axis=-1)[:,None,:]
+    flippedQuaternions = quaternions * numpy.where(numpy.arange(60) % 3 == 0,-1,1)[:,None,None]
+    filteredQuaternions = jspline_effects.JSPLINE_FilterOverFrames(quaternions,'GAUSSIAN',4,False,quaternions=True)
+    flippedFiltered = jspline_effects.JSPLINE_FilterOverFrames(flippedQuaternions,'GAUSSIAN',4,False,quaternions=True)
+    assert numpy.allclose(numpy.linalg.norm(flippedFiltered,axis=-1),1)
+    assert numpy.allclose(numpy.abs(numpy.sum(flippedFiltered * filteredQuaternions,axis=-1)),1,atol=1e-6)
+
+#the one euro filter lags less behind fast movement the more it responds to speed
+def test_one_euro_follows_fast_movement():
+    rampValues = (numpy.arange(100) * 0.5)[:,None,None] * numpy.ones((1,1,3))
+    slowResponse = jspline_effects.JSPLINE_FilterOverFrames(rampValues,'ONE_EURO',8,False,speedResponse=0)
+    fastResponse = jspline_effects.JSPLINE_FilterOverFrames(rampValues,'ONE_EURO',8,False,speedResponse=5)
+    assert numpy.abs(rampValues - fastResponse)[-1].max() < numpy.abs(rampValues - slowResponse)[-1].max() * 0.5
+
+#the spring settles on a new value without overshooting it
+def test_spring_settles_without_overshoot():
+    stepValues = numpy.zeros((60,1,1))
+    stepValues[10:] = 1
+    filteredValues = jspline_effects.JSPLINE_FilterOverFrames(stepValues,'SPRING',5,False)
+    assert numpy.all(numpy.diff(filteredValues,axis=0) >= -1e-12)
+    assert filteredValues.max() <= 1 + 1e-9
+    assert filteredValues[-1,0,0] > 0.999
+
+#owners at random places and rotations, and a target for each effect constraint
+def constraintOwners(ownerCount=20,randomSeed=6):
+    randomValues = numpy.random.default_rng(randomSeed)
+    ownerMatrices = numpy.tile(numpy.eye(4),(ownerCount,1,1))
+    ownerMatrices[:,:3,:3] = jspline_effects.JSPLINE_QuaternionsToMatrices(randomQuaternions(ownerCount,randomSeed))
+    ownerMatrices[:,:3,3] = randomValues.normal(size=(ownerCount,3))
+    effectLocations = randomValues.normal(size=(ownerCount,len(jspline_effects.JSPLINE_constraintTypes),3)) * 2
+    return ownerMatrices, effectLocations
+
+def test_constraints_without_influence_leave_owners():
+    ownerMatrices, effectLocations = constraintOwners()
+    constrainedMatrices = jspline_effects.JSPLINE_ApplyEffectConstraints(ownerMatrices,effectLocations,numpy.zeros(len(jspline_effects.JSPLINE_constraintTypes)))
+    assert numpy.array_equal(constrainedMatrices,ownerMatrices)
+
+#copy location moves owners towards their targets by the influence, without turning them
+@pytest.mark.parametrize("influence",[0.5,1.0])
+def test_copy_location_constraint(influence):
+    ownerMatrices, effectLocations = constraintOwners()
+    constraintInfluences = numpy.zeros(len(jspline_effects.JSPLINE_constraintTypes))
+    constraintInfluences[0] = influence
+    constrainedMatrices = jspline_effects.JSPLINE_ApplyEffectConstraints(ownerMatrices,effectLocations,constraintInfluences)
+    assert numpy.allclose(constrainedMatrices[:,:3,3],ownerMatrices[:,:3,3] + (effectLocations[:,0] - ownerMatrices[:,:3,3]) * influence)
+    assert numpy.array_equal(constrainedMatrices[:,:3,:3],ownerMatrices[:,:3,:3])
+
+#damped track turns the Y axis of owners towards their targets by the influence, keeping them rotations
+@pytest.mark.parametrize("influence",[0.5,1.0])
+def test_damped_track_constraint(influence):
+    ownerMatrices, effectLocations = constraintOwners()
+    constraintInfluences = numpy.zeros(len(jspline_effects.JSPLINE_constraintTypes))
+    constraintInfluences[1] = influence
+    constrainedMatrices = jspline_effects.JSPLINE_ApplyEffectConstraints(ownerMatrices,effectLocations,constraintInfluences)
+    rotationMatrices = constrainedMatrices[:,:3,:3]
+    assert numpy.allclose(rotationMatrices @ numpy.swapaxes(rotationMatrices,-1,-2),numpy.eye(3))
+    assert numpy.allclose(numpy.linalg.det(rotationMatrices),1)
+    assert numpy.array_equal(constrainedMatrices[:,:3,3],ownerMatrices[:,:3,3])
+    targetDirections = effectLocations[:,1] - ownerMatrices[:,:3,3]
+    targetDirections /= numpy.linalg.norm(targetDirections,axis=-1,keepdims=True)
+    startAngles = numpy.arccos(numpy.clip(numpy.sum(ownerMatrices[:,:3,1] * targetDirections,axis=-1),-1,1))
+    endAngles = numpy.arccos(numpy.clip(numpy.sum(rotationMatrices[:,:,1] * targetDirections,axis=-1),-1,1))
+    assert numpy.allclose(endAngles,startAngles * (1 - influence),atol=1e-6)
+
+#locked track constraints are skipped like Blender skips them, and tracking follows the copied location
+def test_constraints_apply_in_order():
+    ownerMatrices, effectLocations = constraintOwners()
+    constraintInfluences = numpy.ones(len(jspline_effects.JSPLINE_constraintTypes))
+    constrainedMatrices = jspline_effects.JSPLINE_ApplyEffectConstraints(ownerMatrices,effectLocations,constraintInfluences)
+    copyLocationSlots = [constraintNumber for constraintNumber in range(len(jspline_effects.JSPLINE_constraintTypes)) if jspline_effects.JSPLINE_constraintTypes[constraintNumber] == 'COPY_LOCATION']
+    trackSlots = [constraintNumber for constraintNumber in range(len(jspline_effects.JSPLINE_constraintTypes)) if jspline_effects.JSPLINE_constraintTypes[constraintNumber] == 'DAMPED_TRACK']
+    assert numpy.allclose(constrainedMatrices[:,:3,3],effectLocations[:,copyLocationSlots[-1]])
+    targetDirections = effectLocations[:,trackSlots[-1]] - constrainedMatrices[:,:3,3]
+    targetDirections /= numpy.linalg.norm(targetDirections,axis=-1,keepdims=True)
+    assert numpy.allclose(constrainedMatrices[:,:3,1],targetDirections,atol=1e-6)
+
+#matrices scaled to zero, like bones and objects keyed to zero scale to hide them, don't stop baking
+def test_inverting_zero_scale_matrices():
+    ownerMatrices = constraintOwners()[0]
+    invertedMatrices = jspline_effects.JSPLINE_InvertMatrices(ownerMatrices)
+    assert numpy.allclose(invertedMatrices @ ownerMatrices,numpy.eye(4))
+    ownerMatrices[::3,:3,:3] = 0
+    invertedMatrices = jspline_effects.JSPLINE_InvertMatrices(ownerMatrices)
+    assert numpy.all(numpy.isfinite(invertedMatrices))
+    assert numpy.allclose(invertedMatrices[1::3] @ ownerMatrices[1::3],numpy.eye(4))
+    assert numpy.allclose(ownerMatrices @ invertedMatrices @ ownerMatrices,ownerMatrices)